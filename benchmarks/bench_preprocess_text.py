@@ -0,0 +1,63 @@
+"""Micro-benchmarks of `preprocess_text` and `preprocess_texts` against the previous implementation (two translate
+passes, strip, lower and `re.sub` for spaces), for typical comment sizes up to the longest comments Reddit allows.
+
+Usage (from repository root):
+    python -m benchmarks.bench_preprocess_text
+"""
+
+import re
+import string
+import timeit
+
+from util.str_utils import preprocess_text, preprocess_texts
+
+__author__ = 'MePsyDuck'
+
+PUNCTUATION_TRANS = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+WHITESPACE_TRANS = str.maketrans(string.whitespace, ' ' * len(string.whitespace))
+
+COMMENT = "I agree with\n\n>Selemene commands!\n\nBut honestly, Luna's   voice lines are the BEST... "
+TEXTS = [('response', "Selemene commands!"),
+         ('short comment', COMMENT[:40]),
+         ('comment', COMMENT * 3),
+         ('long comment', COMMENT * 30),
+         ('max comment (10k chars)', (COMMENT * 120)[:10_000]),
+         ('non ASCII comment', "Ça va, Rubick? ¡Ha ha! " * 10),
+         ]
+
+
+def legacy_preprocess_text(text):
+    """Previous implementation of `preprocess_text`, kept as reference.
+    """
+    text = text.translate(PUNCTUATION_TRANS)
+    text = text.translate(WHITESPACE_TRANS)
+    text = text.strip().lower()
+    text = re.sub(' +', ' ', text)
+    return text
+
+
+def bench(function, number):
+    """Method to get the best time of a function call in microseconds.
+    """
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1_000_000
+
+
+def main():
+    print('{:<26}{:>8}{:>12}{:>12}{:>9}'.format('text', 'chars', 'legacy us', 'fused us', 'speedup'))
+    for name, text in TEXTS:
+        assert preprocess_text(text) == legacy_preprocess_text(text)
+        number = max(10, 200_000 // len(text))
+        legacy = bench(lambda: legacy_preprocess_text(text), number)
+        fused = bench(lambda: preprocess_text(text), number)
+        print('{:<26}{:>8}{:>12.2f}{:>12.2f}{:>8.1f}x'.format(name, len(text), legacy, fused, legacy / fused))
+
+    responses = [text for _, text in TEXTS[:3]] * 10_000
+    assert preprocess_texts(responses) == [legacy_preprocess_text(text) for text in responses]
+    legacy = bench(lambda: [legacy_preprocess_text(text) for text in responses], 1)
+    batch = bench(lambda: preprocess_texts(responses), 1)
+    print('{:<26}{:>8}{:>12.0f}{:>12.0f}{:>8.1f}x'.format('batch of ' + str(len(responses)), '', legacy, batch,
+                                                          legacy / batch))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark of response markup normalization: lines per second of `ResponseNormalizer` against the previous
+`parse_response` implementation (a dozen `re.sub` calls with string patterns per line).
+
+Usage (from repository root):
+    python -m benchmarks.bench_response_normalizer [dump path]
+
+Dump path is an XML export or directory of page sources, as read by `dump_parser`. Without it, a synthetic corpus of
+response lines with and without markup is used. Results of both implementations are compared before timing.
+"""
+
+import os
+import re
+import sys
+import timeit
+
+from parsers.dump_parser import iter_source_dir_pages, iter_xml_dump_pages
+from parsers.response_normalizer import response_normalizer
+from parsers.wiki_parser import response_regex
+from util.logger import logger
+
+__author__ = 'MePsyDuck'
+
+SYNTHETIC_LINES = [
+    " Axe is all!",
+    " Come and get it!",
+    " {{resp|r}} Ho ho ha ha!",
+    " {{resp|d|2}} Let's get this over with…",
+    " <!-- unused --> Not a single tree...",
+    " {{hero icon|crystal maiden|16px}} Not so tough now, are you?",
+    " {{item icon|blink dagger|16px}} Blink!",
+    " [[File:Rubick minimap icon.png|16px|link=Rubick]] Finally, a worthy opponent.",
+    " [[Shitty Wizard]]! <small>''to Invoker''</small>",
+    " I'll see you in [[Ancient (Building)|the ancients]].<ref>Reference</ref>",
+    " {{tooltip|Sundered|Sunder}} your soul. <nowiki>[1]</nowiki>",
+    " {{note|Rarely|Only in All Pick}} {{H|Sven}}, you fool!",
+    " Broken markup [[here",
+]
+
+
+def legacy_parse_response(text):
+    """Previous implementation of `wiki_parser.parse_response`, kept as reference.
+    """
+    if any(excluded_case in text for excluded_case in ['(broken file)', 'versus (TI ', 'Ceeeb']):
+        return None
+
+    text = re.sub(r'…', '...', text)
+
+    regexps_empty_sub = [r'<!--.*?-->',
+                         r'{{resp\|(r|u|\d+|d\|\d+|rem)}}',
+                         r'{{hero icon\|[a-z- \']+\|\d+px}}',
+                         r'{{item( icon)?\|[a-z0-9() \']+\|\d+px}}',
+                         r'\[\[File:[a-z.,!\'() ]+\|\d+px(\|link=[a-z,!\'() ]+)?(\|class=[a-z]+)?]]',
+                         r'<small>\[\[#[a-z0-9_\-\' ]+\|\'\'followup\'\']]</small>',
+                         r'<small>\'\'[a-z0-9 /]+\'\'</small>',
+                         r'<ref>.*?</ref>',
+                         r'<nowiki>.*?</nowiki>',
+                         ]
+    for regex in regexps_empty_sub:
+        text = re.sub(regex, '', text, flags=re.IGNORECASE)
+
+    regexps_sub_text = [r'\[\[([a-zé().:\',\- ]+)]]',
+                        r'\[\[[a-zé0-9().:\'/#-_ ]+\|([a-zé0-9().:\'/#-_ ]+)]]',
+                        r'{{tooltip\|(.*?)\|.*?}}',
+                        r'{{note\|([a-z.!\'\-?, ]+)\|[a-z.!\'\-?,()/ ]+}}',
+                        r'{{H\|([a-z.!\'\-?,()/ ]+)}}',
+                        ]
+    for regex in regexps_sub_text:
+        text = re.sub(regex, '\\1', text, flags=re.IGNORECASE)
+
+    if any(escape in text for escape in ['[[', ']]', '{{', '}}', '|', 'sm2']):
+        return None
+
+    return text.strip()
+
+
+def load_lines(dump_path=None):
+    """Method to get response lines (text part only) from the dump, or the synthetic corpus.
+
+    :param dump_path: Path to XML export or directory of page sources.
+    :return: list of response lines
+    """
+    if dump_path is None:
+        return SYNTHETIC_LINES * 1000
+
+    pages = iter_source_dir_pages(dump_path) if os.path.isdir(dump_path) else iter_xml_dump_pages(dump_path)
+    return [response['text'] for _, _, source in pages for response in response_regex.finditer(source)]
+
+
+def main(dump_path=None):
+    lines = load_lines(dump_path)
+
+    # Warnings for unprocessed responses would dominate the timing
+    logger.disabled = True
+    mismatches = [line for line in lines if response_normalizer.normalize(line) != legacy_parse_response(line)]
+    if mismatches:
+        raise AssertionError('Results differ for ' + str(len(mismatches)) + ' lines, e.g. : ' + mismatches[0])
+
+    for name, normalize in [('legacy parse_response', legacy_parse_response),
+                            ('ResponseNormalizer', response_normalizer.normalize)]:
+        seconds = min(timeit.repeat(lambda: [normalize(line) for line in lines], number=1, repeat=5))
+        print('{:<24}{:>12,.0f} lines/s'.format(name, len(lines) / seconds))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -3,6 +3,9 @@ Removed old Code Flow auth in favor of Password Flow auth.
 Reason: https://www.reddit.com/r/redditdev/comments/5fxlk8/praw_refresh_tokens/dantjyk/
 """
 
+import threading
+from functools import lru_cache
+
 import praw
 
 import config
@@ -20,3 +23,72 @@ def get_account():
                        user_agent=config.USER_AGENT,
                        username=config.USERNAME,
                        password=config.PASSWORD)
+
+
+def get_shared_account():
+    """Method that provides the connection to Reddit API, for sharing between threads.
+    PRAW is not thread safe, so requests of all the threads (including lazy loading of comments/submissions they got from
+    the instance) are made one at a time. `Reddit.request` is the method all of PRAW's requests go through.
+        :return: Reddit instance.
+    """
+    reddit = get_account()
+    lock = threading.Lock()
+    request = reddit.request
+
+    def locked_request(*args, **kwargs):
+        with lock:
+            return request(*args, **kwargs)
+
+    reddit.request = locked_request
+    return reddit
+
+
+class BotIdentity:
+    """Identity of the bot's account, resolved once per session.
+    Authors are compared by their names as plain (lowercase) strings, as Reddit usernames are case insensitive. This
+    way comparing never needs lazy Redditor objects to be fetched.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._name_key = name.lower()
+
+    def is_bot(self, author):
+        """Method to check if author is the bot's account.
+
+        :param author: Redditor (or author name) of the comment/submission
+        :return: True if author is the bot, else False
+        """
+        return get_author_name(author) == self._name_key
+
+
+def get_author_name(author):
+    """Method to get the author's name in the form used for comparison.
+
+    :param author: Redditor (or author name) of the comment/submission
+    :return: Lowercase name of the author, None if the author is deleted
+    """
+    return str(author).lower() if author is not None else None
+
+
+@lru_cache(maxsize=None)
+def get_identity(reddit):
+    """Method that resolves the bot's account identity. Cached, so the account is requested only once per Reddit
+    instance.
+        :return: BotIdentity of the bot's account.
+    """
+    return BotIdentity(reddit.user.me().name)
+
+
+def get_async_account():
+    """Method that provides the connection to Reddit API using OAuth, for the asynchronous engine.
+    Async PRAW is imported here, so it's needed only when the asynchronous engine is used.
+        :return: Async PRAW Reddit instance.
+    """
+    import asyncpraw
+
+    return asyncpraw.Reddit(client_id=config.CLIENT_ID,
+                            client_secret=config.CLIENT_SECRET,
+                            user_agent=config.USER_AGENT,
+                            username=config.USERNAME,
+                            password=config.PASSWORD)
@@ -0,0 +1,186 @@
+"""Asynchronous engine of the bot, built on Async PRAW.
+
+Comment and submission streams of every configured subreddit, fetching comment trees for update requests and posting
+replies run as coroutines on a single event loop. Backoff after Reddit errors only pauses the stream that failed,
+other streams and pending replies keep running.
+
+With `OUTBOX_PATH` set, replies and edits are put in the outbox, which is drained at the rate allowed by Reddit by the
+same thread as in the synchronous worker, with its own (synchronous PRAW) Reddit instance.
+
+Classification, caching and db access are the same as in the synchronous worker. They are blocking calls (requests to
+redis or the db, lazy loading of responses and excluded responses), so they're run in threads (`asyncio.to_thread`) to
+keep the event loop free for the streams.
+"""
+
+import asyncio
+import signal
+import time
+
+from asyncpraw.exceptions import RedditAPIException
+from asyncprawcore import ServerError
+
+import config
+from bot import account
+from bot.classifier import CommentTree, Decision, get_processed_text, is_comment
+from bot.outbox import EDIT, REPLY, reply_latency
+from bot.worker import cache_api, classifications, replyable_classifier, reply_scheduler, stream_lag, \
+    create_custom_reply, create_reply, create_update_reply, reload_responses
+from util.fuzzy_index import fuzzy_index
+from util.logger import logger
+from util.response_index import response_index
+from util.sharding import get_shard_subreddits
+
+__author__ = 'MePsyDuck'
+
+
+def work():
+    """Main method executing the script with the asynchronous engine.
+    """
+    asyncio.run(watch_subreddits())
+
+
+async def watch_subreddits():
+    """Coroutine that connects to the Reddit account and watches comments and submissions of all the configured
+    subreddits concurrently. Replyables are processed in separate tasks, at most `WORKER_QUEUE_SIZE` at once.
+    """
+    async with account.get_async_account() as reddit:
+        identity = account.BotIdentity((await reddit.user.me()).name)
+        logger.info('Connected to Reddit account : ' + config.USERNAME)
+
+        await asyncio.to_thread(response_index.load)
+        if config.FUZZY_MATCH_THRESHOLD:
+            await asyncio.to_thread(fuzzy_index.load)
+        await asyncio.to_thread(config.load_excluded_responses)
+        if hasattr(signal, 'SIGHUP'):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_responses)
+
+        # Outbox is drained by a thread, with synchronous PRAW
+        reply_scheduler.start(account.get_account())
+        try:
+            semaphore = asyncio.Semaphore(config.WORKER_QUEUE_SIZE)
+            streams = []
+            for subreddit_name in get_shard_subreddits():
+                subreddit = await reddit.subreddit(subreddit_name)
+                streams.append(watch_stream(lambda sub=subreddit: sub.stream.comments(),
+                                            reddit, identity, semaphore))
+                streams.append(watch_stream(lambda sub=subreddit: sub.stream.submissions(),
+                                            reddit, identity, semaphore))
+
+            await asyncio.gather(*streams)
+        finally:
+            await asyncio.to_thread(reply_scheduler.stop)
+
+
+async def watch_stream(stream_factory, reddit, identity, semaphore):
+    """Coroutine that reads a single stream and starts a task for each new replyable.
+    Streams need to be restarted/re-obtained when they throw exception.
+
+    :param stream_factory: Callable returning a new stream.
+    :param reddit: The reddit account instance
+    :param identity: BotIdentity of the bot's account
+    :param semaphore: Semaphore limiting the number of replyables processed at once
+    """
+    tasks = set()
+    while True:
+        try:
+            async for replyable in stream_factory():
+                await semaphore.acquire()
+                task = asyncio.create_task(process_replyable(reddit, identity, replyable))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: semaphore.release())
+        except ServerError as e:
+            logger.critical("Reddit server is down : " + str(e))
+            await asyncio.sleep(120)
+        except RedditAPIException as e:
+            logger.critical("API Exception occurred : " + str(e))
+            await asyncio.sleep(60)
+
+
+async def process_replyable(reddit, identity, replyable):
+    """Coroutine used to check the comment/submission and add reply if it is a response.
+    Same as `bot.worker.process_replyable`, but comment trees are fetched (only for update requests) and replies are
+    posted asynchronously.
+
+    :param reddit: The reddit account instance
+    :param identity: BotIdentity of the bot's account
+    :param replyable: comment or submission
+    :return: None
+    """
+    try:
+        if await asyncio.to_thread(cache_api.exists, thing_id=replyable.fullname):
+            return
+
+        # Ignore thyself
+        if identity.is_bot(replyable.author):
+            return
+
+        logger.info("Found new replyable: " + replyable.fullname)
+        stream_lag.observe(time.time() - replyable.created_utc)
+
+        parsed = replyable_classifier.parse(replyable)
+        comment_tree = None
+        if parsed.hero_name is None and parsed.body.startswith(config.UPDATE_REQUEST_KEYWORD) and \
+                await asyncio.to_thread(replyable_classifier.get_update_request_hero_id, parsed) is not None:
+            comment_tree = await get_comment_tree(replyable)
+
+        classification = await asyncio.to_thread(replyable_classifier.classify_parsed, reddit, replyable, parsed,
+                                                 comment_tree, identity)
+        decision = classification.decision
+        classifications.inc(decision=decision.value)
+
+        if decision == Decision.CUSTOM:
+            await post(REPLY, replyable, create_custom_reply(replyable, get_processed_text(parsed)))
+        elif decision in (Decision.HERO_SPECIFIC, Decision.FLAIR_SPECIFIC, Decision.REGULAR, Decision.FUZZY,
+                          Decision.PARTIAL):
+            response_info = classification.response_info
+            await post(REPLY, replyable, create_reply(replyable, response_info.link, response_info.hero_id,
+                                                      response_info.response_text))
+        elif decision == Decision.UPDATE:
+            bot_comment, root_replyable = comment_tree
+            await post(EDIT, bot_comment, create_update_reply(root_replyable, classification.response_info))
+    except RedditAPIException as e:
+        logger.critical("API Exception occurred : " + str(e))
+    except Exception:
+        logger.exception('Failed to process replyable : ' + replyable.fullname)
+
+
+async def post(action, thing, body):
+    """Coroutine to put the reply or edit in the outbox if it's enabled, or post it directly with Async PRAW otherwise.
+
+    :param action: `REPLY` or `EDIT`
+    :param thing: The comment/submission to reply to, or the bot's comment to edit
+    :param body: Text of the reply
+    """
+    if reply_scheduler.outbox is not None:
+        # Outbox is a sqlite file, only the fullname of the thing is used
+        schedule = reply_scheduler.edit if action == EDIT else reply_scheduler.reply
+        await asyncio.to_thread(schedule, thing, body)
+        return
+
+    with reply_latency.time(action=action):
+        if action == EDIT:
+            await thing.edit(body)
+        else:
+            await thing.reply(body)
+    logger.info(("Updated Reply: " if action == EDIT else "Replied to: ") + thing.fullname)
+
+
+async def get_comment_tree(replyable):
+    """Coroutine to fetch the parent and root of the comment. Async PRAW does not fetch lazy objects on attribute
+    access, so parents are loaded explicitly.
+
+    :param replyable: The comment/submission on reddit
+    :return: CommentTree of the comment, None if replyable is a submission
+    """
+    if not is_comment(replyable):
+        return None
+
+    parent = await replyable.parent()
+    await parent.load()
+    if not is_comment(parent):
+        return CommentTree(parent=parent, root=None)
+
+    root = await parent.parent()
+    await root.load()
+    return CommentTree(parent=parent, root=root)
@@ -0,0 +1,448 @@
+"""Module used to classify replyables (comments/submissions) before the bot replies to them.
+
+The replyable text is parsed only once into a `ParsedText` record, which is then passed through the classification
+stages in order of priority. Cheap in-memory checks run before any stage that needs db or Reddit access, so replyables
+that are not responses (majority of them) are rejected after a couple of hash lookups.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from enum import Enum
+
+import config
+from bot.account import get_author_name, get_identity
+from util.fuzzy_index import fuzzy_index
+from util.hero_resolver import hero_resolver
+from util.response_automaton import ResponseAutomaton
+from util.response_index import response_index
+from util.response_info import ResponseInfo
+from util.str_utils import preprocess_text
+
+__author__ = 'MePsyDuck'
+
+ParsedText = namedtuple('ParsedText', ['quoted_text', 'hero_name', 'body', 'flair_css'])
+ParsedText.__doc__ = """Replyable text parsed for classification.
+* quoted_text : first quote in the text, or the whole text if there are no quotes
+* hero_name : hero name from the `hero_name::` prefix, None if there is no prefix
+* body : processed text without the hero prefix
+* flair_css : author's flair css class"""
+
+CommentTree = namedtuple('CommentTree', ['parent', 'root'])
+CommentTree.__doc__ = """Ancestors of a comment, used for update requests.
+* parent : parent comment/submission
+* root : parent of the parent, None if parent is a submission"""
+
+Classification = namedtuple('Classification', ['decision', 'parsed', 'response_info', 'comment_tree'])
+
+# Type prefix of comment fullnames. Used instead of isinstance checks, so PRAW and Async PRAW objects both work.
+COMMENT_PREFIX = 't1_'
+
+
+class Decision(Enum):
+    NONE = 'none'
+    CUSTOM = 'custom'
+    HERO_SPECIFIC = 'hero_specific'
+    FLAIR_SPECIFIC = 'flair_specific'
+    UPDATE = 'update'
+    REGULAR = 'regular'
+    FUZZY = 'fuzzy'
+    PARTIAL = 'partial'
+
+
+class StageStats:
+    """Per stage timing counters for the classifier.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+
+    def __repr__(self):
+        return 'StageStats(calls={}, total_time={:.6f})'.format(self.calls, self.total_time)
+
+
+def get_quoted_text(text):
+    """Method used to get quoted text.
+    If body/title text contains a quote, the first quote is considered as the text.
+
+    :param text: The replyable text
+    :return: The first quote in the text. If no quotes are found, then the entire text is returned
+    """
+    lines = text.split('\n\n')
+    for line in lines:
+        if line.startswith('>'):
+            return line[1:]
+    return text
+
+
+def is_comment(replyable):
+    """Method to check if replyable is a comment.
+
+    :param replyable: The comment/submission on reddit
+    :return: True if replyable is a comment, False if it's a submission
+    """
+    return replyable.fullname.startswith(COMMENT_PREFIX)
+
+
+def get_replyable_text(replyable):
+    """Method to get the raw text of the replyable, body for comments and title for submissions.
+
+    :param replyable: The comment/submission on reddit
+    :return: The body/title text
+    """
+    return replyable.body if is_comment(replyable) else replyable.title
+
+
+def get_comment_tree(replyable):
+    """Method to get the parent and root of the comment using synchronous PRAW.
+
+    :param replyable: The comment/submission on reddit
+    :return: CommentTree of the comment, None if replyable is a submission
+    """
+    if not is_comment(replyable):
+        return None
+
+    parent = replyable.parent()
+    if not is_comment(parent):
+        return CommentTree(parent=parent, root=None)
+    return CommentTree(parent=parent, root=parent.parent())
+
+
+def parse_text(text, flair_css=None):
+    """Method used to parse the replyable body/title text into a `ParsedText` record.
+    If text contains a quote, the first quote text is considered as the text.
+
+    :param text: The replyable body/title text
+    :param flair_css: The author's flair css class
+    :return: ParsedText record
+    """
+    hero_name = None
+    if '>' in text:
+        text = get_quoted_text(text)
+    quoted_text = text
+    if '::' in text:
+        hero_name, text = text.split('::', 1)
+        hero_name = hero_name.strip()
+
+    return ParsedText(quoted_text=quoted_text, hero_name=hero_name, body=preprocess_text(text), flair_css=flair_css)
+
+
+def get_processed_text(parsed):
+    """Method to get the processed text in the form used for matching excluded and custom responses, i.e. body with the
+    hero prefix (if any).
+
+    :param parsed: ParsedText record
+    :return: Processed text
+    """
+    if parsed.hero_name is None:
+        return parsed.body
+    return parsed.hero_name + '::' + parsed.body
+
+
+class Classifier:
+    """Classifies replyables into one of the `Decision`s. Stages are run in order of priority:
+    excluded, custom, hero specific, flair specific, update request and regular response. Replyables without exact
+    match can be checked for near matches (fuzzy) and responses contained in the text (partial), if enabled.
+    """
+
+    def __init__(self):
+        self.stage_stats = {}
+        # Classifier can be shared by worker threads
+        self._stats_lock = threading.Lock()
+        self.response_automaton = ResponseAutomaton(is_excluded=self.is_excluded_response,
+                                                    get_excluded_responses=lambda: config.EXCLUDED_RESPONSES)
+
+    @contextmanager
+    def _stage(self, name):
+        """Context manager to record the number of calls and time spent in a classification stage.
+
+        :param name: Stage name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                stats = self.stage_stats.get(name)
+                if stats is None:
+                    stats = self.stage_stats[name] = StageStats()
+                stats.calls += 1
+                stats.total_time += elapsed
+
+    def parse(self, replyable):
+        """Method to parse the replyable text.
+
+        :param replyable: The comment/submission on reddit
+        :return: ParsedText record for the replyable
+        """
+        with self._stage('parse'):
+            return parse_text(get_replyable_text(replyable), flair_css=replyable.author_flair_css_class)
+
+    def classify(self, reddit, replyable, comment_tree=None, identity=None):
+        """Method to classify a replyable.
+
+        :param reddit: The reddit account instance
+        :param replyable: The comment/submission on reddit
+        :param comment_tree: CommentTree of the replyable if already fetched, else it's fetched for update requests.
+        :param identity: BotIdentity of the bot's account, resolved from `reddit` if not given.
+        :return: Classification with the decision, parsed text, ResponseInfo (None if there's nothing to reply with) and
+        CommentTree (None if it was not needed)
+        """
+        return self.classify_parsed(reddit, replyable, self.parse(replyable), comment_tree, identity)
+
+    def classify_parsed(self, reddit, replyable, parsed, comment_tree=None, identity=None):
+        """Method to run classification stages on already parsed replyable text.
+
+        :param reddit: The reddit account instance
+        :param replyable: The comment/submission on reddit
+        :param parsed: ParsedText record for the replyable
+        :param comment_tree: CommentTree of the replyable if already fetched, else it's fetched for update requests.
+        :param identity: BotIdentity of the bot's account, resolved from `reddit` if not given.
+        :return: Classification
+        """
+        decision, response_info = Decision.NONE, None
+        processed_text = get_processed_text(parsed)
+
+        with self._stage('excluded'):
+            is_excluded = self.is_excluded_response(processed_text)
+        if is_excluded:
+            return Classification(decision, parsed, response_info, comment_tree)
+
+        with self._stage('custom'):
+            is_custom = processed_text in config.CUSTOM_RESPONSES
+        if is_custom:
+            return Classification(Decision.CUSTOM, parsed, response_info, comment_tree)
+
+        if parsed.hero_name is not None:
+            with self._stage('hero_specific'):
+                response_info = self.get_hero_specific_response(parsed)
+            if response_info is not None:
+                decision = Decision.HERO_SPECIFIC
+            return Classification(decision, parsed, response_info, comment_tree)
+
+        is_response = parsed.body in response_index
+        is_update_request = parsed.body.startswith(config.UPDATE_REQUEST_KEYWORD)
+
+        # Cheap reject for majority of replyables, before any db or Reddit access
+        if not is_response and not is_update_request:
+            if config.FUZZY_MATCH_THRESHOLD:
+                with self._stage('fuzzy'):
+                    response_info = self.get_fuzzy_response(parsed)
+                if response_info is not None:
+                    decision = Decision.FUZZY
+            if response_info is None and config.PARTIAL_MATCHING:
+                with self._stage('partial'):
+                    response_info = self.get_partial_response(parsed)
+                if response_info is not None:
+                    decision = Decision.PARTIAL
+            return Classification(decision, parsed, response_info, comment_tree)
+
+        if is_response:
+            with self._stage('flair_specific'):
+                response_info = self.get_flair_specific_response(parsed)
+            if response_info is not None:
+                return Classification(Decision.FLAIR_SPECIFIC, parsed, response_info, comment_tree)
+
+        if is_update_request:
+            with self._stage('update'):
+                hero_id = self.get_update_request_hero_id(parsed)
+                if hero_id is not None:
+                    if comment_tree is None:
+                        comment_tree = get_comment_tree(replyable)
+                    if identity is None:
+                        identity = get_identity(reddit)
+                    response_info = self.get_update_request_response(replyable, hero_id, comment_tree, identity)
+            if response_info is not None:
+                return Classification(Decision.UPDATE, parsed, response_info, comment_tree)
+
+        if is_response:
+            with self._stage('regular'):
+                response_info = self.get_regular_response(parsed)
+            if response_info is not None:
+                decision = Decision.REGULAR
+
+        return Classification(decision, parsed, response_info, comment_tree)
+
+    @staticmethod
+    def is_excluded_response(text):
+        """Method to check if the given body/title is in excluded responses set.
+        Also return True for single word text (they're mostly common phrases).
+
+        :param text: The processed body/title text
+        :return: True if text is an excluded response, else False
+        """
+        return ' ' not in text or text in config.EXCLUDED_RESPONSES
+
+    @staticmethod
+    def get_hero_specific_response(parsed):
+        """Method that checks if response for specified hero name and text exists.
+
+        :param parsed: ParsedText record
+        :return: ResponseInfo containing hero_id and link for response if the response for specified hero was found,
+        otherwise None
+        """
+        if not parsed.hero_name or parsed.body not in response_index:
+            return None
+
+        hero_id = hero_resolver.get_hero_id_by_name(hero_name=parsed.hero_name)
+        if hero_id:
+            link, _ = response_index.get_link_for_response(processed_text=parsed.body, hero_id=hero_id)
+            if link:
+                return ResponseInfo(hero_id=hero_id, link=link)
+        return None
+
+    @staticmethod
+    def get_flair_specific_response(parsed):
+        """Method that checks if response for hero in author's flair and text exists.
+
+        :param parsed: ParsedText record
+        :return: ResponseInfo containing hero_id and link for response if the response for author's flair's hero was
+        found, otherwise None
+        """
+        if not parsed.flair_css:
+            return None
+
+        hero_id = hero_resolver.get_hero_id_by_flair_css(flair_css=parsed.flair_css)
+        if hero_id:
+            link, _ = response_index.get_link_for_response(processed_text=parsed.body, hero_id=hero_id)
+            if link:
+                return ResponseInfo(hero_id=hero_id, link=link)
+        return None
+
+    @staticmethod
+    def get_fuzzy_response(parsed):
+        """Method to get response for a near match of the text (e.g. with a typo), within `FUZZY_MATCH_BUDGET`.
+        Matched response is handled like the text itself : excluded responses are ignored, and response for hero in
+        author's flair is preferred.
+
+        :param parsed: ParsedText record
+        :return: ResponseInfo containing hero_id and link for the matched response if it was found, otherwise None
+        """
+        match = fuzzy_index.find(parsed.body, threshold=config.FUZZY_MATCH_THRESHOLD,
+                                 budget=config.FUZZY_MATCH_BUDGET / 1000)
+        if match is None:
+            return None
+
+        matched_text, similarity = match
+        if Classifier.is_excluded_response(matched_text):
+            return None
+
+        matched = parsed._replace(body=matched_text)
+        return Classifier.get_flair_specific_response(matched) or Classifier.get_regular_response(matched)
+
+    def get_partial_response(self, parsed):
+        """Method to get response for the longest (not excluded) response contained in the text. Response for hero in
+        author's flair is preferred.
+
+        :param parsed: ParsedText record
+        :return: ResponseInfo containing hero_id, link and text of the contained response if it was found, otherwise
+        None
+        """
+        matched_text = self.response_automaton.find_longest(parsed.body)
+        if matched_text is None:
+            return None
+
+        matched = parsed._replace(body=matched_text)
+        response_info = self.get_flair_specific_response(matched) or self.get_regular_response(matched)
+        if response_info is not None:
+            response_info.response_text = matched_text
+        return response_info
+
+    @staticmethod
+    def get_update_request_hero_id(parsed):
+        """Method to get the requested hero from the update request text, e.g. "try legion commander".
+
+        :param parsed: ParsedText record
+        :return: Hero's id if the text is a request for existing hero, otherwise None
+        """
+        hero_name = parsed.body.replace(config.UPDATE_REQUEST_KEYWORD, '', 1)
+        return hero_resolver.get_hero_id_by_name(hero_name=hero_name)
+
+    def get_update_request_response(self, replyable, hero_id, comment_tree, identity):
+        """Method to check whether the comment is a request to update existing response.
+        Only works if
+        * Comment begins with "try"
+        * Comment ends with valid hero name
+        * Given hero has the original response
+        * Root/Original comment/submission was not hero specific response.
+
+        Examples:
+        "Try legion commander" : Valid
+        "Try leGiOn ComManDer" : Valid - case does not matter
+        "legion commander" : Invalid - does not begin with `try`
+        "Try legion" : Invalid - invalid hero name
+
+        Hero name is checked (`get_update_request_hero_id`) before the comment tree is fetched, as it needs requests to
+        Reddit.
+
+        :param replyable: The comment/submission on reddit
+        :param hero_id: Requested hero's id
+        :param comment_tree: CommentTree of the replyable
+        :param identity: BotIdentity of the bot's account
+        :return: ResponseInfo containing hero_id and link for response if this is a valid update request, otherwise None
+        """
+        if not self.validate_update_request_comment_tree(replyable, comment_tree, identity):
+            return None
+
+        root_parsed = parse_text(get_replyable_text(comment_tree.root))
+
+        if root_parsed.hero_name is not None and self.get_hero_specific_response(root_parsed):
+            return None
+
+        link, _ = response_index.get_link_for_response(processed_text=get_processed_text(root_parsed),
+                                                       hero_id=hero_id)
+        if link is None:
+            return None
+
+        return ResponseInfo(hero_id=hero_id, link=link)
+
+    @staticmethod
+    def validate_update_request_comment_tree(replyable, comment_tree, identity):
+        """Method to check whether the comment in the request to update existing response is valid.
+        A valid comment tree is when:
+        * Comment was made as a reply to bot's comment
+        * Comment was added by OP, who made the original request(Response/Comment) for the response.
+
+        The comment tree should look something like below, where root(original) replyable can be Comment or Submission.
+        Only valid case is c3.
+        c1/s1 user: Foo
+            c2 bot: "Foo" response by Bar hero
+               c3 user: Try Bar2
+               c4 other_user: Try Bar2
+
+        :param replyable: The comment/submission on reddit
+        :param comment_tree: CommentTree of the replyable, None if replyable is a submission
+        :param identity: BotIdentity of the bot's account
+        :return: True if this is a valid comment tree, else False
+        """
+        # Replyable is a submission, or parent comment is a submission
+        if comment_tree is None or comment_tree.root is None:
+            return False
+
+        if not identity.is_bot(comment_tree.parent.author):
+            return False
+
+        op = get_author_name(replyable.author)
+        if op is None or not get_author_name(comment_tree.root.author) == op:
+            return False
+
+        return True
+
+    @staticmethod
+    def get_regular_response(parsed):
+        """Method to get response for given text.
+        In case of multiple matches, it used to sort responses in descending order of heroes and get the first one,
+        but now it's random.
+
+        :param parsed: ParsedText record
+        :return: ResponseInfo containing hero_id and link for response if the response was found, otherwise None
+        """
+        link, hero_id = response_index.get_link_for_response(processed_text=parsed.body)
+
+        if link and hero_id:
+            return ResponseInfo(hero_id=hero_id, link=link)
+
+        return None
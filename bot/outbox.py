@@ -0,0 +1,330 @@
+"""Module used to post replies and edits to Reddit outside of the replyable processing.
+
+Replies and edits are put in an outbox (local sqlite file), and a separate thread drains the outbox at the rate allowed
+by Reddit. The rate is read from the rate limit headers of Reddit's responses (`reddit.auth.limits`) : the requests
+remaining in the current window are spread evenly over the rest of the window. When Reddit rejects a reply for posting
+too much, it's retried after the time Reddit asks for, and other temporary failures are retried with backoff.
+
+So reading new replyables never waits for replies to be posted, and replies still in the outbox when the bot stops are
+posted after it's started again.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+
+from praw.exceptions import APIException
+from prawcore import PrawcoreException
+
+import config
+from util.logger import logger
+from util.metrics import metrics
+
+__author__ = 'MePsyDuck'
+
+REPLY = 'reply'
+EDIT = 'edit'
+
+# Matches wait time in Reddit's RATELIMIT error messages, e.g. "Take a break for 5 minutes before trying again."
+RATELIMIT_REGEX = re.compile(r'(?P<amount>\d+) (?P<unit>minute|second)')
+MAX_RETRY_DELAY = 60 * 60
+
+reply_latency = metrics.histogram('bot_reply_post_seconds', 'Time spent posting replies and edits to Reddit, by action.')
+
+
+class TokenBucket:
+    """Requests allowed by Reddit until the end of the current rate limit window. Refilled from the rate limit headers
+    after each request.
+    """
+
+    def __init__(self):
+        self.tokens = None  # Unknown until the first response from Reddit
+        self.reset_at = 0
+        self.last_request_at = 0
+
+    def update(self, limits):
+        """Method to refill the bucket from rate limit headers.
+
+        :param limits: dict with `remaining` requests and `reset_timestamp` of the window, as in `reddit.auth.limits`.
+        """
+        remaining, reset_at = limits.get('remaining'), limits.get('reset_timestamp')
+        if remaining is not None and reset_at is not None:
+            self.tokens, self.reset_at = remaining, reset_at
+
+    def delay(self, now=None):
+        """Method to get the time to wait before the next request, so the remaining requests are spread evenly over the
+        rest of the window.
+
+        :param now: Current timestamp
+        :return: Number of seconds to wait
+        """
+        now = time.time() if now is None else now
+        if self.tokens is None or now >= self.reset_at:
+            return 0
+        if self.tokens < 1:
+            return self.reset_at - now
+        return max(0, self.last_request_at + (self.reset_at - now) / self.tokens - now)
+
+    def take(self, now=None):
+        """Method to take a token for a request.
+
+        :param now: Current timestamp
+        """
+        self.last_request_at = time.time() if now is None else now
+        if self.tokens is not None:
+            self.tokens -= 1
+
+
+class Outbox:
+    def __init__(self, path):
+        """Method to open (and create if needed) the outbox file.
+
+        :param path: Path to the sqlite file.
+        """
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                                'action TEXT NOT NULL, thing_id TEXT NOT NULL, body TEXT NOT NULL, '
+                                'attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS idx_next_attempt_at ON outbox (next_attempt_at)')
+        self.lock = threading.Lock()
+
+    def put(self, action, thing_id, body):
+        """Method to add a reply or edit to the outbox, to be posted as soon as possible.
+
+        :param action: `REPLY` or `EDIT`
+        :param thing_id: Fullname of the replyable to reply to, or of the bot's comment to edit
+        :param body: Text of the reply
+        """
+        with self.lock:
+            self.connection.execute('INSERT INTO outbox (action, thing_id, body, next_attempt_at) VALUES (?, ?, ?, ?)',
+                                    (action, thing_id, body, time.time()))
+
+    def peek(self, now=None):
+        """Method to get the oldest item due to be posted.
+
+        :param now: Current timestamp
+        :return: tuple of (id, action, thing_id, body, attempts), or None if no item is due.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            return self.connection.execute('SELECT id, action, thing_id, body, attempts FROM outbox '
+                                           'WHERE next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT 1',
+                                           (now,)).fetchone()
+
+    def next_attempt_at(self):
+        """Method to get the time the next item is due.
+
+        :return: Timestamp, or None if the outbox is empty.
+        """
+        with self.lock:
+            return self.connection.execute('SELECT MIN(next_attempt_at) FROM outbox').fetchone()[0]
+
+    def remove(self, item_id):
+        """Method to remove posted (or given up) item.
+
+        :param item_id: Id of the item
+        """
+        with self.lock:
+            self.connection.execute('DELETE FROM outbox WHERE id = ?', (item_id,))
+
+    def retry(self, item_id, delay):
+        """Method to postpone the item.
+
+        :param item_id: Id of the item
+        :param delay: Number of seconds after which the item is posted again
+        """
+        with self.lock:
+            self.connection.execute('UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ? WHERE id = ?',
+                                    (time.time() + delay, item_id))
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+
+def get_ratelimit_delay(e):
+    """Method to get the time Reddit asks to wait for, if the exception is a RATELIMIT error.
+
+    :param e: APIException raised while posting
+    :return: Number of seconds to wait, or None if the exception is not a RATELIMIT error.
+    """
+    for item in getattr(e, 'items', [e]):
+        if getattr(item, 'error_type', None) == 'RATELIMIT':
+            match = RATELIMIT_REGEX.search(str(item.message))
+            if match is None:
+                return 60
+            return int(match['amount']) * (60 if match['unit'] == 'minute' else 1) + 1
+    return None
+
+
+class OutboxDrainer(threading.Thread):
+    """Thread posting the items from the outbox, one at a time, as fast as the Reddit rate limit allows.
+    """
+
+    def __init__(self, reddit, outbox, max_attempts):
+        """
+        :param reddit: The reddit account instance
+        :param outbox: Outbox to drain
+        :param max_attempts: Number of failed attempts after which an item is given up
+        """
+        super().__init__(name='outbox-drainer', daemon=True)
+        self.reddit = reddit
+        self.outbox = outbox
+        self.max_attempts = max_attempts
+        self.bucket = TokenBucket()
+        self.wakeup = threading.Event()
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            item = self.outbox.peek()
+            if item is None:
+                # Woken up earlier by new items and on stop
+                next_attempt_at = self.outbox.next_attempt_at()
+                self.wakeup.wait(None if next_attempt_at is None else max(0, next_attempt_at - time.time()))
+                self.wakeup.clear()
+                continue
+
+            delay = self.bucket.delay()
+            if delay > 0:
+                self.stop_event.wait(delay)
+                continue
+
+            self.post(*item)
+
+    def post(self, item_id, action, thing_id, body, attempts):
+        """Method to post a single item, and remove it from outbox or postpone it depending on the result.
+
+        :param item_id: Id of the item
+        :param action: `REPLY` or `EDIT`
+        :param thing_id: Fullname of the replyable to reply to, or of the bot's comment to edit
+        :param body: Text of the reply
+        :param attempts: Number of previous failed attempts
+        """
+        self.bucket.take()
+        try:
+            thing = self.reddit.comment(thing_id[3:]) if thing_id.startswith('t1_') \
+                else self.reddit.submission(thing_id[3:])
+            with reply_latency.time(action=action):
+                if action == EDIT:
+                    thing.edit(body)
+                else:
+                    thing.reply(body)
+            logger.info(("Updated Reply: " if action == EDIT else "Replied to: ") + thing_id)
+            self.outbox.remove(item_id)
+        except APIException as e:
+            ratelimit_delay = get_ratelimit_delay(e)
+            if ratelimit_delay is None:
+                # Deleted or locked replyable, archived thread etc., posting again would fail the same way
+                logger.error('Dropped ' + action + ' to ' + thing_id + ' : ' + str(e))
+                self.outbox.remove(item_id)
+            else:
+                logger.warning('Rate limited, retrying ' + action + ' to ' + thing_id + ' in ' + str(ratelimit_delay) +
+                               ' seconds')
+                self.outbox.retry(item_id, ratelimit_delay)
+                self.bucket.update({'remaining': 0, 'reset_timestamp': time.time() + ratelimit_delay})
+                return
+        except Exception as e:
+            if attempts + 1 >= self.max_attempts:
+                logger.exception('Dropped ' + action + ' to ' + thing_id + ' after ' + str(attempts + 1) + ' attempts')
+                self.outbox.remove(item_id)
+            else:
+                delay = min(2 ** attempts * 10, MAX_RETRY_DELAY)
+                log = logger.warning if isinstance(e, PrawcoreException) else logger.exception
+                log('Failed to post ' + action + ' to ' + thing_id + ', retrying in ' + str(delay) + ' seconds : ' +
+                    str(e))
+                self.outbox.retry(item_id, delay)
+
+        self.bucket.update(self.reddit.auth.limits)
+
+    def stop(self):
+        """Method to stop the thread after the item being posted. Items left in the outbox are kept for next start.
+        """
+        self.stop_event.set()
+        self.wakeup.set()
+        self.join()
+
+
+class ReplyScheduler:
+    def __init__(self, outbox_path, max_attempts):
+        """Method to create the scheduler. Until it's started, replies are posted directly.
+
+        :param outbox_path: Path to the outbox sqlite file, empty to always post replies directly.
+        :param max_attempts: Number of failed attempts after which an item is given up
+        """
+        self.outbox_path = outbox_path
+        self.max_attempts = max_attempts
+        self.outbox = None
+        self.drainer = None
+
+    def start(self, reddit):
+        """Method to open the outbox and start draining it, including items left from previous run.
+
+        :param reddit: The reddit account instance
+        """
+        if not self.outbox_path:
+            return
+
+        self.outbox = Outbox(self.outbox_path)
+        logger.info('Opened outbox with ' + str(len(self.outbox)) + ' pending items')
+        self.drainer = OutboxDrainer(reddit, self.outbox, self.max_attempts)
+        self.drainer.start()
+
+    def stop(self):
+        """Method to stop draining the outbox. Replies are posted directly after that.
+        """
+        if self.drainer is not None:
+            self.drainer.stop()
+            logger.info('Stopped outbox drainer, ' + str(len(self.outbox)) + ' items left for next start')
+            self.drainer = None
+        self.outbox = None
+
+    def reply(self, replyable, body):
+        """Method to reply to the comment/submission, through the outbox if the scheduler is started.
+
+        :param replyable: The comment/submission on reddit
+        :param body: Text of the reply
+        """
+        self._schedule(REPLY, replyable, body)
+
+    def edit(self, comment, body):
+        """Method to edit bot's comment, through the outbox if the scheduler is started.
+
+        :param comment: The bot's comment on reddit
+        :param body: New text of the comment
+        """
+        self._schedule(EDIT, comment, body)
+
+    def _schedule(self, action, thing, body):
+        """Method to put the item in the outbox and wake up the drainer, or post it directly if not started.
+
+        :param action: `REPLY` or `EDIT`
+        :param thing: The comment/submission on reddit
+        :param body: Text of the reply
+        """
+        outbox, drainer = self.outbox, self.drainer
+        if outbox is None:
+            with reply_latency.time(action=action):
+                if action == EDIT:
+                    thing.edit(body)
+                else:
+                    thing.reply(body)
+            logger.info(("Updated Reply: " if action == EDIT else "Replied to: ") + thing.fullname)
+            return
+
+        outbox.put(action, thing.fullname, body)
+        drainer.wakeup.set()
+        logger.debug('Scheduled ' + action + ' to ' + thing.fullname)
+
+
+def get_reply_scheduler():
+    """Method to create the reply scheduler as configured. Each shard gets its own outbox, so no item is ever posted by
+    two shards.
+
+    :return: ReplyScheduler
+    """
+    outbox_path = config.OUTBOX_PATH
+    if outbox_path and config.SHARD_COUNT > 1:
+        outbox_path += '.' + str(config.SHARD_INDEX)
+    return ReplyScheduler(outbox_path, config.OUTBOX_MAX_ATTEMPTS)
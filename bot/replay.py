@@ -0,0 +1,277 @@
+"""Module used to record replyables from the live streams, and replay them through the worker against a fake Reddit.
+
+Recording saves each replyable (fullname, body/title, author, author's flair, creation time) as a line of JSON. For
+comments that look like update requests, their parent and grandparent are saved too, as only update requests need the
+comment tree.
+
+Replay feeds the recorded replyables to `worker.process_replyable` with a `FakeReddit` instead of an account, so replies
+and edits are only recorded in memory and no credentials are needed. Replyables are fed at the recorded pace multiplied
+by `speed` (0 to feed them as fast as possible), and the report has the throughput and per replyable latency
+percentiles. Classification, cache and db are the real ones, as configured, so their changes can be measured offline.
+
+Usage (from repository root):
+    python -m bot.replay record <output path> [--limit N]
+    python -m bot.replay replay <recording path> [--speed X] [--keep-ids]
+"""
+
+import argparse
+import itertools
+import json
+import time
+import uuid
+
+import config
+from bot.classifier import get_replyable_text, is_comment, parse_text
+
+__author__ = 'MePsyDuck'
+
+
+class FakeThing:
+    """Comment or submission of the fake Reddit. Replies and edits are recorded by the fake Reddit it belongs to.
+    """
+
+    def __init__(self, reddit, fullname, author=None, author_flair_css_class=None, created_utc=0.0, body=None,
+                 title=None, parent=None):
+        self.reddit = reddit
+        self.fullname = fullname
+        self.id = fullname[3:]
+        self.author = author
+        self.author_flair_css_class = author_flair_css_class
+        self.created_utc = created_utc
+        self.body = body
+        self.title = title
+        self._parent = parent
+
+    def parent(self):
+        if self._parent is None:
+            raise LookupError('Parent of ' + self.fullname + ' was not recorded')
+        return self._parent
+
+    def reply(self, body):
+        self.reddit.replies.append((self.fullname, body))
+        return FakeThing(self.reddit, 't1_reply' + str(len(self.reddit.replies)), author=self.reddit.username,
+                         body=body, parent=self)
+
+    def edit(self, body):
+        self.reddit.edits.append((self.fullname, body))
+        self.body = body
+
+
+class FakeRedditor:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeUser:
+    def __init__(self, name):
+        self._me = FakeRedditor(name)
+
+    def me(self):
+        return self._me
+
+
+class FakeAuth:
+    # Same as PRAW before the first request, so the outbox drainer never waits
+    limits = {'remaining': None, 'reset_timestamp': None, 'used': None}
+
+
+class FakeReddit:
+    """Reddit instance that keeps replies and edits in memory instead of posting them.
+    """
+
+    def __init__(self, username=None):
+        """
+        :param username: Name of the bot's account, as recorded in parents of update requests. Defaults to the
+        configured username.
+        """
+        self.username = username or config.USERNAME or 'Dota2_Responses_Bot'
+        self.user = FakeUser(self.username)
+        self.auth = FakeAuth()
+        self.replies = []  # list of (fullname, body) tuples
+        self.edits = []  # list of (fullname, body) tuples
+        self.things = {}
+
+    def comment(self, id):
+        return self.things.get('t1_' + id) or FakeThing(self, 't1_' + id)
+
+    def submission(self, id):
+        return self.things.get('t3_' + id) or FakeThing(self, 't3_' + id)
+
+
+def serialize_replyable(replyable, parent_depth=0):
+    """Method to get the recorded fields of the replyable.
+
+    :param replyable: The comment/submission on reddit
+    :param parent_depth: Number of parents to record
+    :return: dict of recorded fields
+    """
+    item = {'fullname': replyable.fullname,
+            'created_utc': replyable.created_utc,
+            'author': str(replyable.author) if replyable.author is not None else None,
+            'author_flair_css_class': replyable.author_flair_css_class,
+            'body' if is_comment(replyable) else 'title': get_replyable_text(replyable)}
+    if parent_depth and is_comment(replyable):
+        item['parent'] = serialize_replyable(replyable.parent(), parent_depth - 1)
+    return item
+
+
+def deserialize_replyable(reddit, item):
+    """Method to create fake replyable (and its recorded parents) from recorded fields.
+
+    :param reddit: FakeReddit the replyable belongs to
+    :param item: dict of recorded fields
+    :return: FakeThing
+    """
+    parent = deserialize_replyable(reddit, item['parent']) if item.get('parent') else None
+    thing = FakeThing(reddit, item['fullname'], author=item.get('author'),
+                      author_flair_css_class=item.get('author_flair_css_class'), created_utc=item['created_utc'],
+                      body=item.get('body'), title=item.get('title'), parent=parent)
+    reddit.things[thing.fullname] = thing
+    return thing
+
+
+def record(reddit, path, limit=None):
+    """Method to append replyables from the comment and submission streams of the configured subreddits to the file.
+
+    :param reddit: The reddit account instance
+    :param path: Path to the JSON lines file
+    :param limit: Number of replyables to record, None to record until interrupted.
+    :return: Number of recorded replyables
+    """
+    from util.sharding import get_shard_subreddits
+
+    subreddit = reddit.subreddit('+'.join(get_shard_subreddits()))
+    streams = [subreddit.stream.comments(pause_after=-1), subreddit.stream.submissions(pause_after=-1)]
+
+    count = 0
+    with open(path, 'a', encoding='utf-8') as recording:
+        try:
+            for stream in itertools.cycle(streams):
+                for replyable in stream:
+                    if replyable is None:
+                        break
+                    is_update_request = is_comment(replyable) and \
+                        parse_text(get_replyable_text(replyable)).body.startswith(config.UPDATE_REQUEST_KEYWORD)
+                    recording.write(json.dumps(serialize_replyable(replyable, 2 if is_update_request else 0)) + '\n')
+                    recording.flush()
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return count
+        except KeyboardInterrupt:
+            return count
+
+
+def load_recording(reddit, path, unique_ids=True):
+    """Method to load recorded replyables, ordered by creation time.
+
+    :param reddit: FakeReddit the replyables belong to
+    :param path: Path to the JSON lines file
+    :param unique_ids: Make fullnames unique for this replay, so replyables are not skipped as already processed in the
+    cache by previous replays.
+    :return: list of FakeThing
+    """
+    run_id = uuid.uuid4().hex[:8]
+    replyables = []
+    with open(path, encoding='utf-8') as recording:
+        for line in recording:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if unique_ids:
+                item['fullname'] += '_' + run_id
+            replyables.append(deserialize_replyable(reddit, item))
+    return sorted(replyables, key=lambda replyable: replyable.created_utc)
+
+
+def percentile(sorted_values, percent):
+    """Method to get the percentile (nearest rank) of sorted values.
+
+    :param sorted_values: Sorted list of values
+    :param percent: Percentile, 0-100
+    :return: The value, 0 if there are no values
+    """
+    if not sorted_values:
+        return 0
+    rank = max(1, round(percent / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def replay(replyables, reddit, process, speed=0):
+    """Method to feed the replyables one by one to `process`, at the recorded pace multiplied by `speed`.
+    Creation time of each replyable is changed to the time it's scheduled at, so stream lag metrics show how far behind
+    the schedule processing is.
+
+    :param replyables: list of FakeThing, ordered by creation time
+    :param reddit: FakeReddit the replyables belong to
+    :param process: Method processing a replyable, called with reddit and replyable
+    :param speed: Multiplier of the recorded pace, 0 to feed replyables as fast as possible
+    :return: dict with number of replyables, elapsed seconds, replyables per second and latency percentiles (seconds)
+    """
+    latencies = []
+    start = time.time()
+    first_created = replyables[0].created_utc if replyables else 0
+
+    for replyable in replyables:
+        scheduled_at = start + (replyable.created_utc - first_created) / speed if speed else start
+        delay = scheduled_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        replyable.created_utc = scheduled_at
+
+        processing_start = time.perf_counter()
+        process(reddit, replyable)
+        latencies.append(time.perf_counter() - processing_start)
+
+    elapsed = time.time() - start
+    latencies.sort()
+    return {'replyables': len(replyables),
+            'elapsed': elapsed,
+            'per_second': len(replyables) / elapsed if elapsed else 0,
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1] if latencies else 0,
+            'replies': len(reddit.replies),
+            'edits': len(reddit.edits)}
+
+
+def print_report(report):
+    """Method to print the replay report.
+
+    :param report: dict returned by `replay`
+    """
+    print('{replyables} replyables in {elapsed:.2f} s : {per_second:,.1f} replyables/s'.format(**report))
+    print('latency p50 {:.3f} ms, p90 {:.3f} ms, p99 {:.3f} ms, max {:.3f} ms'.format(
+        *(report[key] * 1000 for key in ('p50', 'p90', 'p99', 'max'))))
+    print('{replies} replies, {edits} edits'.format(**report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record replyables from Reddit, or replay them against fake Reddit.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record_parser = subparsers.add_parser('record', help='record replyables from the configured subreddits')
+    record_parser.add_argument('path', help='JSON lines file the replyables are appended to')
+    record_parser.add_argument('--limit', type=int, default=None, help='number of replyables to record')
+    replay_parser = subparsers.add_parser('replay', help='replay recorded replyables through the worker')
+    replay_parser.add_argument('path', help='JSON lines file with recorded replyables')
+    replay_parser.add_argument('--speed', type=float, default=0,
+                               help='multiplier of the recorded pace, 0 (default) for as fast as possible')
+    replay_parser.add_argument('--keep-ids', action='store_true',
+                               help='keep recorded fullnames, so replyables already in cache are skipped')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        from bot import account
+
+        print('Recorded ' + str(record(account.get_account(), args.path, args.limit)) + ' replyables')
+    else:
+        # Imported here, as worker opens the cache and db
+        from bot import worker
+
+        reddit = FakeReddit()
+        replyables = load_recording(reddit, args.path, unique_ids=not args.keep_ids)
+        print_report(replay(replyables, reddit, worker.process_replyable, args.speed))
+
+
+if __name__ == '__main__':
+    main()
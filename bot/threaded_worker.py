@@ -0,0 +1,169 @@
+"""Producer/consumer mode of the bot.
+
+Comment and submission streams are read by separate threads (producers) which put new replyables in a bounded queue.
+A pool of worker threads (consumers) takes replyables from the queue, classifies them and posts the replies, so slow
+replies to Reddit do not delay reading new comments/submissions from streams.
+
+When the queue is full, stream readers wait for free space (backpressure). On shutdown the stream readers are stopped
+first, then the workers finish the replyables left in the queue before exiting. Replies not posted yet are kept in the
+outbox for next start.
+
+PRAW is not thread safe, so all the threads share a single Reddit instance that makes one request at a time (see
+`account.get_shared_account`). Comments/submissions are lazy objects tied to the instance they came from, so giving each
+thread its own instance would not keep their requests apart.
+"""
+
+import queue
+import threading
+
+from praw.exceptions import APIException
+from prawcore import ServerError
+
+import config
+from bot import account
+from bot.worker import install_reload_handler, process_replyable, reply_scheduler
+from util.fuzzy_index import fuzzy_index
+from util.logger import logger
+from util.response_index import response_index
+from util.sharding import get_shard_subreddits
+
+__author__ = 'MePsyDuck'
+
+# Put in the queue once for each worker thread to stop it
+_STOP = object()
+
+
+class StreamReader(threading.Thread):
+    """Thread reading a single subreddit stream (comments or submissions) and putting new replyables in the queue.
+    """
+
+    def __init__(self, name, stream_factory, replyable_queue, stop_event):
+        """
+        :param name: Name of the thread, used in logs
+        :param stream_factory: Callable returning a new stream. Streams need to be re-obtained when they throw exception.
+        :param replyable_queue: Queue to put the replyables in
+        :param stop_event: Event set when the reader should stop
+        """
+        super().__init__(name=name, daemon=True)
+        self.stream_factory = stream_factory
+        self.replyable_queue = replyable_queue
+        self.stop_event = stop_event
+
+    def run(self):
+        stream = self.stream_factory()
+        while not self.stop_event.is_set():
+            try:
+                for replyable in stream:
+                    if self.stop_event.is_set():
+                        break
+                    if replyable is not None:
+                        self.put(replyable)
+            except ServerError as e:
+                stream = self.stream_factory()
+                logger.critical("Reddit server is down : " + str(e))
+                self.stop_event.wait(120)
+            except APIException as e:
+                stream = self.stream_factory()
+                logger.critical("API Exception occurred : " + str(e))
+                self.stop_event.wait(60)
+
+    def put(self, replyable):
+        """Method to put replyable in the queue. Blocks while the queue is full, unless the reader is stopped.
+
+        :param replyable: The comment/submission on reddit
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.replyable_queue.put(replyable, timeout=1)
+                return
+            except queue.Full:
+                logger.debug(self.name + ' waiting for free space in queue')
+
+
+class ReplyWorker(threading.Thread):
+    """Thread taking replyables from the queue and processing them until it gets the stop marker.
+    """
+
+    def __init__(self, name, reddit, replyable_queue):
+        """
+        :param name: Name of the thread, used in logs
+        :param reddit: The reddit account instance
+        :param replyable_queue: Queue to take the replyables from
+        """
+        super().__init__(name=name)
+        self.reddit = reddit
+        self.replyable_queue = replyable_queue
+
+    def run(self):
+        while True:
+            replyable = self.replyable_queue.get()
+            try:
+                if replyable is _STOP:
+                    return
+                process_replyable(self.reddit, replyable)
+            except APIException as e:
+                logger.critical("API Exception occurred : " + str(e))
+            except Exception:
+                logger.exception('Failed to process replyable : ' + replyable.fullname)
+            finally:
+                self.replyable_queue.task_done()
+
+
+def work():
+    """Main method executing the script in producer/consumer mode.
+
+    Starts one stream reader thread for comments and one for submissions, and `WORKER_THREADS` worker threads sharing a
+    queue of `WORKER_QUEUE_SIZE` replyables. Runs until interrupted, then shuts down the threads in order.
+    """
+    reddit = account.get_shared_account()
+    # Resolved once, before any replyable is processed
+    logger.info('Connected to Reddit account : ' + account.get_identity(reddit).name)
+
+    response_index.load()
+    if config.FUZZY_MATCH_THRESHOLD:
+        fuzzy_index.load()
+    config.load_excluded_responses()
+    install_reload_handler()
+    reply_scheduler.start(reddit)
+
+    replyable_queue = queue.Queue(maxsize=config.WORKER_QUEUE_SIZE)
+    stop_event = threading.Event()
+
+    subreddit = reddit.subreddit('+'.join(get_shard_subreddits()))
+    readers = [StreamReader('comments-reader', lambda: subreddit.stream.comments(pause_after=-1),
+                            replyable_queue, stop_event),
+               StreamReader('submissions-reader', lambda: subreddit.stream.submissions(pause_after=-1),
+                            replyable_queue, stop_event)]
+    workers = [ReplyWorker('reply-worker-' + str(i), reddit, replyable_queue) for i in range(config.WORKER_THREADS)]
+
+    for thread in workers + readers:
+        thread.start()
+
+    try:
+        while all(reader.is_alive() for reader in readers):
+            stop_event.wait(1)
+    finally:
+        shutdown(readers, workers, replyable_queue, stop_event)
+
+
+def shutdown(readers, workers, replyable_queue, stop_event):
+    """Method to stop the threads in order: stream readers first, then workers after they process the queued replyables,
+    and the outbox drainer last.
+
+    :param readers: Stream reader threads
+    :param workers: Worker threads
+    :param replyable_queue: Queue shared by readers and workers
+    :param stop_event: Event used to stop the readers
+    """
+    logger.info('Stopping stream readers')
+    stop_event.set()
+    for reader in readers:
+        reader.join()
+
+    logger.info('Waiting for workers to process ' + str(replyable_queue.qsize()) + ' queued replyables')
+    for _ in workers:
+        replyable_queue.put(_STOP)
+    for worker in workers:
+        worker.join()
+
+    reply_scheduler.stop()
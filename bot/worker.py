@@ -4,24 +4,37 @@ The main body of the script is running in this file. The comments are loaded fro
 and the script checks if the comment or submission is a response from Dota 2. If it is, a proper reply for response is
 prepared. The response is posted as a reply to the original comment/submission on Reddit.
 """
+import signal
 import time
 
 from praw.exceptions import APIException
-from praw.models import Comment
 from prawcore import ServerError
 
 import config
 from bot import account
+from bot.classifier import Classifier, Decision, get_quoted_text, get_processed_text, get_replyable_text, parse_text
+from bot.outbox import get_reply_scheduler
 from util.caching import get_cache_api
-from util.database.database import db_api
+from util.fuzzy_index import fuzzy_index
+from util.hero_resolver import hero_resolver
 from util.logger import logger
-from util.response_info import ResponseInfo
-from util.str_utils import preprocess_text
+from util.metrics import metrics
+from util.reply_renderer import reply_renderer
+from util.response_index import response_index
+from util.sharding import get_shard_subreddits
 
 __author__ = 'Jonarzz'
 __maintainer__ = 'MePsyDuck'
 
 cache_api = get_cache_api()
+replyable_classifier = Classifier()
+reply_scheduler = get_reply_scheduler()
+
+# Stream lag buckets, in seconds
+LAG_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+stream_lag = metrics.histogram('bot_stream_lag_seconds', 'Time between creation of new replyables and their processing.',
+                               LAG_BUCKETS)
+classifications = metrics.counter('bot_classifications_total', 'Classified replyables, by decision.')
 
 
 def work():
@@ -32,19 +45,24 @@ def work():
     """
 
     reddit = account.get_account()
-    logger.info('Connected to Reddit account : ' + config.USERNAME)
+    # Resolved once, before any replyable is processed
+    logger.info('Connected to Reddit account : ' + account.get_identity(reddit).name)
+
+    response_index.load()
+    if config.FUZZY_MATCH_THRESHOLD:
+        fuzzy_index.load()
+    config.load_excluded_responses()
+    install_reload_handler()
+
+    # Replies are posted by a separate thread, so rate limiting never stops reading the streams. PRAW is not thread safe,
+    # so the thread gets its own Reddit instance.
+    reply_scheduler.start(account.get_account())
 
     comment_stream, submission_stream = get_reddit_stream(reddit)
     while True:
         try:
-            for comment in comment_stream:
-                if comment is None:
-                    break
-                process_replyable(reddit, comment)
-            for submission in submission_stream:
-                if submission is None:
-                    break
-                process_replyable(reddit, submission)
+            process_replyables(reddit, take_batch(comment_stream))
+            process_replyables(reddit, take_batch(submission_stream))
         except ServerError as e:
             comment_stream, submission_stream = get_reddit_stream(reddit)
             logger.critical("Reddit server is down : " + str(e))
@@ -55,6 +73,22 @@ def work():
             time.sleep(60)
 
 
+def install_reload_handler():
+    """Method to make the bot reload responses and heroes from db on SIGHUP.
+    Responses and heroes are repopulated by a separate process, SIGHUP makes the bot pick them up without restarting.
+    Needs to be called from the main thread.
+    """
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: reload_responses())
+
+
+def reload_responses():
+    """Method to mark responses and heroes as stale, so they're loaded again from db on next lookup.
+    """
+    response_index.invalidate()
+    hero_resolver.invalidate()
+
+
 def get_reddit_stream(reddit):
     """Returns the comment and submission stream.
     Streams need to be restarted/re-obtained when they throw exception.
@@ -62,11 +96,57 @@ def get_reddit_stream(reddit):
     :param reddit: The reddit account instance
     :return: The comment and subreddit stream
     """
-    comment_stream = reddit.subreddit(config.SUBREDDIT).stream.comments(pause_after=-1)
-    submission_stream = reddit.subreddit(config.SUBREDDIT).stream.submissions(pause_after=-1)
+    comment_stream = reddit.subreddit('+'.join(get_shard_subreddits())).stream.comments(pause_after=-1)
+    submission_stream = reddit.subreddit('+'.join(get_shard_subreddits())).stream.submissions(pause_after=-1)
     return comment_stream, submission_stream
 
 
+def take_batch(stream, max_size=100):
+    """Method to take replyables from the stream until it is paused (no new replyables) or `max_size` are taken.
+    PRAW returns at most 100 replyables per request, so the batch is usually all new replyables from one request.
+
+    :param stream: The comment/submission stream, with `pause_after` set
+    :param max_size: Max number of replyables in the batch
+    :return: list of replyables
+    """
+    batch = []
+    for replyable in stream:
+        if replyable is None:
+            break
+        batch.append(replyable)
+        if len(batch) >= max_size:
+            break
+    return batch
+
+
+def process_replyables(reddit, replyables):
+    """Method used to process a batch of replyables. Same as `process_replyable`, but the cache is checked for the whole
+    batch at once, e.g. the initial ~100 replyables after restart are checked in a single request to redis cache.
+    The whole batch is added to the cache before processing, so a replyable that fails is logged and the rest of the
+    batch is still processed. The first error is raised after that, so the caller can back off.
+
+    :param reddit: The reddit account instance
+    :param replyables: list of comments/submissions
+    :return: None
+    """
+    if not replyables:
+        return
+
+    error = None
+    processed = cache_api.exists_many([replyable.fullname for replyable in replyables])
+    for replyable, is_processed in zip(replyables, processed):
+        if is_processed:
+            continue
+        try:
+            handle_replyable(reddit, replyable)
+        except (ServerError, APIException) as e:
+            logger.error('Failed to process replyable ' + replyable.fullname + ' : ' + str(e))
+            error = error or e
+
+    if error is not None:
+        raise error
+
+
 def process_replyable(reddit, replyable):
     """Method used to check all the comments in a submission and add replies if they are responses.
 
@@ -90,27 +170,39 @@ def process_replyable(reddit, replyable):
     if cache_api.exists(thing_id=replyable.fullname):
         return
 
+    handle_replyable(reddit, replyable)
+
+
+def handle_replyable(reddit, replyable):
+    """Method used to add reply to a new replyable (not in cache), if it is a response.
+
+    :param reddit: The reddit account instance
+    :param replyable: comment or submission
+    :return: None
+    """
+    identity = account.get_identity(reddit)
+
     # Ignore thyself
-    if replyable.author == reddit.user.me():
+    if identity.is_bot(replyable.author):
         return
 
     logger.info("Found new replyable: " + replyable.fullname)
+    stream_lag.observe(time.time() - replyable.created_utc)
 
-    processed_text = process_text(replyable.body if isinstance(replyable, Comment) else replyable.title)
+    classification = replyable_classifier.classify(reddit, replyable, identity=identity)
+    decision = classification.decision
+    classifications.inc(decision=decision.value)
 
-    # TODO make use of assignment expression for all below
-    if is_excluded_response(processed_text):
-        pass
-    elif is_custom_response(processed_text):
-        add_custom_reply(replyable, processed_text)
-    elif (response_info := is_hero_specific_response(processed_text)) is not None:
-        add_hero_specific_reply(replyable, response_info)
-    elif (response_info := is_flair_specific_response(replyable, processed_text)) is not None:
-        add_flair_specific_reply(replyable, response_info)
-    elif (response_info := is_update_request(reddit, replyable, processed_text)) is not None:
-        update_reply(replyable, response_info)
-    elif (response_info := is_hero_response(processed_text)) is not None:
-        add_regular_reply(replyable, response_info)
+    if decision == Decision.CUSTOM:
+        add_custom_reply(replyable, get_processed_text(classification.parsed))
+    elif decision == Decision.HERO_SPECIFIC:
+        add_hero_specific_reply(replyable, classification.response_info)
+    elif decision == Decision.FLAIR_SPECIFIC:
+        add_flair_specific_reply(replyable, classification.response_info)
+    elif decision == Decision.UPDATE:
+        update_reply(replyable, classification.response_info, classification.comment_tree)
+    elif decision in (Decision.REGULAR, Decision.FUZZY, Decision.PARTIAL):
+        add_regular_reply(replyable, classification.response_info)
 
 
 def process_text(text):
@@ -120,47 +212,7 @@ def process_text(text):
     :param text: The replyable body/title text
     :return: Processed text
     """
-    hero_name = None
-    if '>' in text:
-        text = get_quoted_text(text)
-    if '::' in text:
-        hero_name, text = text.split('::', 1)
-        hero_name = hero_name.strip() + '::'
-
-    return (hero_name or '') + preprocess_text(text)
-
-
-def get_quoted_text(text):
-    """Method used to get quoted text.
-    If body/title text contains a quote, the first quote is considered as the text.
-
-    :param text: The replyable text
-    :return: The first quote in the text. If no quotes are found, then the entire text is returned
-    """
-    lines = text.split('\n\n')
-    for line in lines:
-        if line.startswith('>'):
-            return line[1:]
-    return text
-
-
-def is_excluded_response(text):
-    """Method to check if the given body/title is in excluded responses set.
-    Also return False for single word text (they're mostly common phrases).
-
-    :param text: The processed body/title text
-    :return: True if text is an excluded response, else False
-    """
-    return ' ' not in text or text in config.EXCLUDED_RESPONSES
-
-
-def is_custom_response(text):
-    """Method to check if given body/title text is in custom response set.
-
-    :param text: The body/title text
-    :return: True if text is a custom response, else False
-    """
-    return text in config.CUSTOM_RESPONSES
+    return get_processed_text(parse_text(text))
 
 
 def add_custom_reply(replyable, body):
@@ -170,32 +222,17 @@ def add_custom_reply(replyable, body):
     :param body: The processed body/title text
     :return: None
     """
-    custom_response = config.CUSTOM_RESPONSES[body]
-    original_text = replyable.body if isinstance(replyable, Comment) else replyable.title
-
-    reply = custom_response.format(original_text, config.COMMENT_ENDING)
-    replyable.reply(reply)
-    logger.info("Replied to: " + replyable.fullname)
+    reply_scheduler.reply(replyable, create_custom_reply(replyable, body))
 
 
-def is_hero_specific_response(text):
-    """Method that checks if response for specified hero name and text exists.
+def create_custom_reply(replyable, body):
+    """Method that creates a custom reply in reddit format.
 
-    :param text: The processed body/title text
-    :return: ResponseInfo containing hero_id and link for response if the response for specified hero was found, otherwise None
+    :param replyable: The comment/submission on reddit
+    :param body: The processed body/title text
+    :return: The text for the comment reply.
     """
-    if '::' in text:
-        hero_name, text = text.split('::', 1)
-
-        if not hero_name or not text:
-            return None
-
-        hero_id = db_api.get_hero_id_by_name(hero_name=hero_name)
-        if hero_id:
-            link, _ = db_api.get_link_for_response(processed_text=text, hero_id=hero_id)
-            if link:
-                return ResponseInfo(hero_id=hero_id, link=link)
-    return None
+    return reply_renderer.render_custom(get_replyable_text(replyable), body)
 
 
 def add_hero_specific_reply(replyable, response_info):
@@ -208,21 +245,6 @@ def add_hero_specific_reply(replyable, response_info):
     create_and_add_reply(replyable=replyable, response_url=response_info.link, hero_id=response_info.hero_id)
 
 
-def is_flair_specific_response(replyable, text):
-    """Method that checks if response for hero in author's flair and text exists.
-
-    :param replyable: The comment/submission on reddit
-    :param text: The processed body/title text
-    :return: ResponseInfo containing hero_id and link for response if the response for author's flair's hero was found, otherwise None
-    """
-    hero_id = db_api.get_hero_id_by_flair_css(flair_css=replyable.author_flair_css_class)
-    if hero_id:
-        link, _ = db_api.get_link_for_response(processed_text=text, hero_id=hero_id)
-        if link:
-            return ResponseInfo(hero_id=hero_id, link=link)
-    return None
-
-
 def add_flair_specific_reply(replyable, response_info):
     """Method to add a author's flair specific reply to the comment/submission.
 
@@ -233,166 +255,86 @@ def add_flair_specific_reply(replyable, response_info):
     create_and_add_reply(replyable=replyable, response_url=response_info.link, hero_id=response_info.hero_id)
 
 
-def is_update_request(reddit, replyable, text):
-    """Method to check whether the comment is a request to update existing response.
-    Only works if
-    * Comment begins with "try"
-    * Comment ends with valid hero name
-    * Given hero has the original response
-    * Root/Original comment/submission was not hero specific response.
-
-    Examples:
-    "Try legion commander" : Valid
-    "Try leGiOn ComManDer" : Valid - case does not matter
-    "legion commander" : Invalid - does not begin with `try`
-    "Try legion" : Invalid - invalid hero name
-
-    :param reddit: The reddit account instance
-    :param replyable: The comment/submission on reddit
-    :param text: The processed body/title text
-    :return: ResponseInfo containing hero_id and link for response if this is a valid update request, otherwise None
-    """
-
-    if not text.startswith(config.UPDATE_REQUEST_KEYWORD):
-        return None
-
-    if not validate_update_request_comment_tree(reddit, replyable):
-        return None
-
-    hero_name = text.replace(config.UPDATE_REQUEST_KEYWORD, '', 1)
-    hero_id = db_api.get_hero_id_by_name(hero_name=hero_name)
-    if hero_id is None:
-        return None
-
-    root_replyable = replyable.parent().parent()
-    processed_text = process_text(root_replyable.body if isinstance(root_replyable, Comment) else root_replyable.title)
-
-    if is_hero_specific_response(processed_text):
-        return None
-
-    link, _ = db_api.get_link_for_response(processed_text=processed_text, hero_id=hero_id)
-
-    if link is None:
-        return None
-
-    return ResponseInfo(hero_id=hero_id, link=link)
-
-
-def validate_update_request_comment_tree(reddit, replyable):
-    """Method to check whether the comment in the request to update existing response is valid.
-    A valid comment tree is when:
-    * Comment was made as a reply to bot's comment
-    * Comment was added by OP, who made the original request(Response/Comment) for the response.
-
-    The comment tree should look something like below, where root(original) replyable can be Comment or Submission.
-    Only valid case is c3.
-    c1/s1 user: Foo
-        c2 bot: "Foo" response by Bar hero
-           c3 user: Try Bar2
-           c4 other_user: Try Bar2
+def update_reply(replyable, response_info, comment_tree=None):
+    """Method to edit and update existing response comment by the bot with a new hero as requested.
 
-    :param reddit: The reddit account instance
     :param replyable: The comment/submission on reddit
-    :return: True if this is a valid comment tree, else False
+    :param response_info: ResponseInfo containing hero_id and link for response
+    :param comment_tree: CommentTree of the replyable, if already fetched while classifying the replyable
+    :return: None
     """
-    if not isinstance(replyable, Comment):
-        return False
-
-    op = replyable.author
-    parent_comment = replyable.parent()
-
-    if not isinstance(parent_comment, Comment):
-        return False
+    if comment_tree is None:
+        bot_comment = replyable.parent()
+        root_replyable = bot_comment.parent()
+    else:
+        bot_comment, root_replyable = comment_tree
 
-    if not parent_comment.author == reddit.user.me():
-        return False
+    reply_scheduler.edit(bot_comment, create_update_reply(root_replyable, response_info))
 
-    root_replyable = parent_comment.parent()
 
-    if not root_replyable.author == op:
-        return False
+def create_update_reply(root_replyable, response_info):
+    """Method that creates the updated reply in reddit format, for the original comment/submission.
 
-    return True
-
-
-def update_reply(replyable, response_info):
-    """Method to edit and update existing response comment by the bot with a new hero as requested.
-
-    :param replyable: The comment/submission on reddit
+    :param root_replyable: The original comment/submission on reddit, that bot replied to
     :param response_info: ResponseInfo containing hero_id and link for response
-    :return: None
+    :return: The text for the comment reply.
     """
-    bot_comment = replyable.parent()
-    root_replyable = bot_comment.parent()
-
     # TODO maybe get original text from bot's command, rather than the original post, as it might be edited by the time this command is called
-    original_text = root_replyable.body if isinstance(root_replyable, Comment) else root_replyable.title
-    original_text = original_text.strip()
+    original_text = get_replyable_text(root_replyable).strip()
 
     if '>' in original_text:
         original_text = get_quoted_text(original_text).strip()
 
-    # Getting name with Proper formatting
-    hero_name = db_api.get_hero_name(response_info.hero_id)
-
-    reply = "[{}]({}) (sound warning: {}){}".format(original_text, response_info.link, hero_name, config.COMMENT_ENDING)
-    bot_comment.edit(reply)
-
-    logger.info("Updated Reply: " + replyable.fullname)
+    return reply_renderer.render(original_text, response_info.link, response_info.hero_id)
 
 
-def is_hero_response(text):
+def add_regular_reply(replyable, response_info):
     """Method to create response for given replyable.
     In case of multiple matches, it used to sort responses in descending order of heroes and get the first one,
     but now it's random.
 
-    :param text: The processed body/title text
-    :return: ResponseInfo containing hero_id and link for response if this is a valid update request, otherwise None
+    :param replyable: The comment/submission on reddit
+    :param response_info: ResponseInfo containing hero_id and link for response
+    :return: None
     """
+    create_and_add_reply(replyable=replyable, response_url=response_info.link, hero_id=response_info.hero_id,
+                         response_text=response_info.response_text)
 
-    link, hero_id = db_api.get_link_for_response(processed_text=text)
-
-    if link and hero_id:
-        return ResponseInfo(hero_id=hero_id, link=link)
-
-    return None
 
-
-def add_regular_reply(replyable, response_info):
-    """Method to create response for given replyable.
-    In case of multiple matches, it used to sort responses in descending order of heroes and get the first one,
-    but now it's random.
+def create_and_add_reply(replyable, response_url, hero_id, response_text=None):
+    """Method that creates a reply in reddit format and adds the reply to comment/submission.
 
     :param replyable: The comment/submission on reddit
-    :param response_info: ResponseInfo containing hero_id and link for response
+    :param response_url: The url to the response audio file
+    :param hero_id: The hero_id to which the response belongs to.
+    :param response_text: Text of the response if only a part of replyable text matched it.
     :return: None
     """
-    create_and_add_reply(replyable=replyable, response_url=response_info.link, hero_id=response_info.hero_id)
+    reply_scheduler.reply(replyable, create_reply(replyable, response_url, hero_id, response_text))
 
 
-def create_and_add_reply(replyable, response_url, hero_id):
-    """Method that creates a reply in reddit format and adds the reply to comment/submission.
+def create_reply(replyable, response_url, hero_id, response_text=None):
+    """Method that creates a reply in reddit format.
     The reply consists of a link to the response audio file, the response itself, a warning about the sound
     and an ending added from the config file (post footer).
-    
+
     Image is currently ignored due to new reddit redesign not rendering flairs properly.
 
     :param replyable: The comment/submission on reddit
     :param response_url: The url to the response audio file
     :param hero_id: The hero_id to which the response belongs to.
+    :param response_text: Text of the response if only a part of replyable text matched it, used instead of the
+    replyable text.
     :return: The text for the comment reply.
     """
-    original_text = replyable.body if isinstance(replyable, Comment) else replyable.title
-    original_text = original_text.strip()
-
-    if '>' in original_text:
-        original_text = get_quoted_text(original_text).strip()
-    if '::' in original_text:
-        original_text = original_text.split('::', 1)[1].strip()
-
-    hero_name = db_api.get_hero_name(hero_id)
+    if response_text is not None:
+        original_text = response_text.capitalize()
+    else:
+        original_text = get_replyable_text(replyable).strip()
 
-    reply = "[{}]({}) (sound warning: {}){}".format(original_text, response_url, hero_name, config.COMMENT_ENDING)
-    replyable.reply(reply)
+        if '>' in original_text:
+            original_text = get_quoted_text(original_text).strip()
+        if '::' in original_text:
+            original_text = original_text.split('::', 1)[1].strip()
 
-    logger.info("Replied to: " + replyable.fullname)
+    return reply_renderer.render(original_text, response_url, hero_id)
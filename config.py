@@ -1,6 +1,7 @@
 """Module in which the constants that are used by Dota Responses Bot are declared."""
 import os
-from util.response_request import request_cargo_set
+
+from util.response_request import CargoSets
 
 __author__ = 'Jonarzz'
 __maintainer__ = 'MePsyDuck'
@@ -11,33 +12,68 @@ CLIENT_SECRET = os.environ.get('CLIENT_SECRET')
 
 # Account config
 USER_AGENT = 'Python:dota2_responses_bot:v3.0 by /u/Jonarz, maintained by /u/MePsyDuck'
-SUBREDDIT = os.environ.get('SUBREDDIT', 'dota2')
+SUBREDDIT = os.environ.get('SUBREDDIT', 'dota2')  # comma separated in case of multiple subreddits
+SUBREDDITS = [subreddit.strip() for subreddit in SUBREDDIT.split(',')]
 USERNAME = os.environ.get('REDDIT_USERNAME')
 PASSWORD = os.environ.get('REDDIT_PASSWORD')
 
+# Worker config
+WORKER_MODE = os.environ.get('WORKER_MODE', 'sequential')  # valid choices : sequential, threaded, async
+WORKER_THREADS = int(os.environ.get('WORKER_THREADS', 4))  # number of threads posting replies in threaded mode
+WORKER_QUEUE_SIZE = int(os.environ.get('WORKER_QUEUE_SIZE', 100))  # max replyables waiting for workers/tasks
+WORKER_PROCESSES = int(os.environ.get('WORKER_PROCESSES', 1))  # number of shards run as processes on this host
+OUTBOX_PATH = os.environ.get('OUTBOX_PATH', os.path.join(os.getcwd(), 'outbox.db'))  # empty to post replies directly
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 10))  # failed attempts after which a reply is dropped
+
+# Sharding config, subreddits are split between shards running on one or more hosts
+SHARD_COUNT = int(os.environ.get('SHARD_COUNT', 1))  # total number of shards across all hosts
+SHARD_INDEX = int(os.environ.get('SHARD_INDEX', 0))  # index of (first) shard run on this host, 0 based
+
 # Parser config
 URL_DOMAIN = 'http://dota2.gamepedia.com'
 API_PATH = URL_DOMAIN + '/api.php'
 RESPONSES_CATEGORY = 'Responses'
+CHAT_WHEEL_PAGE = 'Chat_Wheel'
 CATEGORY_API_PARAMS = {'action': 'query', 'list': 'categorymembers', 'cmlimit': 'max', 'cmprop': 'title',
                        'format': 'json', 'cmtitle': ''}
 FILE_API_PARAMS = {'action': 'query', 'titles': '', 'prop': 'imageinfo', 'iiprop': 'url', 'format': 'json'}
+REVISIONS_API_PARAMS = {'action': 'query', 'titles': '', 'prop': 'revisions', 'rvprop': 'ids', 'format': 'json'}
 
 STYLESHEET_URL = r'https://www.reddit.com/r/dota2/about/stylesheet.json'
 FLAIR_REGEX = r'(?P<css_class>.flair-\w+),a\[href="(?P<img_path>/hero-\w+)"\]'
 RESPONSE_REGEX = r'\*(?P<files>( <sm2>.*?</sm2>)+)(?P<text>(.*))'
 CHAT_WHEEL_SECTION_REGEX = r'(=== (?P<event>The International \d+) ===)(?P<source>.+?)(?=\n=== [a-z0-9 ]+ ===\n)'
 FILE_REGEX = r'( <sm2>(?P<file>[a-zA-Z0-9_. ]+)</sm2>)'
+WIKI_FETCH_WORKERS = int(os.environ.get('WIKI_FETCH_WORKERS', 8))  # number of pages fetched at once
+WIKI_RATE_LIMIT = float(os.environ.get('WIKI_RATE_LIMIT', 10))  # max requests per second to wiki, 0 for no limit
+WIKI_DUMP_PATH = os.environ.get('WIKI_DUMP_PATH')  # XML export or directory of page sources, to populate offline
+WIKI_IMAGEINFO_PATH = os.environ.get('WIKI_IMAGEINFO_PATH')  # JSON file with file links for the dump
 
 # Caching config
-CACHE_PROVIDER = os.environ.get('CACHE_PROVIDER', 'memory')  # valid choices : redis, memory, db
+CACHE_PROVIDER = os.environ.get('CACHE_PROVIDER', 'memory')  # valid choices : redis, memory, db, bloom
 CACHE_URL = os.environ.get('CACHE_URL',
                            os.path.join(os.getcwd(), 'cache.json'))  # file path in case of memory/file based caching
+CACHE_FLUSH_INTERVAL = float(os.environ.get('CACHE_FLUSH_INTERVAL', 2))  # seconds between memory cache log writes
+CACHE_LOCAL_SIZE = int(os.environ.get('CACHE_LOCAL_SIZE', 1000))  # ids kept in process, in front of redis cache
+CACHE_BLOOM_CAPACITY = int(os.environ.get('CACHE_BLOOM_CAPACITY', 200_000))  # ids per day in bloom cache
+CACHE_BLOOM_ERROR_RATE = float(os.environ.get('CACHE_BLOOM_ERROR_RATE', 0.001))  # false positive rate of bloom cache
+CACHE_BLOOM_SNAPSHOT_INTERVAL = float(os.environ.get('CACHE_BLOOM_SNAPSHOT_INTERVAL', 300))  # seconds between dumps
+
+# Matching config
+FUZZY_MATCH_THRESHOLD = float(os.environ.get('FUZZY_MATCH_THRESHOLD', 0))  # min similarity (0-100), 0 to disable
+FUZZY_MATCH_BUDGET = float(os.environ.get('FUZZY_MATCH_BUDGET', 5))  # max milliseconds per replyable for near matching
+PARTIAL_MATCHING = os.environ.get('PARTIAL_MATCHING', 'false').lower() == 'true'  # reply to responses inside comments
 
 # DB config
 DB_PROVIDER = os.environ.get('DATABASE_PROVIDER', 'sqlite')  # valid choices : sqlite, mysql, postgres
 DB_URL = os.environ.get('DATABASE_URL', os.path.join(os.getcwd(), 'bot.db'))  # file path in case of sqlite
 
+# Metrics config
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')  # interface metrics endpoint listens on
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 0))  # port of /metrics endpoint (+ shard index), 0 to disable
+METRICS_FILE = os.environ.get('METRICS_FILE')  # file metrics are written to periodically, not written if not set
+METRICS_DUMP_INTERVAL = float(os.environ.get('METRICS_DUMP_INTERVAL', 60))  # seconds between metrics file writes
+
 # Logging config
 BOT_LOGGER = 'bot'
 PRAW_LOGGER = 'prawcore'
@@ -64,6 +100,28 @@ Bleep bloop, I am a robot. *OP can reply with "Try hero_name" to update this wit
 [*^(Author)*](https://www.reddit.com/user/Jonarz/)
 '''
 
+# Other names used for heroes in "hero_name::" prefixes and update requests. Key should be processed text (lowercase,
+# punctuation replaced with spaces), value should be the hero name as in Heroes table
+HERO_ALIASES = {
+    'am': 'Anti-Mage',
+    'antimage': 'Anti-Mage',
+    'bh': 'Bounty Hunter',
+    'cm': 'Crystal Maiden',
+    'es': 'Earthshaker',
+    'np': "Nature's Prophet",
+    'furion': "Nature's Prophet",
+    'ogre': 'Ogre Magi',
+    'pa': 'Phantom Assassin',
+    'qop': 'Queen of Pain',
+    'sk': 'Sand King',
+    'skeleton king': 'Wraith King',
+    'wk': 'Wraith King',
+    'ta': 'Templar Assassin',
+    'tb': 'Terrorblade',
+    'wr': 'Windranger',
+    'windrunner': 'Windranger',
+}
+
 # Key should be lowercase without special characters. Needs to be updated if links break (as links can be
 # non-gamepedia links too)
 # Value should have a placeholder for original text and replyable ending
@@ -81,14 +139,19 @@ FREQUENT_RESPONSES = {'denied', 'yes', 'not yet', 'no mana', 'not enough mana',
                       'it s not time yet', 'ah', 'no', 'uh', 'ha ha', 'attack', 'haste', 'double damage', 'immortality',
                       'invisibility', 'illusion', 'regeneration', 'uh uh', 'ha', }
 
-# Hero and item responses not hardcoded here
-HERO_NAME_RESPONSES = request_cargo_set('https://dota2.gamepedia.com/api.php?'+
-                                        'action=cargoquery&tables=heroes&fields=title&where=game'+
-                                        '+IS+NULL&limit=500&format=json')
+# Hero and item responses not hardcoded here. Requested from the wiki by workers on startup or on first use (see
+# `__getattr__` at the end), and cached in a local file, so importing config doesn't need network
+HERO_NAME_RESPONSES_URL = 'https://dota2.gamepedia.com/api.php?' + \
+                          'action=cargoquery&tables=heroes&fields=title&where=game' + \
+                          '+IS+NULL&limit=500&format=json'
+
+ITEM_RESPONSES_URL = 'https://dota2.gamepedia.com/api.php?' + \
+                     'action=cargoquery&tables=items&fields=' + \
+                     'title&where=game+IS+NULL&limit=500&format=json'
 
-ITEM_RESPONSES = request_cargo_set('https://dota2.gamepedia.com/api.php?'+
-                                   'action=cargoquery&tables=items&fields='+
-                                   'title&where=game+IS+NULL&limit=500&format=json')
+EXCLUDED_RESPONSES_CACHE = os.environ.get('EXCLUDED_RESPONSES_CACHE',
+                                          os.path.join(os.getcwd(), 'excluded_responses.json'))  # cache file path
+EXCLUDED_RESPONSES_TTL = int(os.environ.get('EXCLUDED_RESPONSES_TTL', 7))  # in days
 
 # Add responses here as people report them. Taken from the old excluded responses list.
 COMMON_PHRASE_RESPONSES = {'earth shaker', 'shut up', 'skeleton king', 'it begins', 'i am', 'exactly so', 'very nice',
@@ -102,4 +165,40 @@ COMMON_PHRASE_RESPONSES = {'earth shaker', 'shut up', 'skeleton king', 'it begin
                            'well said', 'of course', 'got it', 'what happened', 'hey now', 'seems fair', 'that s right',
                            'all pick'}
 
-EXCLUDED_RESPONSES = FREQUENT_RESPONSES | ITEM_RESPONSES | HERO_NAME_RESPONSES | COMMON_PHRASE_RESPONSES
+
+_cargo_sets = CargoSets(EXCLUDED_RESPONSES_CACHE, EXCLUDED_RESPONSES_TTL * 24 * 3600)
+_excluded_responses = None, None, None  # Hero and item sets the excluded responses are built from, and the union
+
+
+def __getattr__(name):
+    """Method called for attributes not defined in the module. Loads `HERO_NAME_RESPONSES`, `ITEM_RESPONSES` and
+    `EXCLUDED_RESPONSES` on first use. They are loaded again in background after `EXCLUDED_RESPONSES_TTL` days, or
+    sooner if they couldn't be requested from the wiki.
+
+    :param name: Attribute name
+    :return: Attribute value
+    """
+    global _excluded_responses
+
+    if name == 'HERO_NAME_RESPONSES':
+        return _cargo_sets.get(HERO_NAME_RESPONSES_URL)
+    elif name == 'ITEM_RESPONSES':
+        return _cargo_sets.get(ITEM_RESPONSES_URL)
+    elif name == 'EXCLUDED_RESPONSES':
+        hero_name_responses = _cargo_sets.get(HERO_NAME_RESPONSES_URL)
+        item_responses = _cargo_sets.get(ITEM_RESPONSES_URL)
+        if _excluded_responses[0] is not hero_name_responses or _excluded_responses[1] is not item_responses:
+            _excluded_responses = hero_name_responses, item_responses, FREQUENT_RESPONSES | item_responses | \
+                                  hero_name_responses | COMMON_PHRASE_RESPONSES
+        return _excluded_responses[2]
+    else:
+        raise AttributeError("module '" + __name__ + "' has no attribute '" + name + "'")
+
+
+def load_excluded_responses():
+    """Method to load excluded responses before the bot starts reading replyables, so processing of the first replyable
+    never waits for the wiki.
+
+    :return: set of excluded responses
+    """
+    return __getattr__('EXCLUDED_RESPONSES')
@@ -1,6 +1,8 @@
 # Named as `parsers` because `parser` will produce ImportError due to conflict with internal `parser.py` file
 
 from parsers.css_parser import *
+from parsers.dump_parser import *
+from parsers.response_normalizer import *
 from parsers.wiki_parser import *
 
-__all__ = ['css_parser', 'wiki_parser']
+__all__ = ['css_parser', 'dump_parser', 'response_normalizer', 'wiki_parser']
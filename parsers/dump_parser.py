@@ -0,0 +1,167 @@
+"""Module used to populate responses into the Responses table in database from an offline copy of the wiki, so the
+database can be rebuilt without network access and the parser can be benchmarked on fixed input.
+
+Pages are read from either of:
+* MediaWiki XML export (Special:Export) of the response pages and Chat Wheel page. The export is streamed with an
+  iterative parser, so only one page is kept in memory at a time.
+* Directory of raw page sources (as returned by `?action=raw`), one file per page. Page title is the path of the file
+  relative to the directory, without `.txt` or `.wiki` extension, e.g. `Axe/Responses.txt`.
+
+Links to the files are read from a JSON file with saved MediaWiki imageinfo query responses (single response or list of
+responses), or with a plain mapping of file names to links.
+"""
+
+import json
+import os
+import urllib.parse as up
+import xml.etree.ElementTree as ElementTree
+
+from config import CHAT_WHEEL_PAGE
+from parsers.wiki_parser import chat_wheel_sections, create_responses_text_and_link_list, get_hero_name_for_page, \
+    links_for_imageinfo_pages
+from util.database.database import db_api
+from util.logger import logger
+from util.response_index import response_index
+
+__author__ = 'MePsyDuck'
+
+SOURCE_FILE_EXTENSIONS = ('.txt', '.wiki')
+
+
+def populate_responses_from_dump(dump_path, imageinfo_path):
+    """Method that adds all the responses from the dump to database. Assumes responses and hero database are already
+    built. Pages are written to the db one by one, in order of the dump.
+    Revisions of the pages (XML export only) and file links are saved too, so `wiki_parser.sync_responses` can update
+    the database later.
+
+    :param dump_path: Path to the XML export or directory of page sources.
+    :param imageinfo_path: Path to the JSON file with file links.
+    """
+    file_and_link_dict = load_imageinfo(imageinfo_path)
+
+    if os.path.isdir(dump_path):
+        pages = iter_source_dir_pages(dump_path)
+    else:
+        pages = iter_xml_dump_pages(dump_path)
+
+    revisions = {}
+    for title, revision_id, responses_source in pages:
+        if title.replace(' ', '_') == CHAT_WHEEL_PAGE:
+            title = CHAT_WHEEL_PAGE
+            for event, event_source in chat_wheel_sections(responses_source):
+                add_responses_from_source(event, event_source, file_and_link_dict)
+        else:
+            add_responses_from_source(get_hero_name_for_page(title), responses_source, file_and_link_dict)
+
+        if revision_id is not None:
+            revisions[title] = revision_id
+
+    db_api.update_wiki_files(file_and_link_dict)
+    db_api.update_wiki_page_revisions(revisions)
+    response_index.invalidate()
+
+
+def add_responses_from_source(hero_name, responses_source, file_and_link_dict):
+    """Method that parses page source and adds hero and its responses to the db. Pages without responses are skipped.
+
+    :param hero_name: Hero name (or chat wheel event) the responses belong to.
+    :param responses_source: Mediawiki source
+    :param file_and_link_dict: dict with file names and their links.
+    """
+    response_link_list = create_responses_text_and_link_list(responses_source=responses_source,
+                                                             file_and_link_dict=file_and_link_dict)
+    if response_link_list:
+        db_api.add_hero_and_responses(hero_name=hero_name, response_link_list=response_link_list)
+    else:
+        logger.debug('No responses found for : ' + hero_name)
+
+
+def iter_xml_dump_pages(dump_path):
+    """Method that streams pages from MediaWiki XML export. Only articles (namespace 0) are returned. If the export
+    contains history of a page, only the latest revision is used.
+
+    :param dump_path: Path to the XML export.
+    :return: generator of tuples (title, revision id, source)
+    """
+    context = ElementTree.iterparse(dump_path, events=('start', 'end'))
+    _, root = next(context)
+
+    for event, element in context:
+        if event != 'end' or local_name(element.tag) != 'page':
+            continue
+
+        title, namespace, revision = None, None, None
+        for child in element:
+            name = local_name(child.tag)
+            if name == 'title':
+                title = child.text
+            elif name == 'ns':
+                namespace = child.text
+            elif name == 'revision':
+                revision = child
+
+        if namespace in (None, '0') and revision is not None:
+            revision_id, source = None, ''
+            for child in revision:
+                name = local_name(child.tag)
+                if name == 'id':
+                    revision_id = int(child.text)
+                elif name == 'text':
+                    source = child.text or ''
+            yield title, revision_id, source
+
+        # Drop parsed pages from the tree, so memory use does not grow with the size of the export
+        root.clear()
+
+
+def iter_source_dir_pages(directory):
+    """Method that reads page sources from the directory, one file at a time, in order of page titles.
+
+    :param directory: Path to the directory with page sources.
+    :return: generator of tuples (title, None, source), as revisions are not known.
+    """
+    paths = []
+    for dir_path, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            paths.append(os.path.join(dir_path, file_name))
+
+    titles = {}
+    for path in paths:
+        title, extension = os.path.splitext(os.path.relpath(path, directory))
+        if extension in SOURCE_FILE_EXTENSIONS:
+            titles[up.unquote(title.replace(os.sep, '/'))] = path
+
+    for title in sorted(titles):
+        with open(titles[title], encoding='utf-8') as source_file:
+            yield title, None, source_file.read()
+
+
+def load_imageinfo(imageinfo_path):
+    """Method that loads file links from JSON file with saved MediaWiki imageinfo query responses, or plain mapping of
+    file names to links.
+
+    :param imageinfo_path: Path to the JSON file.
+    :return: dict with file names and their links.
+    """
+    with open(imageinfo_path, encoding='utf-8') as imageinfo_file:
+        imageinfo = json.load(imageinfo_file)
+
+    if isinstance(imageinfo, dict) and 'query' not in imageinfo:
+        return dict(imageinfo)
+
+    responses = imageinfo if isinstance(imageinfo, list) else [imageinfo]
+    resolved_files = {}
+    for response in responses:
+        resolved_files.update(links_for_imageinfo_pages(response['query']['pages']))
+
+    logger.info('Loaded ' + str(len(resolved_files)) + ' file links from ' + imageinfo_path)
+    return resolved_files
+
+
+def local_name(tag):
+    """Method to get tag name without XML namespace, as namespace changes with MediaWiki export version.
+
+    :param tag: Tag name as returned by ElementTree, e.g. `{http://www.mediawiki.org/xml/export-0.10/}page`
+    :return: Tag name without namespace, e.g. `page`
+    """
+    return tag.rsplit('}', 1)[-1]
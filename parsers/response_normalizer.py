@@ -0,0 +1,82 @@
+"""Module used to normalize wiki markup of response lines into plain response text.
+
+All the rules are compiled once, when the module is imported. Each rule has a trigger: lowercase literal that every
+match of the rule starts with. Rules are applied in order, as separate substitutions would be, but a rule is skipped
+when its trigger is not in the text, so a line without markup is handled by a few substring checks instead of a dozen
+regex scans. Text is checked case insensitively the same way as regexes with `re.IGNORECASE` match it, so the result
+is always the same as applying every rule.
+"""
+
+import re
+
+from util.logger import logger
+
+__author__ = 'MePsyDuck'
+
+# Non ASCII characters that match ASCII letters with `re.IGNORECASE`, besides their upper and lowercase forms
+IGNORECASE_FOLD_TABLE = str.maketrans({'İ': 'i', 'ı': 'i', 'ſ': 's', 'K': 'k'})
+
+EXCLUDED_CASES = ['(broken file)', 'versus (TI ', 'Ceeeb']
+
+# Tuples of (trigger, regex, replacement), applied in this order
+RULES = [('<!--', r'<!--.*?-->', ''),  # Remove comments
+         ('{{resp|', r'{{resp\|(r|u|\d+|d\|\d+|rem)}}', ''),  # Remove response rarity
+         ('{{hero icon|', r'{{hero icon\|[a-z- \']+\|\d+px}}', ''),  # Remove hero icon
+         ('{{item', r'{{item( icon)?\|[a-z0-9() \']+\|\d+px}}', ''),  # Remove item icon
+         ('[[file:', r'\[\[File:[a-z.,!\'() ]+\|\d+px(\|link=[a-z,!\'() ]+)?(\|class=[a-z]+)?]]', ''),  # Remove Files
+         ('<small>[[#', r'<small>\[\[#[a-z0-9_\-\' ]+\|\'\'followup\'\']]</small>', ''),
+         # Remove followup links in <small> tags
+         ('<small>\'\'', r'<small>\'\'[a-z0-9 /]+\'\'</small>', ''),  # Remove text in <small> tags
+         ('<ref>', r'<ref>.*?</ref>', ''),  # Remove text in <ref> tags
+         ('<nowiki>', r'<nowiki>.*?</nowiki>', ''),  # Remove text in <nowiki> tags
+         ('[[', r'\[\[([a-zé().:\',\- ]+)]]', '\\1'),  # Replace links such as [[Shitty Wizard]]
+         ('[[', r'\[\[[a-zé0-9().:\'/#-_ ]+\|([a-zé0-9().:\'/#-_ ]+)]]', '\\1'),
+         # Replace links such as [[Ancient (Building)|Ancients]], [[:File:Axe|Axe]] and [[Terrorblade#Sunder|sundering]]
+         ('{{tooltip|', r'{{tooltip\|(.*?)\|.*?}}', '\\1'),  # Replace tooltips
+         ('{{note|', r'{{note\|([a-z.!\'\-?, ]+)\|[a-z.!\'\-?,()/ ]+}}', '\\1'),  # Replace notes
+         ('{{h|', r'{{H\|([a-z.!\'\-?,()/ ]+)}}', '\\1'),  # Replace heroes
+         ]
+
+# Markup left in the text after all the rules means the response could not be processed
+ESCAPES = ['[[', ']]', '{{', '}}', '|', 'sm2']
+
+
+class ResponseNormalizer:
+    def __init__(self, rules=RULES, excluded_cases=EXCLUDED_CASES, escapes=ESCAPES):
+        """Method to compile the rules.
+
+        :param rules: list of tuples (trigger, regex, replacement). Regexes are case insensitive, triggers lowercase.
+        :param excluded_cases: Substrings of responses that are not processed at all.
+        :param escapes: Substrings of markup that make the response invalid if left after applying the rules.
+        """
+        self.rules = [(trigger, re.compile(regex, re.IGNORECASE), replacement) for trigger, regex, replacement in rules]
+        self.excluded_regex = re.compile('|'.join(re.escape(excluded_case) for excluded_case in excluded_cases))
+        self.escape_regex = re.compile('|'.join(re.escape(escape) for escape in escapes))
+
+    def normalize(self, text):
+        """Method that normalizes response text with wiki markup.
+
+        :param text: Response text as in wiki source.
+        :return: Plain response text, or None if the response is excluded or could not be processed.
+        """
+        # Special cases
+        if self.excluded_regex.search(text):
+            return None
+
+        text = text.replace('…', '...')  # Replace ellipsis with three dots
+
+        folded_text = text.translate(IGNORECASE_FOLD_TABLE).lower()
+        for trigger, regex, replacement in self.rules:
+            if trigger in folded_text:
+                text, count = regex.subn(replacement, text)
+                if count:
+                    folded_text = text.translate(IGNORECASE_FOLD_TABLE).lower()
+
+        if self.escape_regex.search(text):
+            logger.warning('Response could not be processed : ' + text)
+            return None
+
+        return text.strip()
+
+
+response_normalizer = ResponseNormalizer()
@@ -5,28 +5,161 @@ Responses and urls to responses as mp3s are parsed from Dota 2 Wiki: http://dota
 
 import json
 import re
-from concurrent.futures import as_completed
+import threading
+import time
+import urllib.parse as up
+from concurrent.futures import as_completed, ThreadPoolExecutor
 
 import requests
 from requests.adapters import HTTPAdapter
-from requests_futures.sessions import FuturesSession
 from urllib3 import Retry
 
 from config import API_PATH, RESPONSES_CATEGORY, RESPONSE_REGEX, CATEGORY_API_PARAMS, URL_DOMAIN, FILE_API_PARAMS, \
-    FILE_REGEX, CHAT_WHEEL_SECTION_REGEX
+    FILE_REGEX, CHAT_WHEEL_SECTION_REGEX, WIKI_FETCH_WORKERS, WIKI_RATE_LIMIT, CHAT_WHEEL_PAGE, REVISIONS_API_PARAMS
+from parsers.response_normalizer import response_normalizer
 from util.database.database import db_api
 from util.logger import logger
-from util.str_utils import preprocess_text
+from util.response_index import response_index
+from util.str_utils import preprocess_texts
 
 __author__ = 'Jonarzz'
 __maintainer__ = 'MePsyDuck'
 
+response_regex = re.compile(RESPONSE_REGEX)
+file_regex = re.compile(FILE_REGEX)
+chat_wheel_regex = re.compile(CHAT_WHEEL_SECTION_REGEX, re.DOTALL | re.IGNORECASE)
+
 
 def populate_responses():
     """Method that adds all the responses to database. Assumes responses and hero database are already built.
+    Files of hero pages and chat wheel sections are resolved together by a single `FileLinkResolver`, so requests for
+    links are packed across pages. Hero pages are written to the db as soon as they're fetched and their links resolved.
+    Revisions of the pages and resolved file links are saved too, so `sync_responses` can update only changed pages.
+    Response index is reloaded afterwards, so lookups in this process see the new responses.
+    """
+    pages = pages_for_category(RESPONSES_CATEGORY)
+    # Revisions are queried before pages are fetched, so an edit made in between is picked up by the next sync
+    revisions = revisions_for_pages(pages + [CHAT_WHEEL_PAGE])
+
+    with FileLinkResolver() as resolver:
+        fetch_all_hero_responses(resolver, pages, db_api.add_hero_and_responses)
+        chat_wheel_responses = fetch_chat_wheel_responses(resolver)
+        file_and_link_dict = resolver.resolve()
+
+    add_responses(chat_wheel_responses, file_and_link_dict)
+    db_api.update_wiki_files(resolver.resolved_files)
+    db_api.update_wiki_page_revisions(revisions)
+    response_index.invalidate()
+
+
+def sync_responses():
+    """Method that updates responses in database with the changes made on the wiki since the last populate or sync.
+    Steps involved:
+    * Get latest revision ids of all the response pages (and Chat Wheel page) in batches.
+    * Fetch and parse only the pages with revision different from the one saved in WikiPages table.
+    * Resolve links only for files not in WikiFiles table.
+    * Diff responses of changed pages into Responses table, and delete responses of pages removed from the category.
+
+    Response index is reloaded afterwards, so lookups in this process see the new responses. Running bot reloads it on
+    SIGHUP.
+    """
+    pages = pages_for_category(RESPONSES_CATEGORY)
+    revisions = revisions_for_pages(pages + [CHAT_WHEEL_PAGE])
+    saved_revisions = db_api.get_wiki_page_revisions()
+
+    changed_pages = [page for page in pages if revisions.get(page) != saved_revisions.get(page)]
+    chat_wheel_changed = revisions.get(CHAT_WHEEL_PAGE) != saved_revisions.get(CHAT_WHEEL_PAGE)
+    removed_pages = [page for page in saved_revisions if page not in revisions and page != CHAT_WHEEL_PAGE]
+    logger.info('Wiki sync : ' + str(len(changed_pages) + chat_wheel_changed) + ' changed and ' +
+                str(len(removed_pages)) + ' removed pages')
+
+    hero_responses = []
+    with FileLinkResolver(known_links=db_api.get_wiki_file_links()) as resolver:
+        fetch_all_hero_responses(resolver, changed_pages,
+                                 lambda hero_name, response_link_list: hero_responses.append((hero_name,
+                                                                                              response_link_list)))
+        chat_wheel_responses = fetch_chat_wheel_responses(resolver) if chat_wheel_changed else []
+        file_and_link_dict = resolver.resolve()
+
+    for event, file_and_text_list in chat_wheel_responses:
+        hero_responses.append((event, create_response_link_list(file_and_text_list, file_and_link_dict)))
+
+    # Diff is computed across all the pages at once, so responses moved between pages are not deleted
+    removed_heroes = [get_hero_name_for_page(page) for page in removed_pages]
+    inserted, updated, deleted = db_api.sync_hero_responses(hero_responses, removed_heroes)
+
+    synced_pages = changed_pages + [CHAT_WHEEL_PAGE] if chat_wheel_changed else changed_pages
+    db_api.update_wiki_files(resolver.resolved_files)
+    db_api.update_wiki_page_revisions({page: revisions[page] for page in synced_pages}, removed_pages)
+    response_index.invalidate()
+
+    logger.info('Wiki sync : ' + str(inserted) + ' inserted, ' + str(updated) + ' updated and ' + str(deleted) +
+                ' deleted responses')
+
+
+class RateLimiter:
+    """Thread safe limiter of requests per second, shared by all requests to the wiki.
     """
-    populate_hero_responses()
-    populate_chat_wheel()
+
+    def __init__(self, rate):
+        """
+        :param rate: Max number of requests per second, 0 for no limit.
+        """
+        self.interval = 1 / rate if rate else 0
+        self.next_time = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Method that blocks until the next request is allowed.
+        """
+        with self.lock:
+            now = time.monotonic()
+            request_time = max(now, self.next_time)
+            self.next_time = request_time + self.interval
+        if request_time > now:
+            time.sleep(request_time - now)
+
+
+rate_limiter = RateLimiter(WIKI_RATE_LIMIT)
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Method to get the session shared by all requests to the wiki. Session has a connection pool big enough for all
+    the fetching threads, and retries requests in case of Status 429 : Too many requests and server errors.
+
+    :return: requests Session
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retries = 5
+            retry = Retry(
+                total=retries,
+                read=retries,
+                connect=retries,
+                backoff_factor=0.5,
+                respect_retry_after_header=True,
+                status_forcelist=[429, 500, 502, 503, 504],
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=WIKI_FETCH_WORKERS, max_retries=retry)
+
+            _session = requests.Session()
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+
+def wiki_get(url, params=None):
+    """Method to make a rate limited GET request to the wiki using the shared session.
+
+    :param url: Request url
+    :param params: GET parameters
+    :return: requests Response
+    """
+    rate_limiter.wait()
+    return get_session().get(url=url, params=params)
 
 
 def populate_hero_responses():
@@ -34,20 +167,86 @@ def populate_hero_responses():
     First fetches all Pages in Responses category, then source for each page.
     Populates Responses table and Hero table from processed response, original response, link and hero name.
     """
-    pages = pages_for_category(RESPONSES_CATEGORY)
-    for page in pages:
-        if is_hero_type(page):
-            # page points to hero responses
-            hero_name = get_hero_name(page)
-        else:
-            # page points to voice pack, announcer or shopkeeper responses
-            hero_name = page
-
-        responses_source = requests.get(url=URL_DOMAIN + '/' + page, params={'action': 'raw'}).text
-
-        response_link_list = create_responses_text_and_link_list(responses_source=responses_source)
-        # Note: Save all responses to the db. Apply single word and common words filter on comments and submission text
-        # not while saving responses
+    with FileLinkResolver() as resolver:
+        fetch_all_hero_responses(resolver, pages_for_category(RESPONSES_CATEGORY), db_api.add_hero_and_responses)
+
+
+def fetch_all_hero_responses(resolver, pages, write):
+    """Method that fetches and parses given pages in Responses category, and passes their responses to `write` as soon
+    as they're ready.
+
+    Pages are fetched and parsed by `WIKI_FETCH_WORKERS` threads. Files are added to the resolver from this thread as
+    pages complete, so link requests for full batches are issued while other pages are still being fetched. A page is
+    written once its links are resolved, in the order of pages in category, so a response link shared by pages always
+    goes to the same hero. Only pages fetched ahead of a page still being fetched or resolved are kept in memory.
+
+    :param resolver: `FileLinkResolver` for files of the pages.
+    :param pages: list of pages in Responses category
+    :param write: Callable taking hero name and list with tuples of (original_text, processed_text, link), e.g.
+    `db_api.add_hero_and_responses`. Called from this thread.
+    """
+    fetched_pages = {}
+    next_index = 0
+
+    def write_ready_pages(request):
+        nonlocal next_index
+        while next_index in fetched_pages:
+            hero_name, file_and_text_list = fetched_pages[next_index]
+            file_and_link_dict = resolver.links_for([file for text, file in file_and_text_list], request=request)
+            if file_and_link_dict is None:
+                return
+            write(hero_name, create_response_link_list(file_and_text_list, file_and_link_dict))
+            del fetched_pages[next_index]
+            next_index += 1
+
+    with ThreadPoolExecutor(max_workers=WIKI_FETCH_WORKERS) as executor:
+        futures = {executor.submit(fetch_hero_responses, page): index for index, page in enumerate(pages)}
+
+        for future in as_completed(futures):
+            hero_name, file_and_text_list = future.result()
+            resolver.add([file for text, file in file_and_text_list])
+            fetched_pages[futures[future]] = (hero_name, file_and_text_list)
+            write_ready_pages(request=False)
+
+    # Files of the last pages can still be in the batch not requested yet
+    write_ready_pages(request=True)
+
+
+def fetch_hero_responses(page):
+    """Method that fetches and parses the responses page. Run in fetching threads.
+
+    :param page: Page in Responses category
+    :return: tuple of hero name and list of [original_text, file_name] as returned by `parse_responses_source`.
+    """
+    responses_source = wiki_get(url=URL_DOMAIN + '/' + page, params={'action': 'raw'}).text
+
+    return get_hero_name_for_page(page), parse_responses_source(responses_source=responses_source)
+
+
+def get_hero_name_for_page(page):
+    """Method to get name of the hero (or voice pack) the responses page belongs to.
+
+    :param page: Page in Responses category
+    :return: Hero name
+    """
+    if is_hero_type(page):
+        # page points to hero responses
+        return get_hero_name(page)
+    else:
+        # page points to voice pack, announcer or shopkeeper responses
+        return page
+
+
+def add_responses(hero_responses, file_and_link_dict):
+    """Method that adds parsed responses of heroes (or chat wheel events) to the db, with links to their files.
+
+    :param hero_responses: list of tuples (hero name, list of [original_text, file_name])
+    :param file_and_link_dict: dict with file names and their links, as returned by `FileLinkResolver.resolve`.
+    """
+    for hero_name, file_and_text_list in hero_responses:
+        response_link_list = create_response_link_list(file_and_text_list, file_and_link_dict)
+        # Note: Save all responses to the db. Apply single word and common words filter on comments and
+        # submission text not while saving responses
         db_api.add_hero_and_responses(hero_name=hero_name, response_link_list=response_link_list)
 
 
@@ -58,7 +257,7 @@ def pages_for_category(category_name):
     :return: list of all `pages` in the given category.
     """
     params = get_params_for_category_api(category_name)
-    json_response = requests.get(url=API_PATH, params=params).text
+    json_response = wiki_get(url=API_PATH, params=params).text
 
     pages = []
 
@@ -70,6 +269,44 @@ def pages_for_category(category_name):
     return pages
 
 
+def revisions_for_pages(pages):
+    """Method that returns ids of the latest revisions of the pages. Queries MediaWiki API in batches, packed the same
+    way as in `FileLinkResolver`.
+
+    :param pages: list of page titles
+    :return: dict with page titles (as passed) and their revision ids. Missing pages are left out.
+    """
+    empty_api_length = len(requests.Request('get', url=API_PATH, params=get_params_for_revisions_api([])).prepare().url)
+    max_titles_length = FileLinkResolver.max_header_length - empty_api_length
+
+    batches = []
+    pages_batch_list = []
+    current_title_length = 0
+    for page in pages:
+        title_length = len('%7C') + len(up.quote_plus(page))
+        if current_title_length + title_length >= max_titles_length or \
+                len(pages_batch_list) >= FileLinkResolver.max_title_list_length:
+            batches.append(pages_batch_list)
+            pages_batch_list = []
+            current_title_length = 0
+        pages_batch_list.append(page)
+        current_title_length += title_length
+    if pages_batch_list:
+        batches.append(pages_batch_list)
+
+    revisions = {}
+    for pages_batch_list in batches:
+        query = wiki_get(url=API_PATH, params=get_params_for_revisions_api(pages_batch_list)).json()['query']
+        # MediaWiki returns normalized titles, e.g. with spaces instead of underscores
+        original_titles = {normalized['to']: normalized['from'] for normalized in query.get('normalized', [])}
+        for page in query['pages'].values():
+            if 'revisions' in page:
+                title = original_titles.get(page['title'], page['title'])
+                revisions[title] = page['revisions'][0]['revid']
+
+    return revisions
+
+
 def get_params_for_category_api(category):
     """Method to get `GET` parameters for querying MediaWiki for category details.
 
@@ -98,6 +335,18 @@ def get_params_for_files_api(files):
     return params
 
 
+def get_params_for_revisions_api(pages):
+    """Method to get `GET` parameters for querying MediaWiki for latest revisions of multiple pages.
+    Uses pipe character `|` to include multiple pages. Currently MediaWiki limits number of pages to 50.
+
+    :param pages: list of page titles to be passed in params.
+    :return: GET parameters `params`.
+    """
+    params = REVISIONS_API_PARAMS.copy()
+    params['titles'] = '|'.join(pages)
+    return params
+
+
 def is_hero_type(page):
     """Method to check if page belongs to a hero or creep-hero(Warlock's Golem).
 
@@ -118,25 +367,39 @@ def get_hero_name(hero_page):
     return hero_page.replace('/Responses', '')
 
 
-def create_responses_text_and_link_list(responses_source):
+def create_responses_text_and_link_list(responses_source, file_and_link_dict=None):
     """Method that for a given source of a hero's response page creates a list of tuple: (original_text, processed_text,
      link).
     Steps involved:
+    * Parse the source to get original response texts and file names by calling `parse_responses_source`.
+    * Get all the links for the files by calling `links_for_files`, unless links are passed.
+    * Create the list of responses with links by calling `create_response_link_list`.
+
+    :param responses_source: Mediawiki source
+    :param file_and_link_dict: dict with file names and their links, e.g. loaded from a dump. Queried from MediaWiki API
+    if not passed.
+    :return: list with tuples of (original_text, processed_text, link).
+    """
+    file_and_text_list = parse_responses_source(responses_source)
+
+    if file_and_link_dict is None:
+        files_list = [file for text, file in file_and_text_list]
+        file_and_link_dict = links_for_files(files_list)
+
+    return create_response_link_list(file_and_text_list, file_and_link_dict)
+
+
+def parse_responses_source(responses_source):
+    """Method that for a given source of a hero's response page creates a list of original response text and file name.
+    Steps involved:
     * Use regex to find all lines containing mp3 files and responses.
     * Process it to get original response text and file name.
-    * Create a list of files and get all the links for them by calling `links_for_files`.
-    * Process original text to get processed response.
-    * Add original response text, processed response text and file link to a list as a tuple.
 
     :param responses_source: Mediawiki source
-    :return: list with tuples of (original_text, processed_text, link).
+    :return: list with lists of [original_text, file_name].
     """
-    responses_list = []
     file_and_text_list = []
 
-    response_regex = re.compile(RESPONSE_REGEX)
-    file_regex = re.compile(FILE_REGEX)
-
     for response in response_regex.finditer(responses_source):
         original_text = parse_response(response['text'])
         if original_text is not None:
@@ -145,11 +408,23 @@ def create_responses_text_and_link_list(responses_source):
                 file_name = file['file'].replace('_', ' ').capitalize()
                 file_and_text_list.append([original_text, file_name])
 
-    files_list = [file for text, file in file_and_text_list]
-    file_and_link_dict = links_for_files(files_list)
+    return file_and_text_list
+
+
+def create_response_link_list(file_and_text_list, file_and_link_dict):
+    """Method that creates a list of tuple: (original_text, processed_text, link) from parsed responses.
+    Steps involved:
+    * Process original text to get processed response.
+    * Add original response text, processed response text and file link to a list as a tuple.
 
-    for original_text, file in file_and_text_list:
-        processed_text = preprocess_text(original_text)
+    :param file_and_text_list: list with lists of [original_text, file_name] as returned by `parse_responses_source`.
+    :param file_and_link_dict: dict with file names and their links.
+    :return: list with tuples of (original_text, processed_text, link).
+    """
+    responses_list = []
+    processed_texts = preprocess_texts([original_text for original_text, file in file_and_text_list])
+
+    for (original_text, file), processed_text in zip(file_and_text_list, processed_texts):
         if processed_text != '':
             try:
                 link = file_and_link_dict[file]
@@ -162,129 +437,195 @@ def create_responses_text_and_link_list(responses_source):
 
 
 def parse_response(text):
-    # Special cases
-    if any(excluded_case in text for excluded_case in ['(broken file)', 'versus (TI ', 'Ceeeb']):
-        return None
-
-    text = re.sub(r'…', '...', text)  # Replace ellipsis with three dots
-
-    regexps_empty_sub = [r'<!--.*?-->',  # Remove comments
-                         r'{{resp\|(r|u|\d+|d\|\d+|rem)}}',  # Remove response rarity
-                         r'{{hero icon\|[a-z- \']+\|\d+px}}',  # Remove hero icon
-                         r'{{item( icon)?\|[a-z0-9() \']+\|\d+px}}',  # Remove item icon
-                         r'\[\[File:[a-z.,!\'() ]+\|\d+px(\|link=[a-z,!\'() ]+)?(\|class=[a-z]+)?]]',  # Remove Files
-                         r'<small>\[\[#[a-z0-9_\-\' ]+\|\'\'followup\'\']]</small>',
-                         # Remove followup links in <small> tags
-                         r'<small>\'\'[a-z0-9 /]+\'\'</small>',  # Remove text in <small> tags
-                         r'<ref>.*?</ref>',  # Remove text in <ref> tags
-                         r'<nowiki>.*?</nowiki>',  # Remove text in <nowiki> tags
-                         ]
-    for regex in regexps_empty_sub:
-        text = re.sub(regex, '', text, flags=re.IGNORECASE)
-
-    regexps_sub_text = [r'\[\[([a-zé().:\',\- ]+)]]',  # Replace links such as [[Shitty Wizard]]
-                        r'\[\[[a-zé0-9().:\'/#-_ ]+\|([a-zé0-9().:\'/#-_ ]+)]]',
-                        # Replace links such as [[Ancient (Building)|Ancients]], [[:File:Axe|Axe]] and [[Terrorblade#Sunder|sundering]]
-                        r'{{tooltip\|(.*?)\|.*?}}',  # Replace tooltips
-                        r'{{note\|([a-z.!\'\-?, ]+)\|[a-z.!\'\-?,()/ ]+}}',  # Replace notes
-                        r'{{H\|([a-z.!\'\-?,()/ ]+)}}',  # Replace heroes
-                        ]
-    for regex in regexps_sub_text:
-        text = re.sub(regex, '\\1', text, flags=re.IGNORECASE)
-
-    if any(escape in text for escape in ['[[', ']]', '{{', '}}', '|', 'sm2']):
-        logger.warn('Response could not be processed : ' + text)
-        return None
-
-    return text.strip()
+    """Method that normalizes response text with wiki markup using `ResponseNormalizer`.
+
+    :param text: Response text as in wiki source.
+    :return: Plain response text, or None if the response is excluded or could not be processed.
+    """
+    return response_normalizer.normalize(text)
 
 
 def links_for_files(files_list):
     """Method that queries MediaWiki API used by Gamepedia to return links to the files list passed.
-    Does batch processing to avoid max number of files limit and header size limit.
-    Used asynchronous requests for faster processing.
-    Removes files version as we only need the latest one.
-
-    MediaWiki allows max 50 files(titles) at once : https://www.mediawiki.org/wiki/API:Query.
+    Uses `FileLinkResolver`, use it directly to resolve files of multiple pages together.
 
     :param files_list: list of files
     :return files_link_mapping: dict with file names and their links. dict['file'] = link
     """
+    with FileLinkResolver() as resolver:
+        resolver.add(files_list)
+        return resolver.resolve()
 
-    # Method level constants
-    max_title_list_length = 50
-    file_title_prefix_length = len('%7CFile%3A')  # url encoded file title prefix '|File:'
-    max_header_length = 1960  # max header length as found by trial and error
 
+def links_for_imageinfo_pages(pages):
+    """Method that gets links to the files from `pages` of MediaWiki imageinfo query response.
+    Removes files version as we only need the latest one.
+
+    :param pages: dict with page ids and pages as returned by MediaWiki API
+    :return: dict with file names and their links.
+    """
     files_link_mapping = {}
-    futures = []
-    empty_api_length = len(requests.Request('get', url=API_PATH, params=get_params_for_files_api([])).prepare().url)
-
-    # To add retry in case of Status 429 : Too many requests
-    with FuturesSession() as session:
-        retries = 5
-        status_forcelist = [429]
-        retry = Retry(
-            total=retries,
-            read=retries,
-            connect=retries,
-            respect_retry_after_header=True,
-            status_forcelist=status_forcelist,
-        )
-
-        adapter = HTTPAdapter(max_retries=retry)
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
-
-        files_batch_list = []
-        current_title_length = 0
+    for _, page in pages.items():
+        title = page['title']
+        try:
+            imageinfo = page['imageinfo'][0]
+            file_url = imageinfo['url'][:imageinfo['url'].index('.mp3') + len('.mp3')]  # Remove file version and trailing path
+            files_link_mapping[title[5:]] = file_url
+        except KeyError:
+            logger.critical('File does not have a link : ' + title)
 
-        for file in files_list:
-            file_name_len = file_title_prefix_length + len(file)
-            # If header size overflows or the number of files reaches the limit specified by MediaWiki
-            if file_name_len + current_title_length >= max_header_length - empty_api_length or \
-                    len(files_batch_list) >= max_title_list_length:
-                # Issue a request for current batch of files
-                futures.append(session.get(url=API_PATH, params=get_params_for_files_api(files_batch_list)))
+    return files_link_mapping
 
-                # Reset files tracking variables
-                files_batch_list = []
-                current_title_length = 0
 
-            files_batch_list.append(file)
-            current_title_length += file_name_len
+class FileLinkResolver:
+    """Resolver of links to files, collecting files of all the pages before querying MediaWiki API used by Gamepedia.
+    Files are deduplicated and packed into as few requests as possible. Does batch processing to avoid max number of
+    files limit and header size limit. Requests for full batches are issued in background as soon as files are added,
+    using the shared session and rate limiter. Removes files version as we only need the latest one.
 
-        if files_batch_list:
-            futures.append(session.get(url=API_PATH, params=get_params_for_files_api(files_batch_list)))
+    MediaWiki allows max 50 files(titles) at once : https://www.mediawiki.org/wiki/API:Query.
 
-        for future in as_completed(futures):
-            json_response = future.result().json()
-            query = json_response['query']
-            pages = query['pages']
-
-            for _, page in pages.items():
-                title = page['title']
-                try:
-                    imageinfo = page['imageinfo'][0]
-                    file_url = imageinfo['url'][:imageinfo['url'].index('.mp3') + len('.mp3')]  # Remove file version and trailing path
-                    files_link_mapping[title[5:]] = file_url
-                except KeyError:
-                    logger.critical('File does not have a link : ' + title)
+    Links of files resolved before can be passed as `known_links`, no requests are made for them. Files resolved by
+    requests are kept in `resolved_files`, to be saved in WikiFiles table.
+    """
 
-    return files_link_mapping
+    max_title_list_length = 50
+    file_title_prefix_length = len('%7CFile%3A')  # url encoded file title prefix '|File:'
+    max_header_length = 1960  # max header length as found by trial and error
+
+    def __init__(self, known_links=None):
+        """
+        :param known_links: dict with file names and their links resolved before.
+        """
+        self.known_links = known_links or {}
+        self.resolved_files = {}
+        self.executor = ThreadPoolExecutor(max_workers=WIKI_FETCH_WORKERS)
+        self.futures = []
+        self.file_futures = {}
+        self.files = set()
+        self.files_batch_list = []
+        self.current_title_length = 0
+        self.empty_api_length = len(requests.Request('get', url=API_PATH,
+                                                     params=get_params_for_files_api([])).prepare().url)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.executor.shutdown(wait=exc_type is None, cancel_futures=True)
+
+    def add(self, files_list):
+        """Method to add files to be resolved. Files added before and known files are skipped.
+
+        :param files_list: list of files
+        """
+        for file in files_list:
+            if file in self.files or file in self.known_links:
+                continue
+            self.files.add(file)
+
+            file_name_len = self.file_title_prefix_length + len(file)
+            # If header size overflows, issue a request for current batch of files. Batches reaching the number of files
+            # limited by MediaWiki are requested right after the file is added.
+            if file_name_len + self.current_title_length >= self.max_header_length - self.empty_api_length:
+                self._request_batch()
+
+            self.files_batch_list.append(file)
+            self.current_title_length += file_name_len
+            if len(self.files_batch_list) >= self.max_title_list_length:
+                self._request_batch()
+
+    def _request_batch(self):
+        """Method to issue a request for current batch of files and reset files tracking variables.
+        """
+        if not self.files_batch_list:
+            return
+        future = self.executor.submit(self._links_for_batch, self.files_batch_list)
+        self.futures.append(future)
+        self.file_futures.update((file, future) for file in self.files_batch_list)
+        self.files_batch_list = []
+        self.current_title_length = 0
+
+    @staticmethod
+    def _links_for_batch(files_batch_list):
+        """Method that queries MediaWiki API for a single batch of files. Run in resolver threads.
+
+        :param files_batch_list: list of at most 50 files
+        :return: dict with file names and their links.
+        """
+        json_response = wiki_get(url=API_PATH, params=get_params_for_files_api(files_batch_list)).json()
+        return links_for_imageinfo_pages(json_response['query']['pages'])
+
+    def links_for(self, files_list, request=True):
+        """Method to get links of some of the added files, e.g. of a single page, without waiting for the other requests.
+
+        :param files_list: list of files added before
+        :param request: Request the current batch if some of the files are in it. Otherwise None is returned for such
+        files, as the batch is still being filled up.
+        :return: dict with file names and their links, including links of other files resolved by the same requests.
+        None if some of the files are not requested yet and `request` is False.
+        """
+        if any(file in self.files_batch_list for file in files_list):
+            if not request:
+                return None
+            self._request_batch()
+
+        files_link_mapping = {file: self.known_links[file] for file in files_list if file in self.known_links}
+        for future in {self.file_futures[file] for file in files_list if file in self.file_futures}:
+            files_link_mapping.update(future.result())
+        return files_link_mapping
+
+    def resolve(self):
+        """Method to request the last batch of files and wait for all the requests to complete.
+
+        :return files_link_mapping: dict with file names and their links for all added and known files.
+        dict['file'] = link
+        """
+        self._request_batch()
+
+        for future in as_completed(self.futures):
+            self.resolved_files.update(future.result())
+
+        logger.info('Resolved ' + str(len(self.resolved_files)) + ' file links in ' + str(len(self.futures)) +
+                    ' requests')
+        files_link_mapping = dict(self.known_links)
+        files_link_mapping.update(self.resolved_files)
+        return files_link_mapping
 
 
 def populate_chat_wheel():
     """Method that populates chat wheel responses featured in The International yearly Battle Pass.
     Other chat wheel responses from events and Dota plus are not processed currently.
     """
-    chat_wheel_source = requests.get(url=URL_DOMAIN + '/' + 'Chat_Wheel', params={'action': 'raw'}).text
+    with FileLinkResolver() as resolver:
+        chat_wheel_responses = fetch_chat_wheel_responses(resolver)
+        file_and_link_dict = resolver.resolve()
 
-    chat_wheel_regex = re.compile(CHAT_WHEEL_SECTION_REGEX, re.DOTALL | re.IGNORECASE)
+    add_responses(chat_wheel_responses, file_and_link_dict)
+
+
+def fetch_chat_wheel_responses(resolver):
+    """Method that fetches and parses chat wheel sections, and adds their files to the resolver.
+
+    :param resolver: `FileLinkResolver` for files of the sections.
+    :return: list of tuples (event name, list of [original_text, file_name]).
+    """
+    chat_wheel_source = wiki_get(url=URL_DOMAIN + '/' + CHAT_WHEEL_PAGE, params={'action': 'raw'}).text
+
+    chat_wheel_responses = []
+    for event, responses_source in chat_wheel_sections(chat_wheel_source):
+        file_and_text_list = parse_responses_source(responses_source=responses_source)
+        resolver.add([file for text, file in file_and_text_list])
+        chat_wheel_responses.append((event, file_and_text_list))
+
+    return chat_wheel_responses
 
-    for match in chat_wheel_regex.finditer(chat_wheel_source):
-        event = match['event']
-        responses_source = match['source']
-        response_link_list = create_responses_text_and_link_list(responses_source=responses_source)
 
-        db_api.add_hero_and_responses(hero_name=event, response_link_list=response_link_list)
+def chat_wheel_sections(chat_wheel_source):
+    """Method that splits source of the Chat Wheel page into sections of The International events.
+
+    :param chat_wheel_source: Mediawiki source of Chat Wheel page
+    :return: generator of tuples (event name, responses source)
+    """
+    for match in chat_wheel_regex.finditer(chat_wheel_source):
+        yield match['event'], match['source']
@@ -1,14 +1,54 @@
 """Module to run the bot. Executes the work() method of bot that executes the endless loop of reading comments and
 submissions and replying to them if the match any response.
+
+With `WORKER_PROCESSES` more than 1, each process runs one shard of the subreddits. Worker modules are imported only in
+the processes that run them, so the parent process does not open its own cache and db connections.
 """
-from bot.worker import work, logger
-from util.logger import setup_logger
+import config
+from util.logger import setup_logger, logger
+from util.metrics import start_metrics
+from util.sharding import check_shard_count, start_processes
 
 __author__ = 'MePsyDuck'
 
+
+def start():
+    """Method to start the worker selected by `WORKER_MODE`.
+    """
+    start_metrics()
+    if config.WORKER_MODE == 'threaded':
+        from bot import threaded_worker
+
+        threaded_worker.work()
+    elif config.WORKER_MODE == 'async':
+        # Imported only when needed, as it requires Async PRAW
+        from bot import async_worker
+
+        async_worker.work()
+    else:
+        from bot import worker
+
+        worker.work()
+
+
+def start_shard():
+    """Method run by each of the shard processes.
+    """
+    setup_logger()
+    try:
+        start()
+    except (KeyboardInterrupt, SystemExit):
+        logger.exception("Shard " + str(config.SHARD_INDEX) + " stopped")
+
+
 if __name__ == '__main__':
     setup_logger()
+    # Fail before connecting to anything, shards without subreddits would have nothing to watch
+    check_shard_count()
     try:
-        work()
+        if config.WORKER_PROCESSES > 1:
+            start_processes(start_shard)
+        else:
+            start()
     except (KeyboardInterrupt, SystemExit):
         logger.exception("Script stopped")
@@ -1,9 +1,10 @@
 """Module to be run first time to set up the database
 * Drops all tables if the exist and creates them again.
-* Populates responses from Gamepedia
+* Populates responses from Gamepedia, or from offline dump if `WIKI_DUMP_PATH` is set
 * Populates heroes from Gamepedia and Dota 2 subreddit CSS.
 """
-from parsers import css_parser, wiki_parser
+from config import WIKI_DUMP_PATH, WIKI_IMAGEINFO_PATH
+from parsers import css_parser, dump_parser, wiki_parser
 from util.database.database import db_api
 
 __author__ = 'MePsyDuck'
@@ -14,7 +15,10 @@ from util.logger import setup_logger
 def first_run():
     db_api.drop_all_tables()
     db_api.create_all_tables()
-    wiki_parser.populate_responses()
+    if WIKI_DUMP_PATH:
+        dump_parser.populate_responses_from_dump(dump_path=WIKI_DUMP_PATH, imageinfo_path=WIKI_IMAGEINFO_PATH)
+    else:
+        wiki_parser.populate_responses()
     css_parser.populate_heroes()
 
 
@@ -0,0 +1,21 @@
+"""Module to be run periodically (e.g. daily) to update the database with changes made on the wiki since `setup.py` or
+the last sync.
+* Syncs responses only from pages changed since their last parsed revision.
+* Updates hero flair details from Dota 2 subreddit CSS, for heroes added by the sync.
+
+Running bot keeps its response index in memory, send it SIGHUP to reload responses after sync.
+"""
+from parsers import css_parser, wiki_parser
+from util.logger import setup_logger
+
+__author__ = 'MePsyDuck'
+
+
+def sync():
+    wiki_parser.sync_responses()
+    css_parser.populate_heroes()
+
+
+if __name__ == '__main__':
+    setup_logger()
+    sync()
@@ -0,0 +1,22 @@
+"""Module used to keep the files created by the bot out of the working directory while testing. Needs to be imported by
+the tests before config, as config reads the environment when it's imported.
+
+Sqlite db, cache, outbox and excluded responses files are created in a temporary directory, which is removed after the
+tests. Tests drop and create the db tables, so the configured db is never used.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+__author__ = 'MePsyDuck'
+
+directory = tempfile.mkdtemp(prefix='dota2_responses_bot_tests_')
+atexit.register(shutil.rmtree, directory, ignore_errors=True)
+
+os.environ['DATABASE_PROVIDER'] = 'sqlite'
+os.environ['DATABASE_URL'] = os.path.join(directory, 'bot.db')
+os.environ['CACHE_URL'] = os.path.join(directory, 'cache.json')
+os.environ['OUTBOX_PATH'] = os.path.join(directory, 'outbox.db')
+os.environ['EXCLUDED_RESPONSES_CACHE'] = os.path.join(directory, 'excluded_responses.json')
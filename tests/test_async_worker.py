@@ -0,0 +1,151 @@
+"""Module used to test async worker module methods, with fake Async PRAW comments and submissions.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+import uuid
+from unittest import mock
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from bot import async_worker
+from bot.account import BotIdentity
+from bot.outbox import ReplyScheduler
+from bot.replay import FakeReddit
+from util.hero_resolver import hero_resolver
+from util.response_index import response_index
+
+__author__ = 'MePsyDuck'
+
+LUNA_LINK = 'https://example.com/Luna_move_01.mp3'
+PUCK_LINK = 'https://example.com/Puck_move_01.mp3'
+
+
+class FakeAsyncThing:
+    """Comment or submission of Async PRAW, replies and edits are recorded instead of posted.
+    """
+
+    def __init__(self, fullname, author='someone', body=None, title=None, parent=None):
+        self.fullname = fullname
+        self.id = fullname[3:]
+        self.author = author
+        self.author_flair_css_class = None
+        self.created_utc = 0.0
+        self.body = body
+        self.title = title
+        self._parent = parent
+        self.replies = []
+        self.edits = []
+
+    async def parent(self):
+        return self._parent
+
+    async def load(self):
+        pass
+
+    async def reply(self, body):
+        self.replies.append(body)
+
+    async def edit(self, body):
+        self.edits.append(body)
+
+
+def unique_fullname(prefix):
+    # Unique ids, so the replyables are not skipped as processed by previous runs
+    return prefix + uuid.uuid4().hex[:8]
+
+
+class AsyncWorkerTest(unittest.TestCase):
+    """Class used to test async worker module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        response_index.load([('selemene commands', 1, LUNA_LINK), ('selemene commands', 2, PUCK_LINK)])
+        hero_resolver.load([(1, 'Luna', None), (2, 'Puck', None)])
+        self.identity = BotIdentity('Dota2_Responses_Bot')
+
+    def tearDown(self):
+        response_index.invalidate()
+        hero_resolver.invalidate()
+
+    def process(self, replyable):
+        asyncio.run(async_worker.process_replyable(None, self.identity, replyable))
+
+    def test_reply(self):
+        """Method that tests responses are replied to.
+        """
+        submission = FakeAsyncThing(unique_fullname('t3_'), title='Selemene commands!')
+        self.process(submission)
+        self.assertEqual(len(submission.replies), 1)
+        self.assertIn('Selemene commands!', submission.replies[0])
+
+        comment = FakeAsyncThing(unique_fullname('t1_'), body='Not a response')
+        self.process(comment)
+        self.assertEqual(comment.replies, [])
+
+    def test_update(self):
+        """Method that tests update requests from OP edit the bot's reply.
+        """
+        root = FakeAsyncThing(unique_fullname('t1_'), author='op', body='Selemene commands')
+        bot_comment = FakeAsyncThing(unique_fullname('t1_'), author='Dota2_Responses_Bot',
+                                     body='[Selemene commands](' + LUNA_LINK + ')', parent=root)
+        update_request = FakeAsyncThing(unique_fullname('t1_'), author='op', body='Try Puck', parent=bot_comment)
+
+        self.process(update_request)
+        self.assertEqual(update_request.replies, [])
+        self.assertEqual(len(bot_comment.edits), 1)
+        self.assertIn(PUCK_LINK, bot_comment.edits[0])
+        self.assertIn('(sound warning: Puck)', bot_comment.edits[0])
+
+    def test_skip_cached(self):
+        """Method that tests replyables already in cache are skipped without being classified.
+        """
+        comment = FakeAsyncThing(unique_fullname('t1_'), body='Selemene commands')
+        with mock.patch.object(async_worker.cache_api, 'exists', return_value=True), \
+                mock.patch.object(async_worker.replyable_classifier, 'parse') as parse:
+            self.process(comment)
+        parse.assert_not_called()
+        self.assertEqual(comment.replies, [])
+
+    def test_outbox(self):
+        """Method that tests replies and edits are put in the outbox and posted by its drainer, when it's enabled.
+        """
+        outbox_path = os.path.join(tempfile.gettempdir(), 'test_async_outbox.db')
+        if os.path.exists(outbox_path):
+            os.remove(outbox_path)
+        reddit = FakeReddit()
+        scheduler = ReplyScheduler(outbox_path, 3)
+
+        root = FakeAsyncThing(unique_fullname('t1_'), author='op', body='Selemene commands')
+        bot_comment = FakeAsyncThing(unique_fullname('t1_'), author='Dota2_Responses_Bot',
+                                     body='[Selemene commands](' + LUNA_LINK + ')', parent=root)
+        update_request = FakeAsyncThing(unique_fullname('t1_'), author='op', body='Try Puck', parent=bot_comment)
+        submission = FakeAsyncThing(unique_fullname('t3_'), title='Selemene commands!')
+
+        scheduler.start(reddit)
+        try:
+            with mock.patch.object(async_worker, 'reply_scheduler', scheduler):
+                self.process(submission)
+                self.process(update_request)
+            deadline = time.time() + 5
+            while len(scheduler.outbox) and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            scheduler.stop()
+            os.remove(outbox_path)
+
+        self.assertEqual(submission.replies, [])
+        self.assertEqual(bot_comment.edits, [])
+        self.assertEqual([fullname for fullname, _ in reddit.replies], [submission.fullname])
+        self.assertIn('Selemene commands!', reddit.replies[0][1])
+        self.assertEqual([fullname for fullname, _ in reddit.edits], [bot_comment.fullname])
+        self.assertIn(PUCK_LINK, reddit.edits[0][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
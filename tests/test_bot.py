@@ -2,15 +2,55 @@
 """
 
 import unittest
+import uuid
+from unittest import mock
+
+from praw.exceptions import APIException, RedditErrorItem
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
 
 import config
 from bot import account
 from bot import worker
+from bot.replay import FakeReddit, FakeThing
+from util.database.database import db_api
+from util.hero_resolver import hero_resolver
+from util.response_index import response_index
 
 __author__ = 'Jonarzz'
 __maintainer__ = 'MePsyDuck'
 
 
+class StopWorker(Exception):
+    pass
+
+
+class FakeStream:
+    """Stream of the fake subreddit, yields its replyables once and then stops the worker.
+    """
+
+    def __init__(self, replyables):
+        self.replyables = replyables
+
+    def comments(self, pause_after=None):
+        return self._stream([replyable for replyable in self.replyables if replyable.fullname.startswith('t1_')])
+
+    def submissions(self, pause_after=None):
+        return self._stream([replyable for replyable in self.replyables if replyable.fullname.startswith('t3_')])
+
+    @staticmethod
+    def _stream(replyables):
+        yield from replyables
+        yield None
+        raise StopWorker
+
+
+class FakeSubreddit:
+    def __init__(self, replyables):
+        self.stream = FakeStream(replyables)
+
+
 class BotWorkerTest(unittest.TestCase):
     """Class used to test bot worker module.
     Inherits from TestCase class of unittest module.
@@ -29,8 +69,67 @@ class BotWorkerTest(unittest.TestCase):
         self.assertEqual(worker.process_text(
             "> multiple quotes \n\n > but reply to \n\n > only first one"), "multiple quotes")
 
+    def test_identity(self):
+        """Method that tests authors are compared to bot's account by name, regardless of case.
+        """
+        identity = account.BotIdentity('Dota2_Responses_Bot')
+        self.assertTrue(identity.is_bot('dota2_responses_bot'))
+        self.assertFalse(identity.is_bot('MePsyDuck'))
+        self.assertFalse(identity.is_bot(None))
+
     def test_account(self):
         """Method used to test the Reddit instance returned by get_account()
         """
         reddit = account.get_account()
         self.assertEqual(reddit.user.me(), config.USERNAME)
+
+    def test_work(self):
+        """Method that tests the default entry point starts with a stubbed account and replies to the stream.
+        """
+        reddit = FakeReddit(username='Dota2_Responses_Bot')
+        # Unique id, so the comment is not skipped as processed by previous runs
+        comment = FakeThing(reddit, 't1_smoke_' + uuid.uuid4().hex[:8], author='someone', body='Selemene commands!')
+        reddit.subreddit = lambda name: FakeSubreddit([comment])
+        hero_resolver.load([(1, 'Luna', None)])
+
+        drainer_reddit = FakeReddit(username='Dota2_Responses_Bot')
+
+        with mock.patch.object(account, 'get_account', side_effect=[reddit, drainer_reddit]), \
+                mock.patch.object(db_api, 'get_all_responses',
+                                  return_value=[('selemene commands', 1, 'https://example.com/Luna_move_01.mp3')]), \
+                mock.patch.object(worker.reply_scheduler, 'start') as start_scheduler, \
+                mock.patch('signal.signal'):
+            try:
+                self.assertRaises(StopWorker, worker.work)
+            finally:
+                response_index.invalidate()
+                hero_resolver.invalidate()
+
+        # Outbox drainer doesn't share the Reddit instance of the streams
+        start_scheduler.assert_called_once_with(drainer_reddit)
+        self.assertEqual(len(reddit.replies), 1)
+        self.assertEqual(reddit.replies[0][0], comment.fullname)
+        self.assertIn('https://example.com/Luna_move_01.mp3', reddit.replies[0][1])
+
+    def test_process_replyables_error(self):
+        """Method that tests a failing replyable doesn't skip the rest of the batch, and the error is raised after it.
+        """
+        reddit = FakeReddit(username='Dota2_Responses_Bot')
+        replyables = [FakeThing(reddit, 't1_batch_' + uuid.uuid4().hex[:8]) for _ in range(3)]
+        error = APIException([RedditErrorItem('RATELIMIT', message='Slow down')])
+        handled = []
+
+        def handle_replyable(reddit, replyable):
+            handled.append(replyable.fullname)
+            if replyable is replyables[0]:
+                raise error
+
+        with mock.patch.object(worker, 'handle_replyable', side_effect=handle_replyable):
+            with self.assertRaises(APIException) as context:
+                worker.process_replyables(reddit, replyables)
+            self.assertIs(context.exception, error)
+            self.assertEqual(handled, [replyable.fullname for replyable in replyables])
+
+            # Replyables are in cache, so they're not processed again
+            worker.process_replyables(reddit, replyables)
+            self.assertEqual(len(handled), 3)
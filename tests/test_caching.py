@@ -0,0 +1,236 @@
+"""Module used to test caching module methods.
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from util.caching import bloom_cache
+from util.caching.bloom_cache import BloomCache
+from util.caching.db_cache import DBCache
+from util.caching.memory_cache import MemoryCache
+from util.caching.redis_cache import RedisCache
+from util.database.database import db_api
+from util.logger import logger
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+__author__ = 'MePsyDuck'
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class RedisCacheTest(unittest.TestCase):
+    """Class used to test redis cache against a local fake Redis.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        self.cache = RedisCache(redis=self.redis)
+
+    def test_exists(self):
+        """Method that tests a thing is new only the first time it's checked, and that it expires.
+        """
+        self.assertFalse(self.cache.exists('t1_abc'))
+        self.assertTrue(self.cache.exists('t1_abc'))
+        self.assertTrue(0 < self.redis.ttl('t1_abc') <= self.cache.ttl)
+
+    def test_exists_many(self):
+        """Method that tests batch checks, including ids repeated in the batch and ids set by other workers.
+        """
+        self.cache.exists('t1_abc')
+        RedisCache(redis=self.redis).exists('t1_other_worker')
+
+        self.assertEqual(self.cache.exists_many(['t1_abc', 't1_new', 't1_new', 't1_other_worker']),
+                         [True, False, True, True])
+        self.assertTrue(self.cache.exists('t1_new'))
+
+
+class DBCacheTest(unittest.TestCase):
+    """Class used to test DB cache partitions against the configured database.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        for day in db_api.get_cache_partitions():
+            db_api.drop_cache_partition(day)
+        self.cache = DBCache()
+
+    def tearDown(self):
+        for day in db_api.get_cache_partitions():
+            db_api.drop_cache_partition(day)
+
+    def test_exists(self):
+        """Method that tests things are new only the first time they're checked, also by other workers and in
+        partitions of previous days.
+        """
+        self.assertFalse(self.cache.exists('t1_abc'))
+        self.assertTrue(self.cache.exists('t1_abc'))
+        self.assertEqual(DBCache().exists_many(['t1_abc', 't1_new', 't1_new']), [True, False, True])
+
+        yesterday = self.cache.days[0] - 1
+        db_api.create_cache_partition(yesterday)
+        db_api.add_things_to_cache_partitions(['t1_old'], [yesterday])
+        self.cache.days = []
+        self.assertTrue(self.cache.exists('t1_old'))
+        self.assertFalse(self.cache.exists('t3_def'))
+
+    def test_expiry(self):
+        """Method that tests partitions older than CACHE_TTL days are dropped.
+        """
+        old_day = self.cache.days[0] - 100
+        db_api.create_cache_partition(old_day)
+        db_api.add_things_to_cache_partitions(['t1_old'], [old_day])
+        self.cache.days = []
+
+        self.assertFalse(self.cache.exists('t1_old'))
+        self.assertEqual(db_api.get_cache_partitions(), self.cache.days)
+
+    def test_rotate_on_exists_and_set(self):
+        """Method that tests separate checks and sets also start today's partition after the day changed.
+        """
+        yesterday = self.cache.days[0] - 1
+        db_api.drop_cache_partition(self.cache.days[0])
+        db_api.create_cache_partition(yesterday)
+        self.cache.days = [yesterday]
+
+        self.assertFalse(self.cache._exists('t1_abc'))
+        self.assertEqual(self.cache.days, [yesterday + 1, yesterday])
+        self.cache.days = [yesterday]
+        self.cache._set('t1_abc')
+        self.assertEqual(self.cache.days, [yesterday + 1, yesterday])
+        self.assertTrue(db_api.check_if_thing_in_cache_partitions('t1_abc', [yesterday + 1]))
+
+
+class BloomCacheTest(unittest.TestCase):
+    """Class used to test bloom filter cache.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        self.cache_url = os.path.join(tempfile.gettempdir(), 'test_bloom_cache.bin')
+        if os.path.exists(self.cache_url):
+            os.remove(self.cache_url)
+
+    def test_exists(self):
+        """Method that tests things are new only the first time they're checked, also after reloading from snapshot.
+        """
+        cache = BloomCache(cache_url=self.cache_url)
+        thing_ids = ['t1_' + str(i) for i in range(1000)]
+
+        self.assertFalse(any(cache.exists_many(thing_ids)))
+        self.assertTrue(all(cache.exists_many(thing_ids)))
+
+        cache._cleanup()
+        cache = BloomCache(cache_url=self.cache_url)
+        self.assertTrue(all(cache.exists_many(thing_ids)))
+        self.assertFalse(cache.exists('t3_new'))
+
+    def test_expiry(self):
+        """Method that tests generations older than CACHE_TTL days are dropped.
+        """
+        cache = BloomCache(cache_url=self.cache_url)
+        cache.exists('t1_old')
+        cache.generations[0].day -= 100
+        cache._rotate()
+
+        self.assertEqual(len(cache.generations), 1)
+        self.assertFalse(cache.exists('t1_old'))
+
+    def test_invalid_file(self):
+        """Method that tests short or invalid snapshot files are loaded as empty filter.
+        """
+        cache = BloomCache(cache_url=self.cache_url)
+        cache.exists('t1_abc')
+        cache._cleanup()
+        with open(self.cache_url, 'rb') as cache_file:
+            snapshot = cache_file.read()
+
+        for data in (b'', b'DRBF', snapshot[:-1], b'not a bloom cache file'):
+            with open(self.cache_url, 'wb') as cache_file:
+                cache_file.write(data)
+            with self.assertLogs(logger, 'WARNING'):
+                cache = BloomCache(cache_url=self.cache_url)
+            self.assertEqual(len(cache.generations), 1)
+            self.assertFalse(cache.exists('t1_abc'))
+
+    def test_snapshot(self):
+        """Method that tests filters are dumped periodically, by replacing the file only after it's written.
+        """
+        with mock.patch.object(bloom_cache, 'CACHE_BLOOM_SNAPSHOT_INTERVAL', 0.05):
+            cache = BloomCache(cache_url=self.cache_url)
+            cache.exists('t1_abc')
+            time.sleep(0.3)
+            cache.stop_event.set()
+
+        self.assertFalse(os.path.exists(self.cache_url + '.tmp'))
+        cache = BloomCache(cache_url=self.cache_url)
+        self.assertTrue(cache.exists('t1_abc'))
+
+
+class MemoryCacheTest(unittest.TestCase):
+    """Class used to test memory cache persistence.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        self.cache_url = os.path.join(tempfile.gettempdir(), 'test_memory_cache.bin')
+        for path in (self.cache_url, self.cache_url + '.log'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_log_replay(self):
+        """Method that tests keys flushed to log survive without a clean shutdown, including a partially written key.
+        """
+        cache = MemoryCache(cache_url=self.cache_url)
+        cache.exists('t1_abc')
+        cache.exists('t3_def')
+        cache._flush()
+        with open(self.cache_url + '.log', 'ab') as log_file:
+            log_file.write(b'\x0at1_')
+
+        cache = MemoryCache(cache_url=self.cache_url)
+        self.assertTrue(cache.exists('t1_abc'))
+        self.assertTrue(cache.exists('t3_def'))
+        self.assertFalse(cache.exists('t1_ghi'))
+
+    def test_append_after_recovery(self):
+        """Method that tests keys appended to the log after recovering from a partially written key are read back.
+        """
+        cache = MemoryCache(cache_url=self.cache_url)
+        cache.exists('t1_abc')
+        cache._flush()
+        with open(self.cache_url + '.log', 'ab') as log_file:
+            log_file.write(b'\x0at1_')
+
+        cache = MemoryCache(cache_url=self.cache_url)
+        cache.exists('t1_after1')
+        cache.exists('t1_after2')
+        cache._flush()
+
+        cache = MemoryCache(cache_url=self.cache_url)
+        self.assertEqual(list(cache.cache.keys()), ['t1_abc', 't1_after1', 't1_after2'])
+
+    def test_compaction(self):
+        """Method that tests compaction into snapshot clears the log, and JSON dumps from older versions are loaded.
+        """
+        with open(self.cache_url, 'w') as cache_json:
+            json.dump({'t1_old': ''}, cache_json)
+
+        cache = MemoryCache(cache_url=self.cache_url)
+        cache.exists('t1_new')
+        cache._cleanup()
+        self.assertEqual(os.path.getsize(self.cache_url + '.log'), 0)
+
+        cache = MemoryCache(cache_url=self.cache_url)
+        self.assertTrue(cache.exists('t1_old'))
+        self.assertTrue(cache.exists('t1_new'))
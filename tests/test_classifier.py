@@ -0,0 +1,102 @@
+"""Module used to test bot classifier module methods.
+"""
+
+import unittest
+from unittest import mock
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+import config
+from bot import classifier
+from bot.classifier import Classifier, Decision
+from util.hero_resolver import hero_resolver
+from util.response_index import response_index
+
+__author__ = 'MePsyDuck'
+
+
+class FakeReplyable:
+    """Minimal submission-like object, as classifier only needs the title and author's flair.
+    """
+
+    def __init__(self, title, author_flair_css_class=None):
+        self.fullname = 't3_test'
+        self.title = title
+        self.author_flair_css_class = author_flair_css_class
+
+
+class ClassifierTest(unittest.TestCase):
+    """Class used to test classifier module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        response_index.load([('selemene commands', 1, 'https://example.com/Luna_move_01.mp3')])
+        hero_resolver.load([(1, 'Luna', 'luna'), (2, 'Pudge', None)])
+        self.classifier = Classifier()
+
+    def tearDown(self):
+        response_index.invalidate()
+        hero_resolver.invalidate()
+
+    def test_parse_text(self):
+        """Method that tests the parse_text method from classifier module.
+        """
+        parsed = classifier.parse_text("Luna :: Selemene commands!", flair_css='flair-luna')
+        self.assertEqual(parsed.hero_name, 'Luna')
+        self.assertEqual(parsed.body, 'selemene commands')
+        self.assertEqual(parsed.flair_css, 'flair-luna')
+
+        parsed = classifier.parse_text("I agree with\n\n>Selemene commands")
+        self.assertIsNone(parsed.hero_name)
+        self.assertEqual(parsed.quoted_text, 'Selemene commands')
+        self.assertEqual(parsed.body, 'selemene commands')
+
+    def test_classify(self):
+        """Method that tests regular responses and rejects, which don't need db or Reddit access.
+        """
+        classification = self.classifier.classify(None, FakeReplyable("Selemene commands"))
+        self.assertEqual(classification.decision, Decision.REGULAR)
+        self.assertEqual(classification.response_info.hero_id, 1)
+
+        self.assertEqual(self.classifier.classify(None, FakeReplyable("Not a response")).decision, Decision.NONE)
+        self.assertEqual(self.classifier.classify(None, FakeReplyable("Thank you!")).decision, Decision.NONE)
+        self.assertEqual(self.classifier.classify(None, FakeReplyable("Ho ho ha ha")).decision, Decision.CUSTOM)
+
+        self.assertEqual(self.classifier.stage_stats['parse'].calls, 4)
+        self.assertEqual(self.classifier.stage_stats['regular'].calls, 1)
+
+    def test_classify_fuzzy(self):
+        """Method that tests near matches are replied to only when enabled.
+        """
+        self.assertEqual(self.classifier.classify(None, FakeReplyable("Selemene commandss")).decision, Decision.NONE)
+
+        with mock.patch.object(config, 'FUZZY_MATCH_THRESHOLD', 90):
+            classification = self.classifier.classify(None, FakeReplyable("Selemene commandss"))
+        self.assertEqual(classification.decision, Decision.FUZZY)
+        self.assertEqual(classification.response_info.link, 'https://example.com/Luna_move_01.mp3')
+
+    def test_classify_partial(self):
+        """Method that tests responses inside longer text are replied to only when enabled.
+        """
+        replyable = FakeReplyable("I think Selemene commands, right?")
+        self.assertEqual(self.classifier.classify(None, replyable).decision, Decision.NONE)
+
+        with mock.patch.object(config, 'PARTIAL_MATCHING', True):
+            classification = self.classifier.classify(None, replyable)
+        self.assertEqual(classification.decision, Decision.PARTIAL)
+        self.assertEqual(classification.response_info.response_text, 'selemene commands')
+
+    def test_classify_hero_specific(self):
+        """Method that tests heroes in "hero_name::" prefixes and flairs are resolved without db access.
+        """
+        classification = self.classifier.classify(None, FakeReplyable("LUNA:: Selemene commands"))
+        self.assertEqual(classification.decision, Decision.HERO_SPECIFIC)
+        self.assertEqual(classification.response_info.hero_id, 1)
+
+        self.assertEqual(self.classifier.classify(None, FakeReplyable("Pudge:: Selemene commands")).decision,
+                         Decision.NONE)
+
+        classification = self.classifier.classify(None, FakeReplyable("Selemene commands", 'luna'))
+        self.assertEqual(classification.decision, Decision.FLAIR_SPECIFIC)
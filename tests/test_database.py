@@ -0,0 +1,117 @@
+"""Module used to test database module methods against the sqlite database.
+"""
+
+import unittest
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from util.database.database import db_api
+
+__author__ = 'MePsyDuck'
+
+
+class DatabaseTest(unittest.TestCase):
+    """Class used to test database module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        db_api.drop_all_tables()
+        db_api.create_all_tables()
+
+    def tearDown(self):
+        db_api.drop_all_tables()
+        db_api.create_all_tables()
+
+    @staticmethod
+    def get_responses():
+        return sorted(db_api.get_all_responses(), key=lambda response: response[2])
+
+    def test_add_hero_and_responses(self):
+        """Method that tests responses are added with their hero, and links repeated in the batch are added once.
+        """
+        db_api.add_hero_and_responses('Axe', [('Axe is all!', 'axe is all', 'link_1'),
+                                              ('Come and get it!', 'come and get it', 'link_2'),
+                                              ('Axe is all!!', 'axe is all', 'link_1')])
+        axe_id = db_api.get_hero_id_by_name('axe')
+
+        self.assertIsNotNone(axe_id)
+        self.assertEqual(self.get_responses(), [('axe is all', axe_id, 'link_1'),
+                                                ('come and get it', axe_id, 'link_2')])
+
+    def test_existing_links(self):
+        """Method that tests links already in the table are not added again for another hero.
+        """
+        db_api.add_hero_and_responses('Axe', [('Come and get it!', 'come and get it', 'link_1')])
+        db_api.add_hero_and_responses('Pudge', [('Come and get it!', 'come and get it', 'link_1'),
+                                                ('Fresh meat!', 'fresh meat', 'link_2')])
+        axe_id, pudge_id = db_api.get_hero_id_by_name('axe'), db_api.get_hero_id_by_name('pudge')
+
+        self.assertIsNotNone(pudge_id)
+        self.assertEqual(self.get_responses(), [('come and get it', axe_id, 'link_1'),
+                                                ('fresh meat', pudge_id, 'link_2')])
+        self.assertEqual(db_api.get_existing_links(['link_1', 'link_2', 'link_3']), {'link_1', 'link_2'})
+
+    def test_large_batch(self):
+        """Method that tests batches bigger than the number of links checked per query.
+        """
+        responses = [('Response ' + str(i), 'response ' + str(i), 'link_' + str(i)) for i in range(1200)]
+        db_api.add_hero_and_responses('Axe', responses[:700])
+        db_api.add_hero_and_responses('Pudge', responses[300:] + responses[1100:])
+        axe_id, pudge_id = db_api.get_hero_id_by_name('axe'), db_api.get_hero_id_by_name('pudge')
+
+        stored = self.get_responses()
+        self.assertEqual(len(stored), 1200)
+        self.assertEqual(len({link for _, _, link in stored}), 1200)
+        heroes = {link: hero_id for _, hero_id, link in stored}
+        self.assertTrue(all(heroes['link_' + str(i)] == axe_id for i in range(700)))
+        self.assertTrue(all(heroes['link_' + str(i)] == pudge_id for i in range(700, 1200)))
+        self.assertEqual(len(db_api.get_existing_links(['link_' + str(i) for i in range(1500)])), 1200)
+
+    def test_sync_hero_responses(self):
+        """Method that tests responses of synced heroes are inserted, updated and deleted to match the lists.
+        """
+        self.assertEqual(db_api.sync_hero_responses([('Axe', [('Axe is all!', 'axe is all', 'link_1'),
+                                                              ('Come and get it!', 'come and get it', 'link_2')])]),
+                         (2, 0, 0))
+        db_api.add_hero_and_responses('Pudge', [('Fresh meat!', 'fresh meat', 'link_3')])
+
+        self.assertEqual(db_api.sync_hero_responses([('Axe', [('Axe is all!!', 'axe is all', 'link_1'),
+                                                              ('Fresh meat!', 'fresh meat', 'link_3'),
+                                                              ('Axe attacks!', 'axe attacks', 'link_4')])]),
+                         (1, 1, 1))
+        axe_id, pudge_id = db_api.get_hero_id_by_name('axe'), db_api.get_hero_id_by_name('pudge')
+
+        # Link of a hero not being synced stays with it
+        self.assertEqual(self.get_responses(), [('axe is all', axe_id, 'link_1'),
+                                                ('fresh meat', pudge_id, 'link_3'),
+                                                ('axe attacks', axe_id, 'link_4')])
+        self.assertEqual(db_api.get_link_for_response('axe is all'), ('link_1', axe_id))
+
+    def test_sync_moved_responses(self):
+        """Method that tests responses moved between synced heroes, also from removed ones, are kept.
+        """
+        db_api.add_hero_and_responses('Axe', [('Come and get it!', 'come and get it', 'link_1')])
+        db_api.add_hero_and_responses('Pudge', [('Fresh meat!', 'fresh meat', 'link_2')])
+        db_api.add_hero_and_responses('Butcher', [('Get over here!', 'get over here', 'link_3')])
+        axe_id, pudge_id = db_api.get_hero_id_by_name('axe'), db_api.get_hero_id_by_name('pudge')
+
+        # Link moves from Axe to Pudge, Butcher page is removed and its link moves to Axe
+        inserted, updated, deleted = db_api.sync_hero_responses(
+            [('Pudge', [('Fresh meat!', 'fresh meat', 'link_2'), ('Come and get it!', 'come and get it', 'link_1')]),
+             ('Axe', [('Get over here!', 'get over here', 'link_3')])],
+            removed_heroes=['Butcher'])
+
+        self.assertEqual((inserted, updated, deleted), (0, 2, 0))
+        self.assertEqual(self.get_responses(), [('come and get it', pudge_id, 'link_1'),
+                                                ('fresh meat', pudge_id, 'link_2'),
+                                                ('get over here', axe_id, 'link_3')])
+
+        # Responses of removed heroes are deleted if they're not moved
+        self.assertEqual(db_api.sync_hero_responses([], removed_heroes=['Pudge']), (0, 0, 2))
+        self.assertEqual(self.get_responses(), [('get over here', axe_id, 'link_3')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Module used to test dump_parser module methods.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from parsers import dump_parser
+
+__author__ = 'MePsyDuck'
+
+XML_DUMP = '''<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" version="0.10">
+  <siteinfo><sitename>Dota 2 Wiki</sitename></siteinfo>
+  <page>
+    <title>Axe/Responses</title>
+    <ns>0</ns>
+    <revision><id>100</id><text>* &lt;sm2&gt;Vo_axe_axe_move_01.mp3&lt;/sm2&gt; Axe is all!</text></revision>
+    <revision><id>101</id><text>* &lt;sm2&gt;Vo_axe_axe_move_02.mp3&lt;/sm2&gt; Axe is coming!</text></revision>
+  </page>
+  <page>
+    <title>Category:Responses</title>
+    <ns>14</ns>
+    <revision><id>5</id><text>Category page</text></revision>
+  </page>
+</mediawiki>
+'''
+
+
+class DumpParserTest(unittest.TestCase):
+    """Class used to test dump_parser module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_iter_xml_dump_pages(self):
+        """Method testing iter_xml_dump_pages method from dump_parser module.
+        The method checks if only articles are returned, with their latest revision.
+        """
+        dump_path = os.path.join(self.directory.name, 'dump.xml')
+        with open(dump_path, 'w', encoding='utf-8') as dump_file:
+            dump_file.write(XML_DUMP)
+
+        pages = list(dump_parser.iter_xml_dump_pages(dump_path))
+
+        self.assertEqual(pages, [('Axe/Responses', 101, '* <sm2>Vo_axe_axe_move_02.mp3</sm2> Axe is coming!')])
+
+    def test_iter_source_dir_pages(self):
+        """Method testing iter_source_dir_pages method from dump_parser module.
+        The method checks if page titles are created from paths of the files.
+        """
+        os.makedirs(os.path.join(self.directory.name, 'Axe'))
+        with open(os.path.join(self.directory.name, 'Axe', 'Responses.txt'), 'w', encoding='utf-8') as source_file:
+            source_file.write('Axe source')
+        with open(os.path.join(self.directory.name, 'Chat_Wheel.wiki'), 'w', encoding='utf-8') as source_file:
+            source_file.write('Chat wheel source')
+        open(os.path.join(self.directory.name, 'notes.md'), 'w').close()
+
+        pages = list(dump_parser.iter_source_dir_pages(self.directory.name))
+
+        self.assertEqual(pages, [('Axe/Responses', None, 'Axe source'), ('Chat_Wheel', None, 'Chat wheel source')])
+
+    def test_load_imageinfo(self):
+        """Method testing load_imageinfo method from dump_parser module.
+        The method checks if links are loaded from saved imageinfo query responses.
+        """
+        imageinfo_path = os.path.join(self.directory.name, 'imageinfo.json')
+        imageinfo = [{'query': {'pages': {'1': {'title': 'File:Vo axe axe move 02.mp3', 'imageinfo': [
+            {'url': 'https://example.com/Vo_axe_axe_move_02.mp3/revision/latest?cb=1', 'sha1': 'abc'}]}}}}]
+        with open(imageinfo_path, 'w', encoding='utf-8') as imageinfo_file:
+            json.dump(imageinfo, imageinfo_file)
+
+        self.assertEqual(dump_parser.load_imageinfo(imageinfo_path),
+                         {'Vo axe axe move 02.mp3': 'https://example.com/Vo_axe_axe_move_02.mp3'})
+
+    def test_load_imageinfo_mapping(self):
+        """Method testing load_imageinfo method from dump_parser module.
+        The method checks if links are loaded from plain mapping of file names to links.
+        """
+        imageinfo_path = os.path.join(self.directory.name, 'imageinfo.json')
+        with open(imageinfo_path, 'w', encoding='utf-8') as imageinfo_file:
+            json.dump({'Vo axe axe move 02.mp3': 'https://example.com/Vo_axe_axe_move_02.mp3'}, imageinfo_file)
+
+        self.assertEqual(dump_parser.load_imageinfo(imageinfo_path),
+                         {'Vo axe axe move 02.mp3': 'https://example.com/Vo_axe_axe_move_02.mp3'})
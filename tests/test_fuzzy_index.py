@@ -0,0 +1,58 @@
+"""Module used to test fuzzy_index module methods.
+"""
+
+import time
+import unittest
+from unittest import mock
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from util.fuzzy_index import FuzzyIndex
+from util.response_index import ResponseIndex
+
+__author__ = 'MePsyDuck'
+
+
+class FuzzyIndexTest(unittest.TestCase):
+    """Class used to test fuzzy_index module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        self.response_index = ResponseIndex()
+        self.response_index.load([('selemene commands', 1, 'link_1'),
+                                  ('the moon lights my way', 1, 'link_2'),
+                                  ('axe is all', 2, 'link_3')])
+        self.fuzzy_index = FuzzyIndex(self.response_index)
+
+    def test_find(self):
+        """Method testing that near matches above the threshold are found.
+        """
+        self.assertEqual(self.fuzzy_index.find('selemene commandss', threshold=90, budget=1)[0], 'selemene commands')
+        self.assertEqual(self.fuzzy_index.find('the mon lights my way', threshold=90, budget=1)[0],
+                         'the moon lights my way')
+        self.assertIsNone(self.fuzzy_index.find('selemene', threshold=90, budget=1))
+        self.assertIsNone(self.fuzzy_index.find('axe is all ' * 10, threshold=90, budget=1))
+        self.assertIsNone(self.fuzzy_index.find('selemene commandss', threshold=90, budget=0))
+
+    def test_rebuild(self):
+        """Method testing that index is rebuilt after the responses are reloaded.
+        """
+        self.assertIsNone(self.fuzzy_index.find('sven rules', threshold=90, budget=1))
+
+        self.response_index.load([('sven rules', 3, 'link_4')])
+        self.assertEqual(self.fuzzy_index.find('sven ruless', threshold=90, budget=1)[0], 'sven rules')
+
+    def test_budget_after_build(self):
+        """Method testing that building the index doesn't count towards the budget of the lookup.
+        """
+        ensure_built = self.fuzzy_index._ensure_built
+
+        def slow_ensure_built():
+            time.sleep(0.05)
+            ensure_built()
+
+        with mock.patch.object(self.fuzzy_index, '_ensure_built', side_effect=slow_ensure_built):
+            self.assertEqual(self.fuzzy_index.find('selemene commandss', threshold=90, budget=0.01)[0],
+                             'selemene commands')
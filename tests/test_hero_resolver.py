@@ -0,0 +1,63 @@
+"""Module used to test hero resolver module methods.
+"""
+
+import unittest
+from unittest import mock
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from util.database.database import db_api
+from util.hero_resolver import HeroResolver
+
+__author__ = 'MePsyDuck'
+
+
+class HeroResolverTest(unittest.TestCase):
+    """Class used to test hero resolver module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        heroes = [(1, 'Wraith King', 'wraith-king'), (2, "Nature's Prophet", 'natures-prophet'), (3, 'Sand King', None)]
+        self.resolver = HeroResolver()
+        with mock.patch.object(db_api, 'get_all_heroes', return_value=heroes):
+            self.resolver.load()
+
+    def test_get_hero_id_by_name(self):
+        """Method that tests names are matched in any case and punctuation, and aliases resolve to the heroes.
+        """
+        self.assertEqual(self.resolver.get_hero_id_by_name('Wraith King'), 1)
+        self.assertEqual(self.resolver.get_hero_id_by_name('wraith king'), 1)
+        self.assertEqual(self.resolver.get_hero_id_by_name("nature's prophet"), 2)
+        self.assertEqual(self.resolver.get_hero_id_by_name('nature s prophet'), 2)
+        self.assertEqual(self.resolver.get_hero_id_by_name('WK'), 1)
+        self.assertEqual(self.resolver.get_hero_id_by_name('skeleton king'), 1)
+        self.assertEqual(self.resolver.get_hero_id_by_name('sk'), 3)
+        self.assertIsNone(self.resolver.get_hero_id_by_name('Pudge'))
+
+    def test_get_hero_id_by_flair_css(self):
+        """Method that tests heroes are resolved by flair css class.
+        """
+        self.assertEqual(self.resolver.get_hero_id_by_flair_css('natures-prophet'), 2)
+        self.assertIsNone(self.resolver.get_hero_id_by_flair_css('pudge'))
+        self.assertIsNone(self.resolver.get_hero_id_by_flair_css(None))
+
+    def test_get_hero_name(self):
+        """Method that tests heroes' names are returned with proper formatting.
+        """
+        self.assertEqual(self.resolver.get_hero_name(2), "Nature's Prophet")
+        self.assertIsNone(self.resolver.get_hero_name(4))
+
+    def test_invalidate(self):
+        """Method that tests heroes are loaded from db again after the resolver is invalidated.
+        """
+        self.resolver.invalidate()
+        with mock.patch.object(db_api, 'get_all_heroes', return_value=[(5, 'Pudge', 'pudge')]) as get_all_heroes:
+            self.assertEqual(self.resolver.get_hero_id_by_name('pudge'), 5)
+            self.assertIsNone(self.resolver.get_hero_id_by_name('wk'))
+            get_all_heroes.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
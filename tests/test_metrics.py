@@ -0,0 +1,85 @@
+"""Module used to test metrics module methods.
+"""
+
+import unittest
+import urllib.request
+
+from util.metrics import MetricsRegistry, MetricsRequestHandler, start_http_server, time_methods
+
+__author__ = 'MePsyDuck'
+
+
+class MetricsTest(unittest.TestCase):
+    """Class used to test metrics module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        """Method that tests counters are kept and rendered separately for each combination of label values.
+        """
+        counter = self.registry.counter('test_lookups_total', 'Lookups.')
+        counter.inc(backend='RedisCache', result='hit')
+        counter.inc(2, result='miss', backend='RedisCache')
+        self.assertIs(self.registry.counter('test_lookups_total', 'Lookups.'), counter)
+
+        lines = self.registry.render().splitlines()
+        self.assertIn('# TYPE test_lookups_total counter', lines)
+        self.assertIn('test_lookups_total{backend="RedisCache",result="hit"} 1', lines)
+        self.assertIn('test_lookups_total{backend="RedisCache",result="miss"} 2', lines)
+
+        with self.assertRaises(ValueError):
+            self.registry.histogram('test_lookups_total', 'Lookups.')
+
+    def test_histogram(self):
+        """Method that tests bucket counts are rendered cumulative, with values above the last bucket only in +Inf.
+        """
+        histogram = self.registry.histogram('test_latency_seconds', 'Latency.', buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value)
+
+        lines = self.registry.render().splitlines()
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 2', lines)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 3', lines)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn('test_latency_seconds_sum 5.65', lines)
+        self.assertIn('test_latency_seconds_count 4', lines)
+
+    def test_time_methods(self):
+        """Method that tests public methods of decorated class are timed, labelled with the method name.
+        """
+        histogram = self.registry.histogram('test_method_seconds', 'Method time.')
+
+        @time_methods(histogram)
+        class API:
+            def query(self, value):
+                return value * 2
+
+            def _private(self):
+                return None
+
+        self.assertEqual(API().query(2), 4)
+        API()._private()
+        self.assertEqual(list(histogram.values), [(('method', 'query'),)])
+
+    def test_http_server(self):
+        """Method that tests metrics are served on /metrics.
+        """
+        self.registry.counter('test_requests_total', 'Requests.').inc()
+        default_registry = MetricsRequestHandler.registry
+        MetricsRequestHandler.registry = self.registry
+        server = start_http_server('127.0.0.1', 0)
+        try:
+            url = 'http://127.0.0.1:' + str(server.server_address[1]) + '/metrics'
+            with urllib.request.urlopen(url) as response:
+                self.assertIn('test_requests_total 1', response.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
+            MetricsRequestHandler.registry = default_registry
+
+
+if __name__ == '__main__':
+    unittest.main()
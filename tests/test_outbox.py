@@ -0,0 +1,109 @@
+"""Module used to test outbox module methods.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from praw.exceptions import RedditAPIException
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from bot.outbox import EDIT, REPLY, Outbox, OutboxDrainer, TokenBucket, get_ratelimit_delay
+
+__author__ = 'MePsyDuck'
+
+
+class OutboxTest(unittest.TestCase):
+    """Class used to test outbox and its drainer against fake Reddit objects.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        self.outbox_path = os.path.join(tempfile.gettempdir(), 'test_outbox.db')
+        if os.path.exists(self.outbox_path):
+            os.remove(self.outbox_path)
+        self.outbox = Outbox(self.outbox_path)
+        self.reddit = mock.Mock()
+        self.reddit.auth.limits = {'remaining': 600, 'reset_timestamp': time.time() + 600, 'used': 0}
+
+    def test_persistence(self):
+        """Method that tests items are kept across restarts until they are removed.
+        """
+        self.outbox.put(REPLY, 't1_abc', 'Reply')
+        self.outbox.put(EDIT, 't1_def', 'Edit')
+
+        outbox = Outbox(self.outbox_path)
+        self.assertEqual(len(outbox), 2)
+        item_id, action, thing_id, body, attempts = outbox.peek()
+        self.assertEqual((action, thing_id, body, attempts), (REPLY, 't1_abc', 'Reply', 0))
+
+        outbox.retry(item_id, 60)
+        self.assertEqual(outbox.peek()[2], 't1_def')
+        outbox.remove(outbox.peek()[0])
+        self.assertIsNone(outbox.peek())
+        self.assertEqual(outbox.peek(now=time.time() + 120)[2], 't1_abc')
+
+    def test_post(self):
+        """Method that tests posted items are removed, and rate limited ones are postponed and block the drainer.
+        """
+        drainer = OutboxDrainer(self.reddit, self.outbox, max_attempts=3)
+        self.outbox.put(REPLY, 't3_abc', 'Reply')
+        drainer.post(*self.outbox.peek())
+        self.reddit.submission.assert_called_once_with('abc')
+        self.reddit.submission.return_value.reply.assert_called_once_with('Reply')
+        self.assertEqual(len(self.outbox), 0)
+
+        self.outbox.put(EDIT, 't1_def', 'Edit')
+        error = RedditAPIException([['RATELIMIT', 'Take a break for 5 minutes before trying again.', 'ratelimit']])
+        self.reddit.comment.return_value.edit.side_effect = error
+        drainer.post(*self.outbox.peek())
+        self.assertEqual(len(self.outbox), 1)
+        self.assertIsNone(self.outbox.peek())
+        self.assertGreater(drainer.bucket.delay(), 290)
+
+    def test_drop(self):
+        """Method that tests items failing permanently, or too many times, are dropped.
+        """
+        drainer = OutboxDrainer(self.reddit, self.outbox, max_attempts=2)
+        self.reddit.comment.return_value.reply.side_effect = \
+            RedditAPIException([['DELETED_COMMENT', 'that comment has been deleted', 'parent']])
+        self.outbox.put(REPLY, 't1_abc', 'Reply')
+        drainer.post(*self.outbox.peek())
+        self.assertEqual(len(self.outbox), 0)
+
+        self.reddit.comment.return_value.reply.side_effect = ConnectionError
+        self.outbox.put(REPLY, 't1_def', 'Reply')
+        drainer.post(*self.outbox.peek())
+        self.assertEqual(len(self.outbox), 1)
+        drainer.post(*self.outbox.peek(now=time.time() + 60))
+        self.assertEqual(len(self.outbox), 0)
+
+    def test_token_bucket(self):
+        """Method that tests remaining requests are spread over the rest of the window.
+        """
+        bucket = TokenBucket()
+        self.assertEqual(bucket.delay(now=1000), 0)
+
+        bucket.update({'remaining': 10, 'reset_timestamp': 1100})
+        bucket.take(now=1000)
+        self.assertAlmostEqual(bucket.delay(now=1000), 100 / 9)
+
+        bucket.update({'remaining': 0, 'reset_timestamp': 1100})
+        self.assertEqual(bucket.delay(now=1050), 50)
+        self.assertEqual(bucket.delay(now=1100), 0)
+
+    def test_get_ratelimit_delay(self):
+        """Method that tests wait time is parsed from RATELIMIT errors only.
+        """
+        error = RedditAPIException([['RATELIMIT', 'Try again in 30 seconds.', 'ratelimit']])
+        self.assertEqual(get_ratelimit_delay(error), 31)
+        error = RedditAPIException([['THREAD_LOCKED', 'Comments are locked.', None]])
+        self.assertIsNone(get_ratelimit_delay(error))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""Module used to test replay module methods, with bot worker processing recorded replyables against fake Reddit.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from bot import worker
+from bot.replay import FakeReddit, load_recording, percentile, replay
+from util.hero_resolver import hero_resolver
+from util.response_index import response_index
+
+__author__ = 'MePsyDuck'
+
+LUNA_LINK = 'https://example.com/Luna_move_01.mp3'
+PUCK_LINK = 'https://example.com/Puck_move_01.mp3'
+RECORDING = [
+    {'fullname': 't3_sub', 'created_utc': 100.0, 'author': 'someone', 'author_flair_css_class': None,
+     'title': 'Selemene commands!'},
+    {'fullname': 't1_other', 'created_utc': 101.0, 'author': 'someone', 'author_flair_css_class': None,
+     'body': 'Not a response'},
+    {'fullname': 't1_try', 'created_utc': 102.0, 'author': 'op', 'author_flair_css_class': None, 'body': 'Try Puck',
+     'parent': {'fullname': 't1_bot', 'created_utc': 99.0, 'author': 'Dota2_Responses_Bot',
+                'author_flair_css_class': None, 'body': '[Selemene commands](' + LUNA_LINK + ')',
+                'parent': {'fullname': 't1_root', 'created_utc': 98.0, 'author': 'op',
+                           'author_flair_css_class': None, 'body': 'Selemene commands'}}},
+]
+
+
+class ReplayTest(unittest.TestCase):
+    """Class used to test replay module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        response_index.load([('selemene commands', 1, LUNA_LINK), ('selemene commands', 2, PUCK_LINK)])
+        hero_resolver.load([(1, 'Luna', None), (2, 'Puck', None)])
+        self.recording_path = os.path.join(tempfile.gettempdir(), 'test_replay.jsonl')
+        with open(self.recording_path, 'w', encoding='utf-8') as recording:
+            for item in RECORDING:
+                recording.write(json.dumps(item) + '\n')
+
+    def tearDown(self):
+        response_index.invalidate()
+        hero_resolver.invalidate()
+
+    def test_replay(self):
+        """Method that tests recorded replyables are replied to, and update requests edit the bot's comment.
+        """
+        reddit = FakeReddit(username='Dota2_Responses_Bot')
+        replyables = load_recording(reddit, self.recording_path)
+        self.assertEqual([replyable.created_utc for replyable in replyables], [100.0, 101.0, 102.0])
+
+        report = replay(replyables, reddit, worker.process_replyable)
+        self.assertEqual(report['replyables'], 3)
+        self.assertEqual(report['replies'], 1)
+        self.assertEqual(report['edits'], 1)
+        self.assertTrue(reddit.replies[0][0].startswith('t3_sub_'))
+        self.assertEqual(reddit.edits[0][0], 't1_bot')
+        self.assertIn('(sound warning: Puck)', reddit.edits[0][1])
+
+        # Ids are unique for each replay, so replyables are not skipped as processed by previous replay
+        replyables = load_recording(reddit, self.recording_path)
+        self.assertEqual(replay(replyables, reddit, worker.process_replyable)['replies'], 2)
+
+    def test_percentile(self):
+        """Method that tests nearest rank percentiles.
+        """
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([5], 90), 5)
+        self.assertEqual(percentile([], 50), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
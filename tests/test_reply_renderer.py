@@ -0,0 +1,56 @@
+"""Module used to test reply renderer module methods.
+"""
+
+import unittest
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+import config
+from util.hero_resolver import HeroResolver
+from util.reply_renderer import ReplyRenderer
+
+__author__ = 'MePsyDuck'
+
+
+class ReplyRendererTest(unittest.TestCase):
+    """Class used to test reply renderer module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        self.heroes = HeroResolver()
+        self.heroes.load([(1, 'Luna', None)])
+        self.renderer = ReplyRenderer(heroes=self.heroes)
+
+    def test_render(self):
+        """Method that tests replies are the same as formatted from the full reply template, also for cached fragments
+        and unknown heroes.
+        """
+        link = 'https://example.com/Luna_move_01.mp3'
+        expected = "[{}]({}) (sound warning: {}){}".format('Selemene commands', link, 'Luna', config.COMMENT_ENDING)
+        self.assertEqual(self.renderer.render('Selemene commands', link, 1), expected)
+        self.assertEqual(self.renderer.render('Selemene commands', link, 1), expected)
+
+        expected = "[{}]({}) (sound warning: {}){}".format('Selemene commands', link, None, config.COMMENT_ENDING)
+        self.assertEqual(self.renderer.render('Selemene commands', link, 2), expected)
+
+    def test_reload(self):
+        """Method that tests templates are prepared again when heroes are reloaded.
+        """
+        link = 'https://example.com/Luna_move_01.mp3'
+        self.renderer.render('Selemene commands', link, 1)
+        self.heroes.load([(1, 'Moon Rider', None)])
+
+        self.assertIn('(sound warning: Moon Rider)', self.renderer.render('Selemene commands', link, 1))
+
+    def test_render_custom(self):
+        """Method that tests custom replies are the same as formatted from the custom response.
+        """
+        for body, custom_response in config.CUSTOM_RESPONSES.items():
+            self.assertEqual(self.renderer.render_custom('Ho ho, ha ha!', body),
+                             custom_response.format('Ho ho, ha ha!', config.COMMENT_ENDING))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""Module used to test response_automaton module methods.
+"""
+
+import unittest
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from util.response_automaton import ResponseAutomaton
+from util.response_index import ResponseIndex
+
+__author__ = 'MePsyDuck'
+
+
+class ResponseAutomatonTest(unittest.TestCase):
+    """Class used to test response_automaton module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        self.response_index = ResponseIndex()
+        self.response_index.load([('selemene commands', 1, 'link_1'),
+                                  ('the moon lights my way', 1, 'link_2'),
+                                  ('moon lights', 1, 'link_3'),
+                                  ('thank you', 2, 'link_4')])
+        self.excluded_responses = {'thank you'}
+        self.automaton = ResponseAutomaton(self.response_index,
+                                           is_excluded=lambda text: text in self.excluded_responses,
+                                           get_excluded_responses=lambda: self.excluded_responses)
+
+    def test_find_longest(self):
+        """Method testing that the longest response contained in text is found on word boundaries.
+        """
+        self.assertEqual(self.automaton.find_longest('i think selemene commands this'), 'selemene commands')
+        self.assertEqual(self.automaton.find_longest('well the moon lights my way home'), 'the moon lights my way')
+        self.assertEqual(self.automaton.find_longest('the moon lights your way'), 'moon lights')
+        self.assertIsNone(self.automaton.find_longest('thank you selemene'))
+        self.assertIsNone(self.automaton.find_longest('selemene commandsss'))
+
+    def test_rebuild(self):
+        """Method testing that the automaton is rebuilt after the responses are reloaded.
+        """
+        self.assertIsNone(self.automaton.find_longest('i said sven rules'))
+
+        self.response_index.load([('sven rules', 3, 'link_5')])
+        self.assertEqual(self.automaton.find_longest('i said sven rules'), 'sven rules')
+
+    def test_rebuild_excluded(self):
+        """Method testing that the automaton is rebuilt after the excluded responses are reloaded.
+        """
+        self.assertEqual(self.automaton.find_longest('i think selemene commands this'), 'selemene commands')
+
+        self.excluded_responses = {'thank you', 'selemene commands'}
+        self.assertIsNone(self.automaton.find_longest('i think selemene commands this'))
@@ -0,0 +1,65 @@
+"""Module used to test response index module methods.
+"""
+
+import unittest
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from util.database.database import db_api
+from util.response_index import ResponseIndex
+
+__author__ = 'MePsyDuck'
+
+
+class ResponseIndexTest(unittest.TestCase):
+    """Class used to test response index module against the database.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        db_api.drop_all_tables()
+        db_api.create_all_tables()
+        db_api.add_hero_and_responses('Axe', [('Axe is all!', 'axe is all', 'link_1'),
+                                              ('Come and get it!', 'come and get it', 'link_2')])
+        db_api.add_hero_and_responses('Pudge', [('Come and get it!', 'come and get it', 'link_3')])
+        self.axe_id = db_api.get_hero_id_by_name('axe')
+        self.pudge_id = db_api.get_hero_id_by_name('pudge')
+        self.response_index = ResponseIndex()
+        self.response_index.load()
+
+    def tearDown(self):
+        db_api.drop_all_tables()
+        db_api.create_all_tables()
+
+    def test_load(self):
+        """Method that tests lookups in the loaded index match the responses in the db.
+        """
+        self.assertEqual(len(self.response_index), 2)
+        for processed_text, hero_id, link in db_api.get_all_responses():
+            self.assertIn(processed_text, self.response_index)
+            self.assertEqual(self.response_index.get_link_for_response(processed_text, hero_id), (link, hero_id))
+            self.assertEqual(self.response_index.get_link_for_response(processed_text, hero_id),
+                             db_api.get_link_for_response(processed_text, hero_id))
+
+        self.assertEqual(self.response_index.get_link_for_response('axe is all'), ('link_1', self.axe_id))
+        self.assertIn(self.response_index.get_link_for_response('come and get it'),
+                      [('link_2', self.axe_id), ('link_3', self.pudge_id)])
+        self.assertEqual(self.response_index.get_link_for_response('axe is all', self.pudge_id), (None, None))
+        self.assertEqual(self.response_index.get_link_for_response('fresh meat'), (None, None))
+
+    def test_invalidate(self):
+        """Method that tests responses added to the db are found only after the index is invalidated.
+        """
+        db_api.add_hero_and_responses('Butcher', [('Fresh meat!', 'fresh meat', 'link_4')])
+        self.assertNotIn('fresh meat', self.response_index)
+
+        self.response_index.invalidate()
+        self.assertIn('fresh meat', self.response_index)
+        self.assertEqual(self.response_index.get_link_for_response('fresh meat'),
+                         ('link_4', db_api.get_hero_id_by_name('butcher')))
+        self.assertEqual(len(self.response_index), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+"""Module used to test response_normalizer module methods.
+"""
+
+import unittest
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from parsers.response_normalizer import response_normalizer
+
+__author__ = 'MePsyDuck'
+
+
+class ResponseNormalizerTest(unittest.TestCase):
+    """Class used to test response_normalizer module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def test_normalize(self):
+        """Method testing normalize method of ResponseNormalizer with each of the rules.
+        """
+        cases = [(" Axe is all!", "Axe is all!"),
+                 (" {{resp|d|2}} Let's get this over with…", "Let's get this over with..."),
+                 (" <!-- unused --> Not a single tree.", "Not a single tree."),
+                 (" {{Hero Icon|crystal maiden|16px}} Not so tough now?", "Not so tough now?"),
+                 (" {{item icon|blink dagger|16px}} Blink!", "Blink!"),
+                 (" [[FILE:Rubick minimap icon.png|16px|link=Rubick]] Finally!", "Finally!"),
+                 (" [[Shitty Wizard]]! <small>''to Invoker''</small>", "Shitty Wizard!"),
+                 (" See you in [[Ancient (Building)|the ancients]].<ref>Ref</ref>", "See you in the ancients."),
+                 (" {{tooltip|Sundered|Sunder}} your soul. <nowiki>[1]</nowiki>", "Sundered your soul."),
+                 (" {{note|Rarely|Only in All Pick}} {{H|Sven}}, you fool!", "Rarely Sven, you fool!"),
+                 # Markup revealed by removing a comment is still processed
+                 (" {{re<!-- x -->sp|r}} Ho ho ha ha!", "Ho ho ha ha!"),
+                 # `re.IGNORECASE` matches Kelvin sign and long s with `k` and `s`
+                 (" {{reſp|r}} Ho ho!", "Ho ho!"),
+                 ]
+        for text, expected in cases:
+            self.assertEqual(response_normalizer.normalize(text), expected)
+
+    def test_normalize_invalid(self):
+        """Method testing that excluded responses and responses with unknown markup are not processed.
+        """
+        self.assertIsNone(response_normalizer.normalize(" Axe is all! (broken file)"))
+        self.assertIsNone(response_normalizer.normalize(" Broken markup [[here"))
@@ -0,0 +1,106 @@
+"""Module used to test response_request module methods.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from util import response_request
+
+__author__ = 'MePsyDuck'
+
+URL = 'https://example.com/api.php?action=cargoquery'
+
+
+class ResponseRequestTest(unittest.TestCase):
+    """Class used to test response_request module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.directory.name, 'excluded_responses.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_load_cargo_set(self):
+        """Method testing that cargo set is requested only when cache is missing or expired.
+        """
+        with mock.patch.object(response_request, 'request_cargo_set', return_value={'axe'}) as request_cargo_set:
+            self.assertEqual(response_request.load_cargo_set(URL, self.cache_path, ttl=3600)[0], {'axe'})
+            cargo_set, expires_at = response_request.load_cargo_set(URL, self.cache_path, ttl=3600)
+            self.assertEqual(cargo_set, {'axe'})
+            self.assertAlmostEqual(expires_at, time.time() + 3600, delta=60)
+            self.assertEqual(request_cargo_set.call_count, 1)
+
+            response_request.load_cargo_set(URL, self.cache_path, ttl=0)
+            self.assertEqual(request_cargo_set.call_count, 2)
+
+    def test_load_cargo_set_offline(self):
+        """Method testing that expired cached set is used if the request fails, and the request is retried later.
+        """
+        with mock.patch.object(response_request, 'request_cargo_set', return_value={'axe'}):
+            response_request.load_cargo_set(URL, self.cache_path, ttl=0)
+
+        with mock.patch.object(response_request, 'request_cargo_set', side_effect=requests.ConnectionError()):
+            self.assertEqual(response_request.load_cargo_set(URL, self.cache_path, ttl=0)[0], {'axe'})
+            cargo_set, expires_at = response_request.load_cargo_set(URL + '&tables=items', self.cache_path,
+                                                                     ttl=7 * 24 * 3600)
+            self.assertEqual(cargo_set, set())
+            self.assertAlmostEqual(expires_at, time.time() + response_request.RETRY_INTERVAL, delta=60)
+
+    def test_cargo_sets(self):
+        """Method testing that a set which failed to load is loaded again in background after it expires, instead of
+        being kept, and the stale set is used until then.
+        """
+        cargo_sets = response_request.CargoSets(self.cache_path, ttl=3600)
+        with mock.patch.object(response_request, 'request_cargo_set', side_effect=requests.ConnectionError()):
+            self.assertEqual(cargo_sets.get(URL), set())
+
+        with mock.patch.object(response_request, 'request_cargo_set', return_value={'axe'}) as request_cargo_set:
+            self.assertEqual(cargo_sets.get(URL), set())
+            request_cargo_set.assert_not_called()
+
+            with mock.patch.object(response_request.time, 'time',
+                                   return_value=time.time() + response_request.RETRY_INTERVAL + 1):
+                self.assertEqual(cargo_sets.get(URL), set())
+                deadline = time.monotonic() + 5
+                while cargo_sets.get(URL) != {'axe'} and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertEqual(cargo_sets.get(URL), {'axe'})
+                self.assertIs(cargo_sets.get(URL), cargo_sets.get(URL))
+            request_cargo_set.assert_called_once()
+
+    def test_cargo_sets_refresh(self):
+        """Method testing that expired set is loaded again without waiting for the wiki, and is kept if it fails.
+        """
+        cargo_sets = response_request.CargoSets(self.cache_path, ttl=0)
+        with mock.patch.object(response_request, 'request_cargo_set', return_value={'axe'}):
+            self.assertEqual(cargo_sets.get(URL), {'axe'})
+        os.remove(self.cache_path)
+
+        requested, release = threading.Event(), threading.Event()
+
+        def request_cargo_set(url):
+            requested.set()
+            release.wait(5)
+            raise requests.ConnectionError()
+
+        with mock.patch.object(response_request, 'request_cargo_set', side_effect=request_cargo_set):
+            # Lookups return the stale set while the request is pending, and start no other request
+            self.assertEqual(cargo_sets.get(URL), {'axe'})
+            self.assertTrue(requested.wait(5))
+            self.assertEqual(cargo_sets.get(URL), {'axe'})
+            self.assertIsNone(cargo_sets.refresh(URL))
+
+            release.set()
+            deadline = time.monotonic() + 5
+            while URL in cargo_sets.refreshing and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(cargo_sets.sets[URL][0], {'axe'})
@@ -0,0 +1,32 @@
+"""Module used to test sharding module methods.
+"""
+
+import unittest
+
+from util.sharding import check_shard_count, get_shard_subreddits
+
+__author__ = 'MePsyDuck'
+
+
+class ShardingTest(unittest.TestCase):
+    """Class used to test sharding module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def test_get_shard_subreddits(self):
+        """Method that tests every subreddit is assigned to exactly one shard, regardless of the order in config.
+        """
+        subreddits = ['dota2', 'DotA2Memes', 'learndota2', 'TrueDoTA2', 'dotamasterrace']
+        shards = [get_shard_subreddits(subreddits, shard_index=i, shard_count=2) for i in range(2)]
+
+        self.assertEqual(sorted(shards[0] + shards[1]), sorted(subreddits))
+        self.assertEqual(len(shards[0]), 3)
+        self.assertEqual(shards, [get_shard_subreddits(subreddits[::-1], shard_index=i, shard_count=2)
+                                  for i in range(2)])
+
+    def test_more_shards_than_subreddits(self):
+        """Method that tests more shards than subreddits are rejected, instead of some shards watching nothing.
+        """
+        check_shard_count(['dota2', 'learndota2'], shard_count=2)
+        self.assertRaises(ValueError, check_shard_count, ['dota2'], shard_count=2)
+        self.assertRaises(ValueError, get_shard_subreddits, ['dota2'], shard_index=1, shard_count=2)
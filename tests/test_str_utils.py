@@ -0,0 +1,30 @@
+"""Module used to test str_utils module methods.
+"""
+
+import unittest
+
+from util.str_utils import preprocess_text, preprocess_texts
+
+__author__ = 'MePsyDuck'
+
+
+class StrUtilsTest(unittest.TestCase):
+    """Class used to test str_utils module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def test_preprocess_text(self):
+        """Method testing preprocess_text method from str_utils module.
+        """
+        self.assertEqual(preprocess_text("  Selemene\tcommands!!  "), "selemene commands")
+        self.assertEqual(preprocess_text("I agree with\n\n>Selemene   COMMANDS..."), "i agree with selemene commands")
+        self.assertEqual(preprocess_text("Ça va, Rubick? "), "ça va rubick")
+        # Unicode whitespace is removed only from the ends
+        self.assertEqual(preprocess_text("\xa0Ho ho\xa0ha ha\xa0"), "ho ho\xa0ha ha")
+        self.assertEqual(preprocess_text("?!..."), "")
+
+    def test_preprocess_texts(self):
+        """Method testing that preprocess_texts gives same results as preprocess_text.
+        """
+        texts = ["Selemene commands!", "  Ho ho, HA HA  ", "Ça va, Rubick?", ""]
+        self.assertEqual(preprocess_texts(texts), [preprocess_text(text) for text in texts])
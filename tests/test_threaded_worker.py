@@ -0,0 +1,127 @@
+"""Module used to test threaded worker module methods, with fake streams and a fake `process_replyable`.
+"""
+
+import queue
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from bot import account
+from bot import threaded_worker
+from bot.replay import FakeReddit, FakeThing
+
+__author__ = 'MePsyDuck'
+
+
+def fake_stream(replyables):
+    """Stream that yields the replyables, and then pauses (yields None) forever, same as PRAW's stream with
+    `pause_after` set.
+    """
+    yield from replyables
+    while True:
+        time.sleep(0.01)
+        yield None
+
+
+class ThreadedWorkerTest(unittest.TestCase):
+    """Class used to test threaded worker module.
+    Inherits from TestCase class of unittest module.
+    """
+
+    def setUp(self):
+        self.reddit = FakeReddit()
+        self.replyables = [FakeThing(self.reddit, 't1_' + str(i)) for i in range(6)]
+
+    def test_reader_backpressure(self):
+        """Method that tests the stream reader waits for free space in a full queue, and is not stuck on stop.
+        """
+        replyable_queue = queue.Queue(maxsize=2)
+        stop_event = threading.Event()
+        stream = fake_stream(self.replyables)
+        reader = threaded_worker.StreamReader('reader', lambda: stream, replyable_queue, stop_event)
+        reader.start()
+
+        time.sleep(0.2)
+        self.assertTrue(reader.is_alive())
+        self.assertEqual(replyable_queue.qsize(), 2)
+
+        # Reader continues as soon as there is free space
+        self.assertIs(replyable_queue.get(), self.replyables[0])
+        self.assertIs(replyable_queue.get(timeout=2), self.replyables[1])
+        self.assertIs(replyable_queue.get(timeout=2), self.replyables[2])
+
+        # Reader blocked on the full queue stops without putting the rest of the stream
+        time.sleep(0.2)
+        stop_event.set()
+        reader.join(timeout=5)
+        self.assertFalse(reader.is_alive())
+        self.assertEqual([replyable_queue.get_nowait() for _ in range(replyable_queue.qsize())],
+                         self.replyables[3:5])
+        self.assertNotIn(self.replyables[5], list(replyable_queue.queue))
+
+    def test_shutdown_order(self):
+        """Method that tests shutdown stops the readers first, then the workers after processing all queued replyables,
+        and the reply scheduler last.
+        """
+        events = []
+        events_lock = threading.Lock()
+        replyable_queue = queue.Queue(maxsize=10)
+        stop_event = threading.Event()
+
+        def record(event):
+            with events_lock:
+                events.append(event)
+
+        def process_replyable(reddit, replyable):
+            time.sleep(0.01)
+            record(('processed', replyable.fullname))
+
+        stream = fake_stream(self.replyables)
+        reader = threaded_worker.StreamReader('reader', lambda: stream, replyable_queue, stop_event)
+        reader.start()
+        time.sleep(0.2)
+
+        with mock.patch.object(threaded_worker, 'process_replyable', side_effect=process_replyable), \
+                mock.patch.object(threaded_worker.reply_scheduler, 'stop',
+                                  side_effect=lambda: record(('scheduler stopped', None))):
+            # Workers start only now, so the queued replyables are processed while shutting down
+            workers = [threaded_worker.ReplyWorker('worker-' + str(i), self.reddit, replyable_queue) for i in range(2)]
+            for worker in workers:
+                worker.start()
+            threaded_worker.shutdown([reader], workers, replyable_queue, stop_event)
+
+        self.assertFalse(reader.is_alive())
+        self.assertFalse(any(worker.is_alive() for worker in workers))
+        self.assertEqual(sorted(events[:-1]), [('processed', replyable.fullname) for replyable in self.replyables])
+        self.assertEqual(events[-1], ('scheduler stopped', None))
+        self.assertTrue(replyable_queue.empty())
+
+    def test_shared_account(self):
+        """Method that tests requests to the shared Reddit instance are made one at a time.
+        """
+        active, overlaps = [0], []
+
+        def request(*args, **kwargs):
+            active[0] += 1
+            overlaps.append(active[0] > 1)
+            time.sleep(0.01)
+            active[0] -= 1
+
+        self.reddit.request = request
+        with mock.patch.object(account, 'get_account', return_value=self.reddit):
+            reddit = account.get_shared_account()
+
+        threads = [threading.Thread(target=reddit.request, kwargs={'method': 'GET', 'path': '/'}) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(overlaps, [False] * 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
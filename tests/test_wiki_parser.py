@@ -1,10 +1,16 @@
 """Module used to test dota_wiki_parser module methods.
 """
 
+import threading
 import unittest
+from unittest import mock
 
-from config import RESPONSES_CATEGORY
+# Imported first, so the bot creates its files in a temporary directory
+from tests import environment  # noqa: F401
+
+from config import RESPONSES_CATEGORY, URL_DOMAIN
 from parsers import wiki_parser
+from util.database.database import db_api
 
 __author__ = 'Jonarzz'
 __maintainer__ = 'MePsyDuck'
@@ -24,3 +30,151 @@ class WikiParserTest(unittest.TestCase):
         self.assertTrue(len(pages) > 150)
         self.assertTrue('Abaddon/Responses' in pages)
         self.assertTrue('Zeus/Responses' in pages)
+
+    def test_file_link_resolver(self):
+        """Method testing FileLinkResolver class from wiki_parser module.
+        The method checks if files added for multiple pages are deduplicated and packed into full batches.
+        """
+        requested_batches = []
+
+        def fake_wiki_get(url, params=None):
+            files = params['titles'][len('File:'):].split('|File:')
+            requested_batches.append(files)
+            pages = {str(index): {'title': 'File:' + file,
+                                  'imageinfo': [{'url': 'https://example.com/' + file + '/revision/latest'}]}
+                     for index, file in enumerate(files)}
+            response = mock.Mock()
+            response.json.return_value = {'query': {'pages': pages}}
+            return response
+
+        first_page_files = ['Response ' + str(index) + '.mp3' for index in range(40)]
+        second_page_files = ['Response ' + str(index) + '.mp3' for index in range(20, 70)]
+
+        with mock.patch.object(wiki_parser, 'wiki_get', fake_wiki_get):
+            with wiki_parser.FileLinkResolver() as resolver:
+                resolver.add(first_page_files)
+                resolver.add(second_page_files)
+                links = resolver.resolve()
+
+        self.assertEqual(len(links), 70)
+        self.assertEqual(links['Response 65.mp3'], 'https://example.com/Response 65.mp3')
+        self.assertEqual(sum(len(batch) for batch in requested_batches), 70)
+        self.assertEqual(len(requested_batches), 2)
+
+    def test_fetch_all_hero_responses(self):
+        """Method testing fetch_all_hero_responses method from wiki_parser module, with a mocked session.
+        The method checks if pages are written in order of the category as soon as their links are resolved, while
+        other pages are still being fetched.
+        """
+        sources = {'Axe/Responses': ''.join('* <sm2>Axe_response_' + str(index) + '.mp3</sm2> Axe response ' +
+                                            str(index) + '\n' for index in range(50)),
+                   'Empty/Responses': '',
+                   'Pudge/Responses': '* <sm2>Pudge_response.mp3</sm2> Fresh meat\n'}
+        axe_written = threading.Event()
+        pudge_fetched_after_axe = []
+
+        def fake_get(url, params=None):
+            response = mock.Mock()
+            if params == {'action': 'raw'}:
+                page = url[len(URL_DOMAIN + '/'):]
+                if page == 'Pudge/Responses':
+                    pudge_fetched_after_axe.append(axe_written.wait(timeout=5))
+                response.text = sources[page]
+            else:
+                files = params['titles'][len('File:'):].split('|File:')
+                response.json.return_value = {'query': {'pages': {
+                    str(index): {'title': 'File:' + file,
+                                 'imageinfo': [{'url': 'https://example.com/' + file + '/revision/latest'}]}
+                    for index, file in enumerate(files)}}}
+            return response
+
+        written = []
+
+        def write(hero_name, response_link_list):
+            written.append((hero_name, response_link_list))
+            if hero_name == 'Axe':
+                axe_written.set()
+
+        session = mock.Mock()
+        session.get.side_effect = fake_get
+        with mock.patch.object(wiki_parser, 'get_session', return_value=session), \
+                mock.patch.object(wiki_parser.rate_limiter, 'interval', 0):
+            with wiki_parser.FileLinkResolver() as resolver:
+                wiki_parser.fetch_all_hero_responses(resolver, list(sources), write)
+
+        self.assertEqual(pudge_fetched_after_axe, [True])
+        self.assertEqual([hero_name for hero_name, response_link_list in written], ['Axe', 'Empty', 'Pudge'])
+        self.assertEqual(len(written[0][1]), 50)
+        self.assertEqual(written[0][1][7], ('Axe response 7', 'axe response 7',
+                                            'https://example.com/Axe response 7.mp3'))
+        self.assertEqual(written[2][1], [('Fresh meat', 'fresh meat', 'https://example.com/Pudge response.mp3')])
+
+    def test_sync_responses(self):
+        """Method testing sync_responses method from wiki_parser module, with a mocked session.
+        The method checks if only changed pages are synced, and a response moved between pages is kept.
+        """
+        db_api.drop_all_tables()
+        db_api.create_all_tables()
+        self.addCleanup(db_api.create_all_tables)
+        self.addCleanup(db_api.drop_all_tables)
+
+        sources = {'Axe/Responses': '* <sm2>Axe_move.mp3</sm2> Axe is all\n',
+                   'Pudge/Responses': '* <sm2>Pudge_move.mp3</sm2> Fresh meat\n',
+                   'Chat_Wheel': ''}
+        requested_pages = []
+
+        def fake_get(url, params=None):
+            response = mock.Mock()
+            if params == {'action': 'raw'}:
+                requested_pages.append(url[len(URL_DOMAIN + '/'):])
+                response.text = sources[requested_pages[-1]]
+            else:
+                files = params['titles'][len('File:'):].split('|File:')
+                response.json.return_value = {'query': {'pages': {
+                    str(index): {'title': 'File:' + file, 'imageinfo': [{'url': 'https://example.com/' + file}]}
+                    for index, file in enumerate(files)}}}
+            return response
+
+        def sync(revisions):
+            session = mock.Mock()
+            session.get.side_effect = fake_get
+            with mock.patch.object(wiki_parser, 'get_session', return_value=session), \
+                    mock.patch.object(wiki_parser.rate_limiter, 'interval', 0), \
+                    mock.patch.object(wiki_parser, 'pages_for_category', return_value=['Axe/Responses',
+                                                                                       'Pudge/Responses']), \
+                    mock.patch.object(wiki_parser, 'revisions_for_pages', return_value=revisions):
+                wiki_parser.sync_responses()
+
+        sync({'Axe/Responses': 1, 'Pudge/Responses': 1, 'Chat_Wheel': 1})
+        self.assertEqual(sorted(requested_pages), ['Axe/Responses', 'Chat_Wheel', 'Pudge/Responses'])
+        self.assertEqual(db_api.get_link_for_response('axe is all'),
+                         ('https://example.com/Axe move.mp3', db_api.get_hero_id_by_name('axe')))
+
+        # Response moves from Pudge's page to Axe's page, which is synced first
+        requested_pages.clear()
+        sources['Axe/Responses'] += '* <sm2>Pudge_move.mp3</sm2> Fresh meat\n'
+        sources['Pudge/Responses'] = ''
+        sync({'Axe/Responses': 2, 'Pudge/Responses': 2, 'Chat_Wheel': 1})
+
+        self.assertEqual(sorted(requested_pages), ['Axe/Responses', 'Pudge/Responses'])
+        self.assertEqual(db_api.get_link_for_response('fresh meat'),
+                         ('https://example.com/Pudge move.mp3', db_api.get_hero_id_by_name('axe')))
+        self.assertEqual(db_api.get_wiki_page_revisions(), {'Axe/Responses': 2, 'Pudge/Responses': 2,
+                                                            'Chat_Wheel': 1})
+
+    def test_revisions_for_pages(self):
+        """Method testing revisions_for_pages method from wiki_parser module.
+        The method checks if revisions are returned for page titles as passed, not as normalized by MediaWiki.
+        """
+        response = mock.Mock()
+        response.json.return_value = {'query': {
+            'normalized': [{'from': 'Chat_Wheel', 'to': 'Chat Wheel'}],
+            'pages': {'1': {'title': 'Chat Wheel', 'revisions': [{'revid': 10}]},
+                      '2': {'title': 'Axe/Responses', 'revisions': [{'revid': 20}]},
+                      '-1': {'title': 'Missing/Responses', 'missing': ''}}}}
+
+        with mock.patch.object(wiki_parser, 'wiki_get', return_value=response) as wiki_get:
+            revisions = wiki_parser.revisions_for_pages(['Chat_Wheel', 'Axe/Responses', 'Missing/Responses'])
+
+        self.assertEqual(wiki_get.call_count, 1)
+        self.assertEqual(revisions, {'Chat_Wheel': 10, 'Axe/Responses': 20})
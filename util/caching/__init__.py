@@ -1,13 +1,24 @@
-from config import CACHE_PROVIDER
+from config import CACHE_PROVIDER, CACHE_URL, SHARD_COUNT, SHARD_INDEX
+from util.caching.bloom_cache import BloomCache
 from util.caching.db_cache import DBCache
 from util.caching.memory_cache import MemoryCache
 from util.caching.redis_cache import RedisCache
+from util.logger import logger
 
 
 def get_cache_api():
     if CACHE_PROVIDER == 'redis':
         return RedisCache()
     elif CACHE_PROVIDER == 'memory':
+        if SHARD_COUNT > 1:
+            # Each shard needs its own file, as the shards would overwrite each other's dumps
+            logger.warning('Memory cache is not shared between shards, use redis or db cache instead')
+            return MemoryCache(cache_url=CACHE_URL + '.' + str(SHARD_INDEX))
         return MemoryCache()
     elif CACHE_PROVIDER == 'db':
         return DBCache()
+    elif CACHE_PROVIDER == 'bloom':
+        if SHARD_COUNT > 1:
+            logger.warning('Bloom cache is not shared between shards, use redis or db cache instead')
+            return BloomCache(cache_url=CACHE_URL + '.' + str(SHARD_INDEX))
+        return BloomCache()
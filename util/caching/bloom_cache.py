@@ -0,0 +1,231 @@
+"""Module used to save cache in memory as Bloom filters, so days of replyable ids fit in a few MB.
+
+Ids are added to a Bloom filter for the current day (generation). A new generation is started every day and the ones
+older than `CACHE_TTL` days are dropped, so ids expire without the need to store any per id data. Each generation is
+sized for `CACHE_BLOOM_CAPACITY` ids with `CACHE_BLOOM_ERROR_RATE` false positive rate. A false positive means a new
+replyable is treated as already processed (bot does not reply), never the other way round.
+
+Filters are dumped to binary file every `CACHE_BLOOM_SNAPSHOT_INTERVAL` seconds and on shutdown, and loaded back up on
+startup. Each dump is written to a temporary file that replaces the old one only when complete, so a crash never leaves a
+broken file; a short or invalid file is treated as an empty filter.
+"""
+
+import atexit
+import hashlib
+import math
+import os
+import signal
+import struct
+import sys
+import threading
+import time
+
+from config import CACHE_URL, CACHE_TTL, CACHE_BLOOM_CAPACITY, CACHE_BLOOM_ERROR_RATE, CACHE_BLOOM_SNAPSHOT_INTERVAL
+from util.caching.caching import CacheAPI
+from util.logger import logger
+
+__author__ = 'MePsyDuck'
+
+SECONDS_IN_DAY = 24 * 60 * 60
+
+# File format : header, followed by each generation's header and bits
+SNAPSHOT_MAGIC = b'DRBF'
+SNAPSHOT_HEADER = struct.Struct('<4sBI')  # magic, version, number of generations
+GENERATION_HEADER = struct.Struct('<qQIQ')  # day, number of bits, number of hashes, number of ids added
+
+
+class BloomFilter:
+    def __init__(self, day, num_bits, num_hashes, count=0, bits=None):
+        """Bloom filter for ids added on a single day.
+
+        :param day: Day (number of days since epoch) of the generation
+        :param num_bits: Size of the filter in bits
+        :param num_hashes: Number of hash functions (bits set per id)
+        :param count: Number of ids already added
+        :param bits: Filter bits, if loaded from snapshot
+        """
+        self.day = day
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.count = count
+        self.bits = bytearray((num_bits + 7) // 8) if bits is None else bits
+
+    @classmethod
+    def for_capacity(cls, day, capacity, error_rate):
+        """Method to create an empty filter with optimal size for given capacity and false positive rate.
+
+        :param day: Day (number of days since epoch) of the generation
+        :param capacity: Expected number of ids
+        :param error_rate: False positive rate when filter is filled up to capacity
+        :return: BloomFilter
+        """
+        num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(day, num_bits, num_hashes)
+
+    def _positions(self, key):
+        """Method to get bit positions for the key, using double hashing of a single 128 bit digest.
+
+        :param key: The `key` to be hashed
+        :return: generator of bit positions
+        """
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def add(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+def encode_snapshot(generations):
+    """Method to encode filters in the snapshot file format.
+
+    :param generations: list of BloomFilter
+    :return: snapshot as bytes
+    """
+    snapshot = bytearray(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 1, len(generations)))
+    for generation in generations:
+        snapshot += GENERATION_HEADER.pack(generation.day, generation.num_bits, generation.num_hashes, generation.count)
+        snapshot += generation.bits
+    return bytes(snapshot)
+
+
+def decode_snapshot(data):
+    """Method to decode filters from the snapshot file format.
+
+    :param data: snapshot as bytes
+    :return: list of BloomFilter
+    :raises ValueError: if the snapshot is short or invalid
+    """
+    if len(data) < SNAPSHOT_HEADER.size:
+        raise ValueError('file is too short')
+    magic, version, num_generations = SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != 1:
+        raise ValueError('unknown file format')
+
+    generations = []
+    position = SNAPSHOT_HEADER.size
+    for _ in range(num_generations):
+        if position + GENERATION_HEADER.size > len(data):
+            raise ValueError('file is truncated')
+        day, num_bits, num_hashes, count = GENERATION_HEADER.unpack_from(data, position)
+        position += GENERATION_HEADER.size
+        end = position + (num_bits + 7) // 8
+        if end > len(data) or num_bits == 0 or num_hashes == 0:
+            raise ValueError('file is truncated')
+        generations.append(BloomFilter(day, num_bits, num_hashes, count, bytearray(data[position:end])))
+        position = end
+    return generations
+
+
+class BloomCache(CacheAPI):
+    def __init__(self, cache_url=CACHE_URL):
+        """Method that loads dumped filters from previous shutdown stored in binary file.
+
+        :param cache_url: Path to the binary file.
+        """
+        self.cache_url = cache_url
+        self.capacity = CACHE_BLOOM_CAPACITY
+        self.error_rate = CACHE_BLOOM_ERROR_RATE
+        self.generations = []
+        self.lock = threading.Lock()
+        self.snapshot_lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+        if os.path.exists(self.cache_url):
+            self._load()
+        self._rotate()
+
+        self.snapshotter = threading.Thread(target=self._snapshot_periodically, name='bloom-cache-snapshotter',
+                                            daemon=True)
+        self.snapshotter.start()
+        atexit.register(self._cleanup)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    def _load(self):
+        """Method to load filters from binary file. A short or invalid file (e.g. written partially by older versions)
+        is treated as an empty filter.
+        """
+        with open(self.cache_url, 'rb') as cache_file:
+            data = cache_file.read()
+
+        try:
+            self.generations = decode_snapshot(data)
+        except ValueError as e:
+            logger.warning('Invalid bloom cache file ' + self.cache_url + ', starting with empty filter : ' + str(e))
+
+    def _snapshot_periodically(self):
+        """Method run by the background snapshot thread.
+        """
+        while not self.stop_event.wait(CACHE_BLOOM_SNAPSHOT_INTERVAL):
+            try:
+                self._snapshot()
+            except OSError:
+                logger.exception('Failed to snapshot bloom cache')
+
+    def _snapshot(self):
+        """Method to dump filters to binary file. Filters are copied under the lock and written without it, to a
+        temporary file that replaces the old one only after it's completely written.
+        """
+        with self.snapshot_lock:
+            with self.lock:
+                snapshot = encode_snapshot(self.generations)
+
+            tmp_url = self.cache_url + '.tmp'
+            with open(tmp_url, 'wb') as cache_file:
+                cache_file.write(snapshot)
+                cache_file.flush()
+                os.fsync(cache_file.fileno())
+            os.replace(tmp_url, self.cache_url)
+
+    def _cleanup(self):
+        """Method to stop the snapshot thread and dump filters to binary file on script interrupt/shutdown.
+        """
+        self.stop_event.set()
+        self._snapshot()
+
+    def _rotate(self):
+        """Method to start a new generation if the day changed, and drop generations older than `CACHE_TTL` days.
+        Generations are ordered newest first.
+        """
+        today = int(time.time() // SECONDS_IN_DAY)
+        if not self.generations or self.generations[0].day != today:
+            self.generations.insert(0, BloomFilter.for_capacity(today, self.capacity, self.error_rate))
+        self.generations = [generation for generation in self.generations if today - generation.day <= CACHE_TTL]
+
+    def _exists(self, key):
+        """Method to check if key exists in any generation.
+
+        :param key: The `key` to to be checked in cache.
+        :return: `True` if `key` (probably) exists in cache.
+        """
+        return any(key in generation for generation in self.generations)
+
+    def _set(self, key):
+        """Method to add thing_id to the current generation.
+
+        :param key: The `key` to be added to the cache.
+        """
+        current = self.generations[0]
+        current.add(key)
+        if current.count == self.capacity:
+            logger.warning('Bloom cache reached its capacity for the day, false positive rate will increase')
+
+    def _check_and_set(self, key):
+        """Method to check if key exists in cache and add it if not, starting a new generation first if the day changed.
+        Runs under the lock, so the background snapshot never sees a filter being modified.
+
+        :param key: The `key` to be checked and added to cache.
+        :return: `True` if `key` (probably) existed in cache before.
+        """
+        with self.lock:
+            self._rotate()
+            return super()._check_and_set(key)
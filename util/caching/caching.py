@@ -5,8 +5,12 @@ Support for more implementations can be added by extending CacheAPI class.
 
 from abc import ABC, abstractmethod
 
+from util.metrics import metrics
+
 __author__ = 'MePsyDuck'
 
+cache_lookups = metrics.counter('bot_cache_lookups_total', 'Thing ids checked in cache, by backend and result.')
+
 
 class CacheAPI(ABC):
     @abstractmethod
@@ -17,6 +21,27 @@ class CacheAPI(ABC):
     def _set(self, key):
         pass
 
+    def _check_and_set(self, key):
+        """Method to check if `key` exists in cache and add it if it does not.
+        Not atomic by default, implementations supporting it should override this method.
+
+        :param key: The `key` to be checked and added to cache.
+        :return: `True` if `key` already existed in cache, else `False`.
+        """
+        if self._exists(key):
+            return True
+        else:
+            self._set(key)
+            return False
+
+    def _check_and_set_many(self, keys):
+        """Method to check and set multiple keys at once. Implementations supporting batching should override this method.
+
+        :param keys: The `keys` to be checked and added to cache.
+        :return: list of `True`/`False` for each key, same as `_check_and_set`.
+        """
+        return [self._check_and_set(key) for key in keys]
+
     def exists(self, thing_id):
         """Check if Reddit thing (currently comment/submission) is already processed/replied.
         If it is not in the cache, it adds the thing_id to cache.
@@ -24,8 +49,19 @@ class CacheAPI(ABC):
         :param thing_id: They id of comment/submission to be cached.
         :returns: `True` if replyable exists, else `False`.
         """
-        if self._exists(thing_id):
-            return True
-        else:
-            self._set(thing_id)
-            return False
+        exists = self._check_and_set(thing_id)
+        cache_lookups.inc(backend=type(self).__name__, result='hit' if exists else 'miss')
+        return exists
+
+    def exists_many(self, thing_ids):
+        """Check multiple Reddit things at once, e.g. all replyables returned by a single stream request.
+        Things not in the cache are added to it. If a thing_id is repeated, only its first occurrence is reported as new.
+
+        :param thing_ids: The ids of comments/submissions to be cached.
+        :returns: list of `True`/`False` for each thing_id, same as `exists`.
+        """
+        results = self._check_and_set_many(thing_ids)
+        hits = sum(results)
+        cache_lookups.inc(hits, backend=type(self).__name__, result='hit')
+        cache_lookups.inc(len(results) - hits, backend=type(self).__name__, result='miss')
+        return results
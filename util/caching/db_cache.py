@@ -1,25 +1,84 @@
-"""Module to store thing_ids in DB.
-Not recommended as this needs manual clearing of old ids.
+"""Module to store thing_ids in DB, so the cache is shared by all the workers using the same database.
+
+Ids are stored in a separate table for each day (partition), with the time each id was added. Checking and adding an id
+is a single insert-or-ignore statement using the primary key index of each partition, so lookups stay fast however long
+the bot runs. Ids expire by dropping whole partitions older than `CACHE_TTL` days, instead of deleting them row by row.
 """
 
+import threading
+import time
+
+from config import CACHE_TTL
 from util.caching.caching import CacheAPI
 from util.database.database import db_api
 
 __author__ = 'MePsyDuck'
 
+SECONDS_IN_DAY = 24 * 60 * 60
+
 
 class DBCache(CacheAPI):
+    def __init__(self):
+        """Method to create today's partition and drop expired ones.
+        """
+        self.days = []  # Days of live partitions, today first
+        self.lock = threading.Lock()
+        self._rotate()
+
+    def _rotate(self):
+        """Method to create a new partition if the day changed, and drop partitions older than `CACHE_TTL` days.
+        Partitions are shared by workers, so ones created or dropped by other workers are picked up too.
+        """
+        today = int(time.time() // SECONDS_IN_DAY)
+        if self.days and self.days[0] == today:
+            return
+
+        db_api.create_cache_partition(today)
+        days = []
+        for day in db_api.get_cache_partitions():
+            if today - day > CACHE_TTL:
+                db_api.drop_cache_partition(day)
+            elif day != today:
+                days.append(day)
+        self.days = [today] + sorted(days, reverse=True)
+
+    def _get_days(self):
+        """Method to get days of live partitions, rotating them first if the day changed. Entry point for all the cache
+        operations, so none of them uses partitions of a previous day.
+
+        :return: list of days, today first
+        """
+        with self.lock:
+            self._rotate()
+            return self.days
+
     def _exists(self, key):
-        """Method to check if key exists in DB cache.
+        """Method to check if key exists in any partition.
 
         :param key: The `key` to to be checked in DB cache.
         :return: `True` if `key` exist in DB cache.
         """
-        return db_api.check_if_thing_exists(key)
+        return db_api.check_if_thing_in_cache_partitions(key, self._get_days())
 
     def _set(self, key):
-        """Method to set `key` with `value` in DB cache.
+        """Method to add `key` to today's partition.
 
         :param key: The `key` (thing_id) to be added to DB cache.
         """
-        db_api.add_thing_to_cache(key)
+        db_api.add_things_to_cache_partitions([key], self._get_days()[:1])
+
+    def _check_and_set(self, key):
+        """Method to check and set `key` in a single statement.
+
+        :param key: The `key` (thing_id) to be checked and added to DB cache.
+        :return: `True` if `key` already existed in cache, else `False`.
+        """
+        return self._check_and_set_many([key])[0]
+
+    def _check_and_set_many(self, keys):
+        """Method to check and set multiple keys, all in a single transaction.
+
+        :param keys: The `keys` (thing_ids) to be checked and added to DB cache.
+        :return: list of `True`/`False` for each key, same as `_check_and_set`.
+        """
+        return db_api.add_things_to_cache_partitions(keys, self._get_days())
@@ -1,40 +1,171 @@
 """Module used to save cache in the memory.
 Uses FIFO eviction policy with maximum size of 10,000 and no ttl.
-JSON File used to dump data on shutdown and load it back up on startup.
+
+New keys are appended to a log file by a background flusher every `CACHE_FLUSH_INTERVAL` seconds, so at most a few
+seconds of keys are lost if the process is killed. When the log grows bigger than the cache, the cache is compacted into
+a binary snapshot file and the log is cleared. On startup the snapshot is loaded and the log is replayed on top of it,
+and a key written partially before a crash is cut off the log.
+JSON files dumped by older versions are still loaded, and replaced by the binary snapshot on first compaction.
 """
 
 import atexit
 import json
 import os
 import signal
+import struct
+import sys
+import threading
 from collections import OrderedDict
 
 from cacheout import FIFOCache
 
-from config import CACHE_URL
+from config import CACHE_URL, CACHE_FLUSH_INTERVAL
 from util.caching.caching import CacheAPI
+from util.logger import logger
 
 __author__ = 'MePsyDuck'
 
+MAX_SIZE = 10_000
+
+# Snapshot file format : header, followed by keys. Log file has only keys. Each key is prefixed by its length (1 byte).
+SNAPSHOT_MAGIC = b'DRMC'
+SNAPSHOT_HEADER = struct.Struct('<4sBI')  # magic, version, number of keys
+
+
+def encode_keys(keys):
+    """Method to encode keys (thing_ids) in length prefixed binary format.
+
+    :param keys: list of keys
+    :return: encoded keys as bytes
+    """
+    encoded = bytearray()
+    for key in keys:
+        key_bytes = key.encode()
+        encoded.append(len(key_bytes))
+        encoded += key_bytes
+    return bytes(encoded)
+
+
+def decode_keys(data):
+    """Method to decode keys from length prefixed binary format. Incomplete key at the end (written partially before
+    a crash) is ignored.
+
+    :param data: encoded keys as bytes
+    :return: tuple of (list of keys, number of bytes of the complete keys)
+    """
+    keys = []
+    position = 0
+    while position < len(data):
+        end = position + 1 + data[position]
+        if end > len(data):
+            break
+        keys.append(data[position + 1:end].decode())
+        position = end
+    return keys, position
+
 
 class MemoryCache(CacheAPI):
-    def __init__(self):
-        """Method that loads dumped cache from previous shutdown stored in json file.
-        """
-        self.cache = FIFOCache(maxsize=10_000, ttl=0, default='')
-        if os.path.exists(CACHE_URL):
-            with open(CACHE_URL) as cache_json:
-                old_cache = json.load(cache_json, object_pairs_hook=OrderedDict)
-                self.cache.set_many(old_cache)
+    def __init__(self, cache_url=CACHE_URL):
+        """Method that loads cache from the snapshot and log files, and starts the background flusher.
+
+        :param cache_url: Path to the snapshot file. Log file has the same path with `.log` suffix.
+        """
+        self.cache_url = cache_url
+        self.log_url = cache_url + '.log'
+        self.cache = FIFOCache(maxsize=MAX_SIZE, ttl=0, default='')
+        self.pending_keys = []
+        self.log_size = 0
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+        self._load()
+
+        self.flusher = threading.Thread(target=self._flush_periodically, name='memory-cache-flusher', daemon=True)
+        self.flusher.start()
         atexit.register(self._cleanup)
-        signal.signal(signal.SIGTERM, self._cleanup)
-        signal.signal(signal.SIGINT, self._cleanup)
+        # Exit normally on SIGTERM, so the cache is flushed and compacted by `_cleanup`
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    def _load(self):
+        """Method to load snapshot (binary or JSON dumped by older versions) and replay log on top of it.
+        """
+        if os.path.exists(self.cache_url):
+            with open(self.cache_url, 'rb') as cache_file:
+                data = cache_file.read()
+
+            if data.startswith(SNAPSHOT_MAGIC):
+                keys, _ = decode_keys(data[SNAPSHOT_HEADER.size:])
+            elif data.startswith(b'{'):
+                keys = list(json.loads(data, object_pairs_hook=OrderedDict))
+            else:
+                logger.error('Invalid memory cache file : ' + self.cache_url)
+                keys = []
+            self.cache.set_many(OrderedDict.fromkeys(keys, ''))
+
+        if os.path.exists(self.log_url):
+            with open(self.log_url, 'rb') as log_file:
+                data = log_file.read()
+            keys, size = decode_keys(data)
+            if size < len(data):
+                # Keys appended later would be read starting inside the incomplete key
+                logger.warning('Truncating incomplete key at the end of memory cache log : ' + self.log_url)
+                os.truncate(self.log_url, size)
+            self.cache.set_many(OrderedDict.fromkeys(keys, ''))
+            self.log_size = len(keys)
+
+        logger.info('Loaded ' + str(len(self.cache)) + ' keys in memory cache')
+
+    def _flush_periodically(self):
+        """Method run by the background flusher thread.
+        """
+        while not self.stop_event.wait(CACHE_FLUSH_INTERVAL):
+            try:
+                self._flush()
+            except OSError:
+                logger.exception('Failed to flush memory cache')
+
+    def _flush(self, compact=False):
+        """Method to append pending keys to the log file, and compact the cache into snapshot if the log is too big.
+
+        :param compact: Compact even if the log is small.
+        """
+        with self.flush_lock:
+            with self.lock:
+                pending_keys, self.pending_keys = self.pending_keys, []
+
+            if pending_keys:
+                with open(self.log_url, 'ab') as log_file:
+                    log_file.write(encode_keys(pending_keys))
+                    log_file.flush()
+                    os.fsync(log_file.fileno())
+                self.log_size += len(pending_keys)
+
+            if compact or self.log_size > MAX_SIZE:
+                self._compact()
+
+    def _compact(self):
+        """Method to write all keys to a new snapshot file and clear the log.
+        Snapshot replaces the old one only after it's completely written, so a crash never leaves a broken snapshot.
+        """
+        keys = list(self.cache.keys())
+        tmp_url = self.cache_url + '.tmp'
+        with open(tmp_url, 'wb') as cache_file:
+            cache_file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 1, len(keys)))
+            cache_file.write(encode_keys(keys))
+            cache_file.flush()
+            os.fsync(cache_file.fileno())
+        os.replace(tmp_url, self.cache_url)
+
+        # Keys in log are already in the snapshot
+        open(self.log_url, 'wb').close()
+        self.log_size = 0
 
     def _cleanup(self):
-        """Method to dump cache data to json file on script interrupt/shutdown.
+        """Method to stop the flusher, and flush and compact the cache on script interrupt/shutdown.
         """
-        with open(CACHE_URL, 'w+') as cache_json:
-            json.dump(self.cache.copy(), cache_json)
+        self.stop_event.set()
+        self._flush(compact=True)
 
     def _exists(self, key):
         """Method to check if key exists in cache.
@@ -45,8 +176,10 @@ class MemoryCache(CacheAPI):
         return key in self.cache
 
     def _set(self, key):
-        """Method to add thing_id to the cache.
+        """Method to add thing_id to the cache. Key is written to log file by the flusher.
 
         :param key: The `key` to be added to the cache.
         """
         self.cache.set(key, '')
+        with self.lock:
+            self.pending_keys.append(key)
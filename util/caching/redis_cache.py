@@ -1,10 +1,15 @@
 """Module that allows Redis to be used as cache. Useful when running on Heroku or such platforms without persistent
 file storage.
+
+Checking and adding a key is done in a single atomic request (SET with NX and EX options), so multiple workers can share
+the cache without processing the same replyable twice. Keys seen by this process are also kept in a small local LRU
+cache, to skip requests to Redis for repeated ids.
 """
 
+from cacheout import LRUCache
 from redis import Redis
 
-from config import CACHE_URL, CACHE_TTL
+from config import CACHE_URL, CACHE_TTL, CACHE_LOCAL_SIZE
 from util.caching.caching import CacheAPI
 from util.logger import logger
 
@@ -12,11 +17,18 @@ __author__ = 'MePsyDuck'
 
 
 class RedisCache(CacheAPI):
-    def __init__(self):
+    def __init__(self, redis=None):
         """Create a new Redis instance when a new object for this class is created.
+
+        :param redis: Redis client to be used instead of connecting to `CACHE_URL`.
         """
-        self.redis = Redis.from_url(CACHE_URL)
-        logger.info('Connected to Redis at ' + CACHE_URL)
+        if redis is None:
+            self.redis = Redis.from_url(CACHE_URL)
+            logger.info('Connected to Redis at ' + CACHE_URL)
+        else:
+            self.redis = redis
+        self.local_cache = LRUCache(maxsize=CACHE_LOCAL_SIZE, ttl=0)
+        self.ttl = CACHE_TTL * 24 * 60 * 60
 
     def _exists(self, key):
         """Method to check if `key` exists in redis cache.
@@ -24,7 +36,7 @@ class RedisCache(CacheAPI):
         :param key: The `key` to to be checked in redis cache.
         :return: `True` if `key` exists in redis cache.
         """
-        if self.redis.exists(key):
+        if key in self.local_cache or self.redis.exists(key):
             return True
 
     def _set(self, key):
@@ -33,4 +45,39 @@ class RedisCache(CacheAPI):
 
         :param key: The `key` (thing_id) to be added to redis cache.
         """
-        self.redis.set(name=key, value='', ex=CACHE_TTL * 60 * 60)
+        self.redis.set(name=key, value='', ex=self.ttl)
+        self.local_cache.set(key, '')
+
+    def _check_and_set(self, key):
+        """Method to check and set `key` in redis in one request. Key expires after CACHE_TTL days.
+
+        :param key: The `key` (thing_id) to be checked and added to redis cache.
+        :return: `True` if `key` already existed in cache, else `False`.
+        """
+        if key in self.local_cache:
+            return True
+
+        is_new = self.redis.set(name=key, value='', ex=self.ttl, nx=True)
+        self.local_cache.set(key, '')
+        return not is_new
+
+    def _check_and_set_many(self, keys):
+        """Method to check and set multiple keys in redis, all in one pipelined request.
+
+        :param keys: The `keys` (thing_ids) to be checked and added to redis cache.
+        :return: list of `True`/`False` for each key, same as `_check_and_set`.
+        """
+        results = [key in self.local_cache for key in keys]
+        pending = [index for index, cached in enumerate(results) if not cached]
+
+        if pending:
+            with self.redis.pipeline(transaction=False) as pipe:
+                for index in pending:
+                    pipe.set(name=keys[index], value='', ex=self.ttl, nx=True)
+                replies = pipe.execute()
+
+            for index, is_new in zip(pending, replies):
+                results[index] = not is_new
+                self.local_cache.set(keys[index], '')
+
+        return results
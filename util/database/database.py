@@ -1,16 +1,29 @@
 import datetime
 import random
+import time
 import urllib.parse as up
 
-from pony.orm import db_session, commit
+from pony.orm import TransactionIntegrityError, db_session, flush, select
 
 from config import CACHE_TTL, DB_URL, DB_PROVIDER
-from util.database.models import Responses, Heroes, RedditCache, db
+from util.database.models import Responses, Heroes, RedditCache, RedditCachePartitions, WikiPages, WikiFiles, db
 from util.logger import logger
+from util.metrics import metrics, time_methods
 
 __author__ = 'MePsyDuck'
 
+# Statement adding thing id to cache partition only if it's not in any partition, for each db provider. Ids already in
+# the table itself are skipped by the primary key, so workers sharing the cache never add the same id twice.
+INSERT_IF_NEW_SQL = {
+    'sqlite': 'INSERT OR IGNORE INTO {table} (thing_id, added_at) SELECT $thing_id, $added_at{where}',
+    'mysql': 'INSERT IGNORE INTO {table} (thing_id, added_at) SELECT $thing_id, $added_at FROM DUAL{where}',
+    'postgres': 'INSERT INTO {table} (thing_id, added_at) SELECT $thing_id, $added_at{where} ON CONFLICT DO NOTHING',
+}
 
+db_query_time = metrics.histogram('bot_db_query_seconds', 'Time spent in DatabaseAPI methods, including db session.')
+
+
+@time_methods(db_query_time)
 class DatabaseAPI:
     def __init__(self):
         """Method to initialize db connection. Binds PonyORM Database object `db` to configured database.
@@ -54,6 +67,14 @@ class DatabaseAPI:
         else:
             return None, None
 
+    @db_session
+    def get_all_responses(self):
+        """Method to get all the responses with the hero they belong to. Used to build in-memory response index.
+
+        :return: list of tuples in the form of (processed_text, hero_id, link).
+        """
+        return select((r.processed_text, r.hero_id.id, r.response_link) for r in Responses)[:]
+
     # RedditCache table queries
     @db_session
     def add_thing_to_cache(self, thing_id):
@@ -78,8 +99,81 @@ class DatabaseAPI:
         :param thing_id: The id of the replyable/submission on Reddit
         :return: True if the `thing_id` is already present in table, else False
         """
-        thing = RedditCache.select(lambda t: t.thing_id == thing_id)
-        return thing is not None
+        return RedditCache.exists(thing_id=thing_id)
+
+    # RedditCache partition tables queries
+    @staticmethod
+    def get_cache_partition_table(day):
+        """Method to get name of the cache table for the day, e.g. `reddit_cache_20200131`.
+
+        :param day: Number of days since epoch
+        :return: Table name
+        """
+        return 'reddit_cache_' + (datetime.date(1970, 1, 1) + datetime.timedelta(days=day)).strftime('%Y%m%d')
+
+    @db_session
+    def get_cache_partitions(self):
+        """Method to get all the days that have a cache table.
+
+        :return: list of days (number of days since epoch).
+        """
+        return select(p.day for p in RedditCachePartitions)[:]
+
+    def create_cache_partition(self, day):
+        """Method to create cache table for the day, if it does not exist yet.
+
+        :param day: Number of days since epoch
+        """
+        with db_session:
+            self.db.execute('CREATE TABLE IF NOT EXISTS ' + self.get_cache_partition_table(day) +
+                            ' (thing_id VARCHAR(20) NOT NULL PRIMARY KEY, added_at BIGINT NOT NULL)')
+        try:
+            with db_session:
+                if not RedditCachePartitions.exists(day=day):
+                    RedditCachePartitions(day=day)
+        except TransactionIntegrityError:
+            # Registered by another worker at the same time
+            pass
+
+    @db_session
+    def drop_cache_partition(self, day):
+        """Method to drop cache table for the day, expiring all the thing ids in it at once.
+
+        :param day: Number of days since epoch
+        """
+        self.db.execute('DROP TABLE IF EXISTS ' + self.get_cache_partition_table(day))
+        RedditCachePartitions.select(lambda p: p.day == day).delete(bulk=True)
+
+    @db_session
+    def check_if_thing_in_cache_partitions(self, thing_id, days):
+        """Method that checks if the thing id is present in any of the cache tables.
+
+        :param thing_id: The id of the replyable/submission on Reddit
+        :param days: Days of the cache tables to be checked
+        :return: True if the `thing_id` is present in any table, else False
+        """
+        sql = ' UNION ALL '.join('SELECT 1 FROM ' + self.get_cache_partition_table(day) + ' WHERE thing_id = $thing_id'
+                                 for day in days)
+        return bool(sql) and bool(self.db.select(sql, {'thing_id': thing_id}))
+
+    @db_session
+    def add_things_to_cache_partitions(self, thing_ids, days):
+        """Method that adds thing ids to the cache table of the first day, unless they are present in any of the cache
+        tables. Each id is checked and added in a single statement using the primary key index of each table, and all
+        the ids in a single transaction.
+
+        :param thing_ids: The ids of replyables/submissions on Reddit
+        :param days: Days of the cache tables, the one ids are added to first.
+        :return: list of `True` if thing id was already present, else `False`, for each thing id.
+        """
+        where = ' AND '.join('NOT EXISTS (SELECT 1 FROM ' + self.get_cache_partition_table(day) +
+                             ' WHERE thing_id = $thing_id)' for day in days[1:])
+        sql = INSERT_IF_NEW_SQL.get(DB_PROVIDER, INSERT_IF_NEW_SQL['sqlite']).format(
+            table=self.get_cache_partition_table(days[0]), where=' WHERE ' + where if where else '')
+
+        added_at = int(time.time())
+        return [self.db.execute(sql, {'thing_id': thing_id, 'added_at': added_at}).rowcount == 0
+                for thing_id in thing_ids]
 
     # Heroes table queries
     @db_session
@@ -92,6 +186,14 @@ class DatabaseAPI:
         """
         Heroes(hero_name=hero_name, img_path=img_path, flair_css=flair_css)
 
+    @db_session
+    def get_all_heroes(self):
+        """Method to get all the heroes. Used to build in-memory hero resolver.
+
+        :return: list of tuples in the form of (hero_id, hero_name, flair_css).
+        """
+        return select((h.id, h.hero_name, h.flair_css) for h in Heroes)[:]
+
     @db_session
     def get_hero_id_by_name(self, hero_name):
         """Method to get hero's id from table.
@@ -167,19 +269,181 @@ class DatabaseAPI:
     @db_session
     def add_hero_and_responses(self, hero_name, response_link_list):
         """Method to add hero and it's responses to the db.
+        Responses are loaded in bulk: links already in the table are fetched in a few queries, and only new responses
+        are inserted in batches. Hero and responses are added in a single transaction.
 
         :param hero_name: Hero name who's responses will be inserted
         :param response_link_list: List with tuples in the form of (original_text, text, link)
         """
         h = Heroes(hero_name=hero_name, img_path=None, flair_css=None)
-        commit()
+        flush()
 
+        existing_links = self.get_existing_links([link for _, _, link in response_link_list])
+
+        rows = []
         for original_text, processed_text, link in response_link_list:
-            existing_response = Responses.get(response_link=link)
-            if not existing_response:
-                Responses(processed_text=processed_text, original_text=original_text, response_link=link, hero_id=h.id)
+            if link in existing_links:
+                logger.debug('Link already exists : ' + link + ' for response ' + original_text)
             else:
-                logger.debug('Link already exists : ' + link + ' for response ' + existing_response.original_text)
+                # Same link can be repeated in the list
+                existing_links.add(link)
+                rows.append((processed_text, original_text, link, h.id))
+
+        self.insert_many(Responses, ['processed_text', 'original_text', 'response_link', 'hero_id'], rows)
+
+    @db_session
+    def get_existing_links(self, links, batch_size=500):
+        """Method to get the links that are already in the Responses table. Queries in batches, to keep the number of
+        query parameters under the limits of the db.
+
+        :param links: List of links to be checked
+        :param batch_size: Number of links checked per query
+        :return: Set of links already present in the table
+        """
+        existing_links = set()
+        for i in range(0, len(links), batch_size):
+            batch = links[i:i + batch_size]
+            existing_links.update(select(r.response_link for r in Responses if r.response_link in batch)[:])
+        return existing_links
+
+    @db_session
+    def sync_hero_responses(self, hero_responses, removed_heroes=()):
+        """Method to update responses of the heroes in the db to match the lists of responses parsed from the wiki.
+        Heroes are added if they're not in the table yet. The diff is computed across all the heroes before anything is
+        changed, and responses are matched by link:
+        * responses no longer in any of the lists are deleted
+        * responses with changed text are updated
+        * responses moved to another synced hero are updated to belong to it
+        * new responses are inserted in bulk, unless the link already belongs to a hero not being synced
+
+        :param hero_responses: list of tuples (hero name, list with tuples in the form of (original_text, text, link)).
+        A link in lists of multiple heroes goes to the first one.
+        :param removed_heroes: Names of the heroes (pages) no longer on the wiki, their responses are deleted unless
+        moved to a synced hero.
+        :return: tuple with numbers of (inserted, updated, deleted) responses
+        """
+        hero_names = [hero_name for hero_name, _ in hero_responses]
+        heroes = {hero.hero_name: hero for hero in Heroes.select(lambda h: h.hero_name in hero_names)}
+        for hero_name in hero_names:
+            if hero_name not in heroes:
+                heroes[hero_name] = Heroes(hero_name=hero_name, img_path=None, flair_css=None)
+        flush()
+
+        new_responses = {}
+        for hero_name, response_link_list in hero_responses:
+            for original_text, processed_text, link in response_link_list:
+                # Same link can be repeated in the lists
+                new_responses.setdefault(link, (heroes[hero_name], original_text, processed_text))
+
+        synced_hero_names = list(heroes) + list(removed_heroes)
+        current_responses = {r.response_link: r for r in Responses.select(lambda r: r.hero_id.hero_name in
+                                                                           synced_hero_names)}
+
+        deleted, updated = 0, 0
+        for link, response in current_responses.items():
+            new_response = new_responses.get(link)
+            if new_response is None:
+                response.delete()
+                deleted += 1
+            elif (response.hero_id, response.original_text, response.processed_text) != new_response:
+                response.hero_id, response.original_text, response.processed_text = new_response
+                updated += 1
+        flush()
+
+        new_links = [link for link in new_responses if link not in current_responses]
+        existing_links = self.get_existing_links(new_links)
+        rows = []
+        for link in new_links:
+            hero, original_text, processed_text = new_responses[link]
+            if link in existing_links:
+                logger.debug('Link already exists : ' + link + ' for response ' + original_text)
+            else:
+                rows.append((processed_text, original_text, link, hero.id))
+
+        self.insert_many(Responses, ['processed_text', 'original_text', 'response_link', 'hero_id'], rows)
+        return len(rows), updated, deleted
+
+    # WikiPages and WikiFiles table queries
+    @db_session
+    def get_wiki_page_revisions(self):
+        """Method to get revisions of the wiki pages last parsed into Responses table.
+
+        :return: dict with page titles and their revision ids
+        """
+        return dict(select((p.title, p.revision_id) for p in WikiPages)[:])
+
+    @db_session
+    def update_wiki_page_revisions(self, revisions, removed_pages=()):
+        """Method to save revisions of parsed wiki pages.
 
+        :param revisions: dict with page titles and their revision ids
+        :param removed_pages: Titles of the pages that no longer have responses
+        """
+        pages = {page.title: page for page in WikiPages.select()}
+        for title, revision_id in revisions.items():
+            page = pages.get(title)
+            if page is None:
+                WikiPages(title=title, revision_id=revision_id)
+            else:
+                page.revision_id = revision_id
+
+        for title in removed_pages:
+            if title in pages:
+                pages[title].delete()
+
+    @db_session
+    def get_wiki_file_links(self):
+        """Method to get links of all the files resolved before.
+
+        :return: dict with file names and their links
+        """
+        return dict(select((f.file_name, f.response_link) for f in WikiFiles)[:])
+
+    @db_session
+    def update_wiki_files(self, resolved_files, batch_size=500):
+        """Method to save resolved links of the files. Files already in the table are updated, new ones are inserted in
+        bulk.
+
+        :param resolved_files: dict with file names and their links
+        :param batch_size: Number of files checked per query
+        """
+        file_names = list(resolved_files)
+        existing_files = set()
+        for i in range(0, len(file_names), batch_size):
+            batch = file_names[i:i + batch_size]
+            for file in WikiFiles.select(lambda f: f.file_name in batch):
+                file.response_link = resolved_files[file.file_name]
+                existing_files.add(file.file_name)
+        flush()
+
+        rows = [(file_name, link) for file_name, link in resolved_files.items() if file_name not in existing_files]
+        self.insert_many(WikiFiles, ['file_name', 'response_link'], rows)
+
+    def insert_many(self, entity, attrs, rows):
+        """Method to insert rows in bulk, bypassing PonyORM's entity cache. Needs to be called in a db_session, rows are
+        committed with the session.
+        * sqlite and mysql : `executemany` (mysql drivers rewrite it into multi row inserts)
+        * postgres : `execute_values`, that sends multi row inserts in pages
+
+        :param entity: Model class of the table
+        :param attrs: Names of the model attributes, in order of values in rows
+        :param rows: List of tuples with values
+        """
+        if not rows:
+            return
+
+        provider = self.db.provider
+        table = provider.quote_name(entity._table_)
+        columns = ', '.join(provider.quote_name(getattr(entity, attr).columns[0]) for attr in attrs)
+        cursor = self.db.get_connection().cursor()
+
+        if DB_PROVIDER == 'postgres':
+            from psycopg2.extras import execute_values
+
+            execute_values(cursor, 'INSERT INTO {} ({}) VALUES %s'.format(table, columns), rows, page_size=1000)
+        else:
+            placeholder = '?' if provider.paramstyle == 'qmark' else '%s'
+            placeholders = ', '.join([placeholder] * len(attrs))
+            cursor.executemany('INSERT INTO {} ({}) VALUES ({})'.format(table, columns, placeholders), rows)
 
 db_api = DatabaseAPI()
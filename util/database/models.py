@@ -21,7 +21,11 @@ class Responses(db.Entity):
 class RedditCache(db.Entity):
     id = PrimaryKey(int, auto=True)  # Default db id column for pk
     thing_id = Required(str, unique=True)  # Comment or submission id that is already processed
-    added_datetime = Optional(datetime, default=datetime.utcnow())  # Datetime of processing the replyable
+    added_datetime = Optional(datetime, default=datetime.utcnow)  # Datetime of processing the replyable
+
+
+class RedditCachePartitions(db.Entity):
+    day = PrimaryKey(int, auto=False)  # Days since epoch, thing ids processed on that day are in its own cache table
 
 
 class Heroes(db.Entity):
@@ -30,3 +34,15 @@ class Heroes(db.Entity):
     img_path = Optional(str, nullable=True)  # Path to hero's flair image in reddit css
     flair_css = Optional(str, nullable=True)  # Class for hero in reddit css
     responses = Set(Responses)  # Relationship between Responses and Heroes table
+
+
+class WikiPages(db.Entity):
+    id = PrimaryKey(int, auto=True)  # Default db id column for pk
+    title = Required(str, unique=True)  # Title of the wiki page with responses
+    revision_id = Required(int)  # Id of the last revision of the page parsed into Responses table
+
+
+class WikiFiles(db.Entity):
+    id = PrimaryKey(int, auto=True)  # Default db id column for pk
+    file_name = Required(str, unique=True)  # Name of the response file, as in wiki source
+    response_link = Required(str)  # Link to the file as resolved by MediaWiki API
@@ -0,0 +1,103 @@
+"""Module that keeps an in-memory trigram index of the responses, used to find near matches (typos, extra letters) of
+processed replyable text when there is no exact match.
+
+Responses sharing the most trigrams with the text are taken as candidates, and only those are compared to the text
+using `rapidfuzz`, so a lookup never scans all the responses. Lookups give up (return no match) when they run out of
+their time budget. The index is rebuilt on next lookup whenever the response index is reloaded, time spent building it
+doesn't count towards the budget.
+"""
+
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+from rapidfuzz import fuzz, process
+
+from util.logger import logger
+from util.response_index import response_index
+
+__author__ = 'MePsyDuck'
+
+
+def get_trigrams(text):
+    """Method to get set of trigrams of the text, padded with spaces so the start and end of the text count too.
+
+    :param text: The processed text
+    :return: set of trigrams
+    """
+    padded = ' ' + text + ' '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    def __init__(self, responses_index=response_index, max_candidates=20):
+        """Method to create an empty index. Index is built from the responses index on first lookup.
+
+        :param responses_index: ResponseIndex with the responses.
+        :param max_candidates: Number of responses (sharing the most trigrams with text) compared to the text.
+        """
+        self.responses_index = responses_index
+        self.max_candidates = max_candidates
+        self._source = None
+        # Tuple of (texts, postings, max_length), swapped as a whole on rebuild
+        self._index = ([], {}, 0)
+        self._build_lock = threading.Lock()
+
+    def load(self):
+        """Method to build the index before the first lookup, e.g. when the bot starts.
+        """
+        self._ensure_built()
+
+    def _ensure_built(self):
+        """Method to build the index if the responses index was (re)loaded since the last build.
+        """
+        responses = self.responses_index.responses
+        if responses is self._source:
+            return
+
+        with self._build_lock:
+            if responses is not self._source:
+                texts = list(responses)
+                postings = defaultdict(list)
+                for text_id, text in enumerate(texts):
+                    for trigram in get_trigrams(text):
+                        postings[trigram].append(text_id)
+
+                self._index = texts, dict(postings), max(map(len, texts), default=0)
+                self._source = responses
+                logger.info('Built fuzzy index with ' + str(len(postings)) + ' trigrams')
+
+    def find(self, text, threshold, budget):
+        """Method to find the response most similar to the text.
+
+        :param text: The processed text
+        :param threshold: Min similarity (`rapidfuzz.fuzz.ratio`, 0-100) of the response to the text.
+        :param budget: Max time in seconds spent on the lookup.
+        :return: tuple of (response text, similarity), or None if no response is similar enough or budget was exceeded.
+        """
+        self._ensure_built()
+        deadline = time.perf_counter() + budget
+        texts, postings, max_length = self._index
+
+        # Similarity is at most 200 * shorter length / sum of lengths, so long texts can't be similar to any response
+        if not text or len(text) * threshold > max_length * (200 - threshold):
+            return None
+
+        counts = Counter()
+        for trigram in get_trigrams(text):
+            counts.update(postings.get(trigram, ()))
+            if time.perf_counter() > deadline:
+                logger.debug('Fuzzy lookup budget exceeded for : ' + text)
+                return None
+
+        candidates = [texts[text_id] for text_id, _ in heapq.nlargest(self.max_candidates, counts.items(),
+                                                                           key=itemgetter(1))]
+        match = process.extractOne(text, candidates, scorer=fuzz.ratio, score_cutoff=threshold)
+        if match is None or time.perf_counter() > deadline:
+            return None
+        return match[0], match[1]
+
+
+fuzzy_index = FuzzyIndex()
@@ -0,0 +1,94 @@
+"""Module that keeps an in-memory, read only mapping of heroes, used to resolve heroes requested in comments without db
+queries.
+
+Heroes are loaded once (lazily, on first lookup) from the Heroes table. Names are matched as processed text, so
+"Nature's Prophet", "natures prophet" and "nature s prophet" resolve to the same hero, and so do aliases from
+`HERO_ALIASES` (e.g. "wk"). Flair css classes are matched exactly. The resolver has to be reloaded whenever heroes in the
+database are repopulated.
+"""
+
+import config
+from util.database.database import db_api
+from util.logger import logger
+from util.str_utils import preprocess_text
+
+__author__ = 'MePsyDuck'
+
+
+class HeroResolver:
+    def __init__(self):
+        """Method to create an empty resolver. Heroes are loaded from db on first lookup.
+        """
+        self._heroes = None
+
+    @property
+    def heroes(self):
+        """Tuple of (name_to_id, flair_css_to_id, id_to_name) dicts. Loaded from db if not loaded yet.
+        """
+        if self._heroes is None:
+            self.load()
+        return self._heroes
+
+    def load(self, heroes_list=None):
+        """Method to (re)load all heroes from db into the resolver.
+        The new mappings are swapped in as a whole, so lookups running at the same time always see complete mappings.
+
+        :param heroes_list: list of (hero_id, hero_name, flair_css) tuples, same as returned by `db_api.get_all_heroes`.
+        Loaded from db if None.
+        """
+        if heroes_list is None:
+            heroes_list = db_api.get_all_heroes()
+
+        name_to_id, flair_css_to_id, id_to_name = {}, {}, {}
+        for hero_id, hero_name, flair_css in heroes_list:
+            name_to_id[preprocess_text(hero_name)] = hero_id
+            if flair_css:
+                flair_css_to_id[flair_css] = hero_id
+            id_to_name[hero_id] = hero_name
+
+        missing_aliases = []
+        for alias, hero_name in config.HERO_ALIASES.items():
+            hero_id = name_to_id.get(preprocess_text(hero_name))
+            if hero_id is None:
+                missing_aliases.append(alias + ' (' + hero_name + ')')
+            else:
+                # Real hero names take precedence over aliases
+                name_to_id.setdefault(alias, hero_id)
+        if missing_aliases:
+            logger.warning('Heroes for aliases not found : ' + ', '.join(missing_aliases))
+
+        self._heroes = name_to_id, flair_css_to_id, id_to_name
+        logger.info('Loaded ' + str(len(id_to_name)) + ' heroes in hero resolver')
+
+    def invalidate(self):
+        """Method to mark the resolver as stale. Heroes are loaded again on next lookup.
+        """
+        self._heroes = None
+
+    def get_hero_id_by_name(self, hero_name):
+        """Method to get hero's id by hero's name or alias, in any case and punctuation.
+
+        :param hero_name: Hero's name or alias
+        :return: Hero's id, or None if no hero has that name
+        """
+        return self.heroes[0].get(preprocess_text(hero_name))
+
+    def get_hero_id_by_flair_css(self, flair_css):
+        """Method to get hero's id based on the flair css.
+
+        :param flair_css: Hero's css class as in r/DotA2 subreddit
+        :return: Hero's id, or None if no hero has that css class
+        """
+        if flair_css:
+            return self.heroes[1].get(flair_css)
+
+    def get_hero_name(self, hero_id):
+        """Method to get hero's name, with proper formatting.
+
+        :param hero_id: Hero's id
+        :return: Hero's name, or None if there is no hero with that id
+        """
+        return self.heroes[2].get(hero_id)
+
+
+hero_resolver = HeroResolver()
@@ -0,0 +1,283 @@
+"""Module that keeps counters and latency histograms of the bot's hot path, used to size the bot against its load.
+
+Metrics are kept in process memory and rendered in Prometheus text format. They're served on a local HTTP endpoint
+(`METRICS_PORT`) and/or written to a file every `METRICS_DUMP_INTERVAL` seconds (`METRICS_FILE`). Each metric can have
+labels, e.g. cache backend or classification decision, and each combination of label values is counted separately.
+"""
+
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+from util.logger import logger
+
+__author__ = 'MePsyDuck'
+
+# Upper bounds (seconds) of histogram buckets, from sub millisecond lookups to minutes of stream lag
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def format_labels(labels, extra=()):
+    """Method to format label pairs as in Prometheus text format, e.g. `{backend="RedisCache",result="hit"}`.
+
+    :param labels: tuple of (name, value) pairs
+    :param extra: More (name, value) pairs, e.g. `le` of histogram buckets
+    :return: Formatted labels, empty if there are no labels
+    """
+    pairs = labels + tuple(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"'))
+                          for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        """Counter of events, e.g. cache hits.
+
+        :param name: Metric name
+        :param documentation: Help text of the metric
+        """
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        """Method to increase the counter for the label values.
+
+        :param value: Amount to increase the counter by
+        :param labels: Label values
+        """
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def render(self):
+        """Method to render the counter in Prometheus text format.
+
+        :return: list of lines
+        """
+        lines = ['# HELP ' + self.name + ' ' + self.documentation, '# TYPE ' + self.name + ' counter']
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(self.name + format_labels(key) + ' ' + repr(value))
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        """Histogram of observed values, e.g. latencies in seconds.
+
+        :param name: Metric name
+        :param documentation: Help text of the metric
+        :param buckets: Sorted upper bounds of the buckets, values above the last one are only in the total count.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.values = {}  # Label values to list of [bucket counts, sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Method to record a value for the label values.
+
+        :param value: Observed value
+        :param labels: Label values
+        """
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            values = self.values.get(key)
+            if values is None:
+                values = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                values[0][index] += 1
+            values[1] += value
+            values[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Context manager to record the time spent in its block, also if the block raises exception.
+
+        :param labels: Label values
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        """Method to render the histogram in Prometheus text format, with cumulative bucket counts.
+
+        :return: list of lines
+        """
+        lines = ['# HELP ' + self.name + ' ' + self.documentation, '# TYPE ' + self.name + ' histogram']
+        with self.lock:
+            for key, (bucket_counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(self.name + '_bucket' + format_labels(key, [('le', bound)]) + ' ' + str(cumulative))
+                lines.append(self.name + '_bucket' + format_labels(key, [('le', '+Inf')]) + ' ' + str(count))
+                lines.append(self.name + '_sum' + format_labels(key) + ' ' + repr(total))
+                lines.append(self.name + '_count' + format_labels(key) + ' ' + str(count))
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Method to create an empty registry. Metrics are added by the modules using them.
+        """
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get_or_add(self, metric_class, name, *args):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, *args)
+            elif not isinstance(metric, metric_class):
+                raise ValueError('Metric ' + name + ' is already registered as ' + type(metric).__name__)
+            return metric
+
+    def counter(self, name, documentation):
+        """Method to get the counter with the name, added to registry if it's not there yet.
+
+        :param name: Metric name
+        :param documentation: Help text of the metric
+        :return: Counter
+        """
+        return self._get_or_add(Counter, name, documentation)
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        """Method to get the histogram with the name, added to registry if it's not there yet.
+
+        :param name: Metric name
+        :param documentation: Help text of the metric
+        :param buckets: Sorted upper bounds of the buckets
+        :return: Histogram
+        """
+        return self._get_or_add(Histogram, name, documentation, buckets)
+
+    def render(self):
+        """Method to render all the metrics in Prometheus text format.
+
+        :return: Text with all the metrics
+        """
+        with self.lock:
+            metrics = sorted(self.metrics.items())
+        return ''.join(line + '\n' for _, metric in metrics for line in metric.render())
+
+
+metrics = MetricsRegistry()
+
+
+def time_methods(histogram):
+    """Class decorator recording time spent in each public method of the class, labelled with the method name.
+
+    :param histogram: Histogram the times are recorded in
+    :return: Class decorator
+    """
+
+    def decorator(cls):
+        for name, method in list(vars(cls).items()):
+            if name.startswith('_') or not inspect.isfunction(method):
+                continue
+            setattr(cls, name, _timed(histogram, name, method))
+        return cls
+
+    return decorator
+
+
+def _timed(histogram, name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with histogram.time(method=name):
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Handler serving the metrics of the registry on `/metrics`.
+    """
+    registry = metrics
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes would flood the logs
+        pass
+
+
+def start_http_server(host, port):
+    """Method to serve the metrics on `http://host:port/metrics` from a daemon thread.
+
+    :param host: Host (interface) to listen on
+    :param port: Port to listen on
+    :return: The HTTP server
+    """
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info('Serving metrics on http://' + host + ':' + str(port) + '/metrics')
+    return server
+
+
+def write_metrics_file(path, registry=metrics):
+    """Method to write all the metrics to file. File is replaced only after it's completely written.
+
+    :param path: Path to the file
+    :param registry: Registry with the metrics
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as metrics_file:
+        metrics_file.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+def start_file_writer(path, interval):
+    """Method to write the metrics to file every `interval` seconds from a daemon thread.
+
+    :param path: Path to the file
+    :param interval: Number of seconds between writes
+    """
+
+    def write_periodically():
+        while True:
+            time.sleep(interval)
+            try:
+                write_metrics_file(path)
+            except OSError as e:
+                logger.warning('Failed to write metrics file : ' + str(e))
+
+    threading.Thread(target=write_periodically, name='metrics-writer', daemon=True).start()
+    logger.info('Writing metrics to ' + path + ' every ' + str(interval) + ' seconds')
+
+
+def start_metrics():
+    """Method to start exposing the metrics as configured. Each shard gets its own port and file.
+    """
+    is_sharded = config.SHARD_COUNT > 1
+    if config.METRICS_PORT:
+        start_http_server(config.METRICS_HOST, config.METRICS_PORT + (config.SHARD_INDEX if is_sharded else 0))
+    if config.METRICS_FILE:
+        path = config.METRICS_FILE + ('.' + str(config.SHARD_INDEX) if is_sharded else '')
+        start_file_writer(path, config.METRICS_DUMP_INTERVAL)
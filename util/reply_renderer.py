@@ -0,0 +1,95 @@
+"""Module that renders the bot's replies from templates prepared in advance, so creating a reply needs no db queries.
+
+A template is prepared once for each hero, with the hero's name and `COMMENT_ENDING` already in it, and for each custom
+response. The part of the reply after the replyable text (link, hero's name and ending) is also kept for recently used
+(response link, hero) pairs, so rendering a reply is a couple of string concatenations. Templates are prepared again
+whenever the hero resolver is reloaded.
+"""
+
+import threading
+
+from cacheout import LRUCache
+
+import config
+from util.hero_resolver import hero_resolver
+
+__author__ = 'MePsyDuck'
+
+
+class ReplyRenderer:
+    def __init__(self, heroes=hero_resolver, max_fragments=10000):
+        """Method to create renderer with custom response templates. Hero templates are prepared on first render.
+
+        :param heroes: HeroResolver with the heroes' names.
+        :param max_fragments: Number of (response link, hero) pairs whose rendered fragments are kept.
+        """
+        self.heroes = heroes
+        self.max_fragments = max_fragments
+        self._source = None
+        # Tuple of (hero templates, fragments cache), swapped as a whole when heroes are reloaded
+        self._templates = ({}, LRUCache(maxsize=max_fragments, ttl=0))
+        self._build_lock = threading.Lock()
+
+        # Custom responses have placeholders for original text and the ending, so they're split around the first one
+        self.custom_templates = {}
+        for body, custom_response in config.CUSTOM_RESPONSES.items():
+            head, _, tail = custom_response.partition('{}')
+            self.custom_templates[body] = head.format(), tail.format(config.COMMENT_ENDING)
+
+    @staticmethod
+    def create_hero_template(hero_name):
+        """Method to create the part of the reply following the response link, for the hero.
+
+        :param hero_name: Hero's name with proper formatting
+        :return: Template text
+        """
+        return ') (sound warning: {}){}'.format(hero_name, config.COMMENT_ENDING)
+
+    def _ensure_built(self):
+        """Method to prepare hero templates if heroes were (re)loaded since the templates were last prepared.
+        """
+        heroes = self.heroes.heroes
+        if heroes is self._source:
+            return
+
+        with self._build_lock:
+            if heroes is not self._source:
+                _, _, id_to_name = heroes
+                templates = {hero_id: self.create_hero_template(hero_name) for hero_id, hero_name in id_to_name.items()}
+                self._templates = templates, LRUCache(maxsize=self.max_fragments, ttl=0)
+                self._source = heroes
+
+    def render(self, original_text, response_url, hero_id):
+        """Method that renders a reply with a link to the response audio file, the response text, a warning about the
+        sound and the ending.
+
+        :param original_text: Text of the response as shown in the reply
+        :param response_url: The url to the response audio file
+        :param hero_id: The hero_id to which the response belongs to.
+        :return: The text for the comment reply.
+        """
+        self._ensure_built()
+        templates, fragments = self._templates
+
+        fragment = fragments.get((response_url, hero_id))
+        if fragment is None:
+            template = templates.get(hero_id)
+            if template is None:
+                template = self.create_hero_template(self.heroes.get_hero_name(hero_id))
+            fragment = '](' + response_url + template
+            fragments.set((response_url, hero_id), fragment)
+
+        return '[' + original_text + fragment
+
+    def render_custom(self, original_text, body):
+        """Method that renders a custom reply.
+
+        :param original_text: The replyable body/title text
+        :param body: The processed body/title text, key of the custom response
+        :return: The text for the comment reply.
+        """
+        head, tail = self.custom_templates[body]
+        return head + original_text + tail
+
+
+reply_renderer = ReplyRenderer()
@@ -0,0 +1,110 @@
+"""Module that keeps an Aho-Corasick automaton over the words of all the responses, used to find responses contained in
+longer replyable texts.
+
+Patterns are processed response texts split into words, so matches always start and end on word boundaries. Each state
+knows the length of the longest response ending in it, so the longest response contained in the text is found in a
+single pass over its words, no matter how many responses there are. The automaton is rebuilt on next lookup whenever the
+response index or the excluded responses are reloaded.
+"""
+
+import threading
+from collections import deque
+
+from util.logger import logger
+from util.response_index import response_index
+
+__author__ = 'MePsyDuck'
+
+
+class ResponseAutomaton:
+    def __init__(self, responses_index=response_index, is_excluded=None, get_excluded_responses=None):
+        """Method to create an empty automaton. It is built from the responses index on first lookup.
+
+        :param responses_index: ResponseIndex with the responses.
+        :param is_excluded: Function called with processed response text, returning True for responses that should not
+        be matched.
+        :param get_excluded_responses: Function returning the excluded responses `is_excluded` checks against. The
+        automaton is rebuilt when it returns another object.
+        """
+        self.responses_index = responses_index
+        self.is_excluded = is_excluded
+        self.get_excluded_responses = get_excluded_responses
+        self._source = None
+        # Tuple of (goto, fail, match_length) lists indexed by state, swapped as a whole on rebuild
+        self._automaton = ([{}], [0], [0])
+        self._build_lock = threading.Lock()
+
+    def _ensure_built(self):
+        """Method to build the automaton if the responses index or the excluded responses were (re)loaded since the last
+        build.
+        """
+        responses = self.responses_index.responses
+        excluded_responses = self.get_excluded_responses() if self.get_excluded_responses is not None else None
+        source = self._source
+        if source is not None and source[0] is responses and source[1] is excluded_responses:
+            return
+
+        with self._build_lock:
+            source = self._source
+            if source is None or source[0] is not responses or source[1] is not excluded_responses:
+                self._build(responses)
+                self._source = responses, excluded_responses
+
+    def _build(self, responses):
+        """Method to build the trie of response words, and then failure links and match lengths in breadth first order.
+
+        :param responses: Processed response texts
+        """
+        goto, match_length = [{}], [0]
+        for text in responses:
+            if self.is_excluded is not None and self.is_excluded(text):
+                continue
+            state = 0
+            for word in text.split(' '):
+                next_state = goto[state].get(word)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][word] = next_state
+                    goto.append({})
+                    match_length.append(0)
+                state = next_state
+            match_length[state] = len(text.split(' '))
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and word not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(word, 0)
+                # Longest response ending here is the one of this state, or the longest one ending in its suffix
+                if not match_length[next_state]:
+                    match_length[next_state] = match_length[fail[next_state]]
+
+        self._automaton = goto, fail, match_length
+        logger.info('Built response automaton with ' + str(len(goto)) + ' states')
+
+    def find_longest(self, text):
+        """Method to find the longest response contained in the text.
+
+        :param text: The processed text
+        :return: processed text of the longest response, or None if text contains no response.
+        """
+        self._ensure_built()
+        goto, fail, match_length = self._automaton
+
+        words = text.split(' ')
+        state, longest_length, longest_end = 0, 0, 0
+        for position, word in enumerate(words):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if match_length[state] > longest_length:
+                longest_length, longest_end = match_length[state], position + 1
+
+        if not longest_length:
+            return None
+        return ' '.join(words[longest_end - longest_length:longest_end])
@@ -0,0 +1,78 @@
+"""Module that keeps an in-memory, read only index of all the responses in the database.
+
+The index is built once (lazily, on first lookup) from the Responses table and maps processed response text to a tuple
+of (hero_id, link) entries, so matching a replyable against responses does not need any db queries.
+The index has to be reloaded whenever responses in the database are repopulated.
+"""
+
+import random
+from collections import defaultdict
+
+from util.database.database import db_api
+from util.logger import logger
+
+__author__ = 'MePsyDuck'
+
+
+class ResponseIndex:
+    def __init__(self):
+        """Method to create an empty index. Responses are loaded from db on first lookup.
+        """
+        self._responses = None
+
+    @property
+    def responses(self):
+        """Mapping of processed response text to tuple of (hero_id, link) entries. Loaded from db if not loaded yet.
+        """
+        if self._responses is None:
+            self.load()
+        return self._responses
+
+    def load(self, responses_list=None):
+        """Method to (re)load all responses from db into the index.
+        The new mapping is swapped in as a whole, so lookups running at the same time always see a complete index.
+
+        :param responses_list: list of (processed_text, hero_id, link) tuples, same as returned by
+        `db_api.get_all_responses`. Loaded from db if None.
+        """
+        if responses_list is None:
+            responses_list = db_api.get_all_responses()
+
+        responses = defaultdict(list)
+        for processed_text, hero_id, link in responses_list:
+            responses[processed_text].append((hero_id, link))
+
+        self._responses = {text: tuple(entries) for text, entries in responses.items()}
+        logger.info('Loaded ' + str(len(self._responses)) + ' responses in response index')
+
+    def invalidate(self):
+        """Method to mark the index as stale. Responses are loaded again on next lookup.
+        """
+        self._responses = None
+
+    def __contains__(self, processed_text):
+        return processed_text in self.responses
+
+    def __len__(self):
+        return len(self.responses)
+
+    def get_link_for_response(self, processed_text, hero_id=None):
+        """Method that returns the link for the processed response text and given optional hero_id. If multiple matching
+        entries are found, returns a random result.
+
+        :param processed_text: The plain processed response text.
+        :param hero_id: The hero's id.
+        :return The link to the response, hero_id, or else None, None if no matching response is found.
+        """
+        entries = self.responses.get(processed_text)
+        if entries and hero_id:
+            entries = [entry for entry in entries if entry[0] == hero_id]
+
+        if entries:
+            hero_id, link = random.choice(entries)
+            return link, hero_id
+        else:
+            return None, None
+
+
+response_index = ResponseIndex()
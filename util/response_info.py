@@ -1,6 +1,7 @@
 class ResponseInfo:
     """Custom Class to store response info for passing in between functions
     """
-    def __init__(self, hero_id, link):
+    def __init__(self, hero_id, link, response_text=None):
         self.hero_id = hero_id
         self.link = link
+        self.response_text = response_text  # processed response text, if only a part of replyable text matched
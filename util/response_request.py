@@ -1,11 +1,157 @@
-from util.str_utils import preprocess_text
+"""Module used to request sets of responses (e.g. hero and item names) from the Cargo tables of the wiki.
+
+Sets are kept in a local JSON file and requested again only when they are older than the given TTL. If the wiki can't be
+reached, the last saved set is used, however old it is, so the bot starts offline, and the request is retried after
+`RETRY_INTERVAL`.
+"""
+
+import json
+import os
+import threading
+import time
+
 import requests
 
+from util.str_utils import preprocess_texts
+
+__author__ = 'MePsyDuck'
+
+_cache_lock = threading.Lock()
+
+RETRY_INTERVAL = 60 * 60  # seconds after which a failed request is retried
+
 
 def request_cargo_set(url):
-    web_request = requests.get(url)
+    web_request = requests.get(url, timeout=10)
     web_json = web_request.json()
-    cargo_set = set()
-    for objects in web_json['cargoquery']:
-        cargo_set.add(preprocess_text(objects['title']['title']))
-    return cargo_set
+    return set(preprocess_texts(objects['title']['title'] for objects in web_json['cargoquery']))
+
+
+def load_cargo_set(url, cache_path, ttl):
+    """Method that returns the cargo set for the url from the cache file, requesting it from the wiki only if the cached
+    set is missing or older than `ttl`.
+
+    :param url: Cargo query url, also the key of the set in cache file.
+    :param cache_path: Path to the JSON cache file, shared by all the sets.
+    :param ttl: Number of seconds after which the set is requested again.
+    :return: tuple of (set of processed titles, timestamp after which it should be loaded again). Set is empty if it was
+    never requested successfully.
+    """
+    with _cache_lock:
+        cache = read_cargo_cache(cache_path)
+        cached = cache.get(url)
+        if cached is not None and time.time() - cached['requested_at'] < ttl:
+            return set(cached['titles']), cached['requested_at'] + ttl
+
+        try:
+            cargo_set = request_cargo_set(url)
+        except (requests.RequestException, ValueError, KeyError) as e:
+            # Imported here, as logger imports config which uses this module
+            from util.logger import logger
+
+            logger.warning('Failed to request cargo set, using ' + ('cached set' if cached else 'empty set') +
+                           ' : ' + str(e))
+            return set(cached['titles']) if cached else set(), time.time() + min(ttl, RETRY_INTERVAL)
+
+        requested_at = time.time()
+        cache[url] = {'requested_at': requested_at, 'titles': sorted(cargo_set)}
+        write_cargo_cache(cache_path, cache)
+        return cargo_set, requested_at + ttl
+
+
+class CargoSets:
+    """Cargo sets kept in memory, and loaded again with `load_cargo_set` when they expire. So a set that failed to load
+    at startup is not kept for the lifetime of the process.
+
+    Only the first load of a set waits for the wiki, workers do it at startup. Expired sets are loaded again by a
+    background thread, and the stale set is used until then, so lookups never wait on HTTP.
+    """
+
+    def __init__(self, cache_path, ttl):
+        """
+        :param cache_path: Path to the JSON cache file, shared by all the sets.
+        :param ttl: Number of seconds after which the sets are requested again.
+        """
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.sets = {}  # Urls to tuples of (set, timestamp after which it's loaded again)
+        self.refreshing = set()  # Urls being loaded again by background threads
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        """Method to get the cargo set for the url. Set is loaded if it's not loaded yet, or loaded again in background if
+        it's expired.
+
+        :param url: Cargo query url
+        :return: set of processed titles
+        """
+        loaded = self.sets.get(url)
+        if loaded is None:
+            with self.lock:
+                loaded = self.sets.get(url)
+                if loaded is None:
+                    loaded = self.sets[url] = load_cargo_set(url, self.cache_path, self.ttl)
+        elif time.time() >= loaded[1]:
+            self.refresh(url)
+        return loaded[0]
+
+    def refresh(self, url):
+        """Method to start loading the set again in a background thread, unless it's already being loaded.
+
+        :param url: Cargo query url
+        :return: The thread loading the set, None if it's already being loaded.
+        """
+        with self.lock:
+            if url in self.refreshing:
+                return None
+            self.refreshing.add(url)
+
+        thread = threading.Thread(target=self._refresh, args=(url,), name='cargo-set-refresh', daemon=True)
+        thread.start()
+        return thread
+
+    def _refresh(self, url):
+        """Method to load the set again, run by the background thread.
+
+        :param url: Cargo query url
+        """
+        try:
+            cargo_set, expires_at = load_cargo_set(url, self.cache_path, self.ttl)
+            stale_set = self.sets[url][0]
+            if not cargo_set and stale_set:
+                # Request failed and cache file has nothing, stale set is still better than none
+                cargo_set = stale_set
+            self.sets[url] = cargo_set, expires_at
+        finally:
+            with self.lock:
+                self.refreshing.discard(url)
+
+
+def read_cargo_cache(cache_path):
+    """Method to read all the cached sets. Missing or broken file is treated as empty cache.
+
+    :param cache_path: Path to the JSON cache file.
+    :return: dict with urls and dicts of `requested_at` timestamp and `titles`.
+    """
+    try:
+        with open(cache_path, encoding='utf-8') as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_cargo_cache(cache_path, cache):
+    """Method to write all the cached sets. File is replaced only after it's completely written, so processes starting
+    at the same time never read a partial file.
+
+    :param cache_path: Path to the JSON cache file.
+    :param cache: dict with urls and dicts of `requested_at` timestamp and `titles`.
+    """
+    tmp_path = cache_path + '.' + str(os.getpid()) + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump(cache, cache_file)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Cache is only an optimization, the set is requested again on next start
+        pass
@@ -0,0 +1,82 @@
+"""Module used to split the watched subreddits between multiple worker processes, possibly running on different hosts.
+
+Subreddits are assigned to shards deterministically: sorted by name (case insensitive) and dealt out round-robin, so
+every process with the same `SUBREDDIT` and `SHARD_COUNT` config agrees on the assignment without talking to others.
+Replyables already processed are shared through the cache (`CACHE_PROVIDER`), which should be `redis` or `db` when
+running more than one shard.
+"""
+
+import multiprocessing
+import os
+
+import config
+from util.logger import logger
+
+__author__ = 'MePsyDuck'
+
+
+def check_shard_count(subreddits=None, shard_count=None):
+    """Method to check there are enough subreddits for every shard to watch at least one of them.
+
+    :param subreddits: All subreddits watched by the bot, defaults to `SUBREDDITS` from config.
+    :param shard_count: Total number of shards across all hosts, defaults to `SHARD_COUNT` from config.
+    :raises ValueError: If there are more shards than subreddits.
+    """
+    subreddits = config.SUBREDDITS if subreddits is None else subreddits
+    shard_count = config.SHARD_COUNT if shard_count is None else shard_count
+
+    if shard_count > len(subreddits):
+        raise ValueError('SHARD_COUNT is ' + str(shard_count) + ', but there are only ' + str(len(subreddits)) +
+                         ' subreddits to split between the shards : ' + ', '.join(subreddits))
+
+
+def get_shard_subreddits(subreddits=None, shard_index=None, shard_count=None):
+    """Method to get the subreddits assigned to a shard.
+
+    :param subreddits: All subreddits watched by the bot, defaults to `SUBREDDITS` from config.
+    :param shard_index: Index of the shard (0 based), defaults to `SHARD_INDEX` from config.
+    :param shard_count: Total number of shards across all hosts, defaults to `SHARD_COUNT` from config.
+    :return: list of subreddits to be watched by the shard.
+    :raises ValueError: If there are more shards than subreddits, as some shards would watch nothing.
+    """
+    subreddits = config.SUBREDDITS if subreddits is None else subreddits
+    shard_index = config.SHARD_INDEX if shard_index is None else shard_index
+    shard_count = config.SHARD_COUNT if shard_count is None else shard_count
+
+    check_shard_count(subreddits, shard_count)
+    return sorted(subreddits, key=str.lower)[shard_index::shard_count]
+
+
+def start_processes(target):
+    """Method to start `WORKER_PROCESSES` processes on this host, running shards from `SHARD_INDEX` onwards, and wait for
+    them to finish.
+
+    Processes are spawned (not forked), so each of them creates its own cache, db and Reddit connections. Shard index is
+    passed to the process through environment, as config is read when the process imports it.
+
+    :param target: Function to be run in each process.
+    """
+    check_shard_count()
+    last_shard_index = config.SHARD_INDEX + config.WORKER_PROCESSES
+    if last_shard_index > config.SHARD_COUNT:
+        raise ValueError('Shards ' + str(config.SHARD_INDEX) + '-' + str(last_shard_index - 1) +
+                         ' do not exist, SHARD_COUNT is ' + str(config.SHARD_COUNT))
+
+    context = multiprocessing.get_context('spawn')
+    environ = os.environ.copy()
+    processes = []
+    try:
+        for shard_index in range(config.SHARD_INDEX, last_shard_index):
+            os.environ['SHARD_INDEX'] = str(shard_index)
+            os.environ['WORKER_PROCESSES'] = '1'
+            process = context.Process(target=target, name='shard-' + str(shard_index))
+            process.start()
+            processes.append(process)
+            logger.info('Started shard ' + str(shard_index) + ' for subreddits : ' +
+                        ', '.join(get_shard_subreddits(shard_index=shard_index)))
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+
+    for process in processes:
+        process.join()
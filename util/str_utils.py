@@ -1,8 +1,9 @@
-import re
 import string
 
-PUNCTUATION_TRANS = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
-WHITESPACE_TRANS = str.maketrans(string.whitespace, ' ' * len(string.whitespace))
+# Single table for all the character replacements : punctuations and whitespace characters to spaces, ASCII uppercase
+# letters to lowercase (so lower() is needed only for non ASCII texts)
+PREPROCESS_TRANS = str.maketrans({**{char: ' ' for char in string.punctuation + string.whitespace},
+                                  **{char: char.lower() for char in string.ascii_uppercase}})
 
 
 def preprocess_text(text):
@@ -17,9 +18,20 @@ def preprocess_text(text):
     :param text: the text to be cleaned
     :return: cleaned text
     """
+    text = text.translate(PREPROCESS_TRANS)
+    if not text.isascii():
+        text = text.lower()
+    # Empty strings are left by consecutive, leading and trailing spaces. Other (unicode) whitespace at the ends is
+    # removed by strip, but kept inside the text.
+    return ' '.join(filter(None, text.split(' '))).strip()
 
-    text = text.translate(PUNCTUATION_TRANS)
-    text = text.translate(WHITESPACE_TRANS)
-    text = text.strip().lower()
-    text = re.sub(' +', ' ', text)
-    return text
+
+def preprocess_texts(texts):
+    """Method for pre-processing multiple texts, as done by `preprocess_text`.
+
+    :param texts: iterable of texts to be cleaned
+    :return: list of cleaned texts
+    """
+    trans = PREPROCESS_TRANS
+    return [' '.join(filter(None, (text if text.isascii() else text.lower()).split(' '))).strip()
+            for text in (text.translate(trans) for text in texts)]